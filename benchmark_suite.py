@@ -0,0 +1,281 @@
+# Banc d'essai de bout en bout sur instances synthétiques de tailles croissantes
+# Chaque étape tourne dans un processus neuf : temps et pic mémoire mesurés isolément
+
+import json
+import os
+import platform
+import sys
+import time
+
+STAGES = ('parse', 'conflict_graph', 'extract_features', 'train_models',
+          'predict_batch', 'predict_difficulty')
+
+
+def _peak_rss_mb():
+    """Pic de RSS du processus en Mo (VmHWM sous Linux)"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _current_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return _peak_rss_mb()
+
+
+def _reset_peak_rss():
+    """Remet le pic de RSS au niveau courant (Linux >= 4.0) ; False si impossible"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _setup(stage, path, work_dir, train_models):
+    """Prépare les entrées d'une étape (hors mesure) ; renvoie la fonction mesurée"""
+    import contextlib
+    import hashlib
+    import io
+    
+    from prediction import FeatureExtractor, TimetableDataProcessor, TimetableMLModel
+    
+    processor = TimetableDataProcessor()
+    extractor = FeatureExtractor()
+    if stage == 'parse':
+        return lambda: processor.parse_instance(path)
+    if stage == 'extract_features':
+        return lambda: extractor.extract_features([path])
+    
+    instance = processor.parse_instance(path)
+    if stage == 'conflict_graph':
+        return lambda: extractor.create_sparse_conflict_graph(instance)
+    
+    frame = extractor.instance_features(instance)
+    
+    def train():
+        ml_model = TimetableMLModel(n_jobs=1)
+        X, y = ml_model.prepare_data(frame.copy())
+        ml_model.create_models()
+        ml_model.models = {name: model for name, model in ml_model.models.items() if name in train_models}
+        ml_model.train_models(X, y)
+        return ml_model
+    
+    if stage == 'train_models':
+        return train
+    
+    # Prédiction : modèle entraîné et sauvegardé pendant la préparation
+    from inference import TimetablePredictor
+    
+    # Modèle en cache propre au contenu de l'instance (paramètres du générateur) et aux modèles entraînés
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        digest.update(f.read())
+    digest.update(json.dumps(sorted(train_models)).encode())
+    model_dir = os.path.join(work_dir, f"model-{os.path.basename(path)}-{digest.hexdigest()[:16]}")
+    if not os.path.exists(os.path.join(model_dir, 'metadata.json')):
+        with contextlib.redirect_stdout(io.StringIO()):
+            train().save_model(model_dir)
+    predictor = TimetablePredictor(model_dir)
+    if stage == 'predict_batch':
+        return lambda: predictor.predict_batch(frame)
+    
+    rows = frame.head(1000).to_dict('records')
+    return lambda: [predictor.predict_difficulty(row) for row in rows]
+
+
+def _stage_probe(stage, path, work_dir, train_models, repeats, results):
+    """Processus de travail : prépare, remet le pic mémoire à zéro puis mesure l'étape"""
+    import contextlib
+    import io
+    
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            run = _setup(stage, path, work_dir, train_models)
+            # Premier passage hors mesure : imports paresseux et allocations initiales
+            run()
+            baseline = _current_rss_mb()
+            reset = _reset_peak_rss()
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+        peak = _peak_rss_mb()
+        results.put({
+            'seconds': min(timings),
+            'seconds_all': timings,
+            'peak_rss_mb': peak,
+            # Sans remise à zéro, le pic inclut la préparation
+            'peak_delta_mb': peak - baseline if reset else None,
+        })
+    except Exception as e:
+        results.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def _wait_result(process, results, timeout=None, poll=1.0):
+    """Résultat du processus de travail ; erreur s'il meurt (OOM, segfault) ou dépasse le délai"""
+    import queue
+    
+    deadline = time.monotonic() + timeout if timeout else None
+    while True:
+        try:
+            return results.get(timeout=poll)
+        except queue.Empty:
+            pass
+        if not process.is_alive():
+            # Le résultat a pu être placé juste avant la sortie du processus
+            try:
+                return results.get(timeout=poll)
+            except queue.Empty:
+                code = process.exitcode
+                reason = f"signal {-code}" if code is not None and code < 0 else f"code {code}"
+                return {'error': f"processus terminé sans résultat ({reason})"}
+        if deadline is not None and time.monotonic() > deadline:
+            process.kill()
+            return {'error': f"délai dépassé ({timeout:.0f}s)"}
+
+
+def run_suite(sizes=(100, 1000, 10000), stages=STAGES, work_dir='benchmarks', repeats=3, seed=0,
+              train_models=('XGBoost',), generator_params=None, stage_timeout=3600.0):
+    """Balayage de tailles : génère les instances puis mesure chaque étape"""
+    import multiprocessing
+    
+    from instance_generator import InstanceGenerator
+    
+    for stage in stages:
+        if stage not in STAGES:
+            raise ValueError(f"Étape inconnue: {stage}")
+    os.makedirs(work_dir, exist_ok=True)
+    context = multiprocessing.get_context('spawn')
+    records = []
+    
+    for size in sizes:
+        generator = InstanceGenerator.scaled(size, seed, **(generator_params or {}))
+        path = generator.write(os.path.join(work_dir, f"synth-{size}-{seed}.ctt"))
+        for stage in stages:
+            results = context.Queue()
+            process = context.Process(target=_stage_probe,
+                                      args=(stage, path, work_dir, tuple(train_models), repeats, results))
+            process.start()
+            result = _wait_result(process, results, stage_timeout)
+            process.join()
+            
+            record = dict(result, stage=stage, courses=size)
+            records.append(record)
+            if 'error' in record:
+                print(f"✗ {stage} ({size} cours): {record['error']}")
+            else:
+                delta = record['peak_delta_mb']
+                print(f"✓ {stage:<20}{size:>8} cours {record['seconds']:>10.3f}s"
+                      f"  pic {record['peak_rss_mb']:.0f} Mo"
+                      + (f" (+{delta:.0f} Mo)" if delta is not None else ""))
+    
+    import numpy as np
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeats': repeats,
+            'seed': seed,
+            'train_models': list(train_models),
+            'generator_params': generator_params or {},
+        },
+        'results': records,
+    }
+
+
+def compare(report, baseline, time_threshold=0.25, memory_threshold=0.25, min_seconds=0.05,
+            min_memory_mb=10.0):
+    """Régressions par rapport à une référence (ratios au-delà des seuils et des planchers de bruit)"""
+    reference = {(r['stage'], r['courses']): r for r in baseline['results'] if 'error' not in r}
+    regressions = []
+    for record in report['results']:
+        base = reference.get((record['stage'], record['courses']))
+        if base is None:
+            continue
+        name = f"{record['stage']} ({record['courses']} cours)"
+        if 'error' in record:
+            regressions.append(f"{name}: échec ({record['error']})")
+            continue
+        
+        seconds, base_seconds = record['seconds'], base['seconds']
+        if seconds - base_seconds > min_seconds and seconds > base_seconds * (1 + time_threshold):
+            regressions.append(f"{name}: {base_seconds:.3f}s -> {seconds:.3f}s "
+                               f"(+{100 * (seconds / base_seconds - 1):.0f}%)")
+        
+        # Pic propre à l'étape si disponible des deux côtés, sinon pic total
+        key = 'peak_delta_mb' if record.get('peak_delta_mb') is not None and \
+            base.get('peak_delta_mb') is not None else 'peak_rss_mb'
+        memory, base_memory = record[key], base[key]
+        if memory - base_memory > min_memory_mb and memory > base_memory * (1 + memory_threshold):
+            regressions.append(f"{name}: {key} {base_memory:.0f} -> {memory:.0f} Mo")
+    return regressions
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Banc d'essai des étapes du pipeline par taille d'instance")
+    parser.add_argument('--sizes', nargs='+', type=int, default=[100, 1000, 10000])
+    parser.add_argument('--stages', nargs='+', default=list(STAGES), choices=STAGES)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', default='benchmarks')
+    parser.add_argument('--train-models', nargs='+', default=['XGBoost'],
+                        help="modèles entraînés par l'étape train_models")
+    parser.add_argument('--overlap', type=float, default=None, help="densité de recouvrement des curricula")
+    parser.add_argument('--campuses', type=int, default=None)
+    parser.add_argument('--stage-timeout', type=float, default=3600.0, metavar='SECONDES',
+                        help="délai maximal d'une étape (0 : illimité)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--baseline', default=None, help="résultats de référence à comparer")
+    parser.add_argument('--save-baseline', default=None, metavar='CHEMIN',
+                        help="enregistre aussi les résultats comme nouvelle référence")
+    parser.add_argument('--time-threshold', type=float, default=0.25, help="hausse relative tolérée du temps")
+    parser.add_argument('--memory-threshold', type=float, default=0.25, help="hausse relative tolérée du pic mémoire")
+    args = parser.parse_args()
+    
+    generator_params = {key: value for key, value in (('overlap', args.overlap), ('campuses', args.campuses))
+                        if value is not None}
+    report = run_suite(args.sizes, args.stages, args.work_dir, args.repeats, args.seed,
+                       args.train_models, generator_params, args.stage_timeout)
+    
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Résultats écrits dans {path}")
+    
+    failed = [r for r in report['results'] if 'error' in r]
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.time_threshold, args.memory_threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} régression(s) par rapport à {args.baseline}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            sys.exit(1)
+        print(f"\n✓ Aucune régression par rapport à {args.baseline}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+# Stockage compact des features : colonnes réduites (float32, int16, codes) en tronçons .npy
+# Les tronçons sont relus par mmap : le corpus n'a jamais besoin de tenir en mémoire
+
+import json
+import os
+
+import numpy as np
+
+
+class FeatureStore:
+    """Features en tronçons de tableaux structurés, avec dictionnaires des colonnes catégorielles"""
+    
+    META_NAME = 'store.json'
+    SCHEMA_VERSION = 1
+    # Colonnes bornées par de petites constantes (séances, jours, périodes)
+    INT16_COLUMNS = ('lectures', 'min_days', 'total_days', 'periods_per_day', 'available_periods',
+                     'available_days', 'unavailability_count')
+    # Colonnes texte stockées en codes int32 (dictionnaire dans store.json)
+    CATEGORICAL_COLUMNS = ('instance', 'teacher')
+    # Identifiants non conservés : inutiles à l'entraînement et non bornés
+    DROPPED_COLUMNS = ('course_id',)
+    
+    def __init__(self, path, chunk_rows=262144):
+        self.path = path
+        self.chunk_rows = chunk_rows
+        meta_path = os.path.join(path, self.META_NAME)
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                self.meta = json.load(f)
+            if self.meta.get('schema_version') != self.SCHEMA_VERSION:
+                raise ValueError(f"Version de schéma non prise en charge: {self.meta.get('schema_version')}")
+        else:
+            self.meta = {'schema_version': self.SCHEMA_VERSION, 'columns': [], 'categories': {}, 'chunks': []}
+        self._category_index = {name: {value: i for i, value in enumerate(values)}
+                                for name, values in self.meta['categories'].items()}
+    
+    @property
+    def columns(self):
+        return [name for name, _ in self.meta['columns']]
+    
+    @property
+    def dtype(self):
+        return np.dtype([(name, dtype) for name, dtype in self.meta['columns']])
+    
+    @property
+    def n_rows(self):
+        return sum(chunk['rows'] for chunk in self.meta['chunks'])
+    
+    @property
+    def n_chunks(self):
+        return len(self.meta['chunks'])
+    
+    def categories(self, name):
+        return list(self.meta['categories'].get(name, []))
+    
+    def nbytes(self):
+        """Taille des données sur disque (hors métadonnées)"""
+        return self.n_rows * self.dtype.itemsize if self.meta['columns'] else 0
+    
+    def _schema(self, frame):
+        """Type compact de chaque colonne d'un DataFrame de features"""
+        columns = []
+        for name in frame.columns:
+            if name in self.DROPPED_COLUMNS:
+                continue
+            kind = frame[name].dtype.kind
+            if name in self.CATEGORICAL_COLUMNS or kind in 'OUS':
+                if name not in self.CATEGORICAL_COLUMNS:
+                    raise ValueError(f"Colonne texte non catégorielle: {name}")
+                columns.append([name, '<i4'])
+            elif kind == 'f':
+                columns.append([name, '<f4'])
+            elif kind in 'iub':
+                columns.append([name, '<i2' if name in self.INT16_COLUMNS else '<i4'])
+            else:
+                raise ValueError(f"Type de colonne non pris en charge: {name} ({frame[name].dtype})")
+        return columns
+    
+    def _encode(self, name, values):
+        """Codes des valeurs ; les valeurs nouvelles sont ajoutées au dictionnaire"""
+        import pandas as pd
+        
+        index = self._category_index.setdefault(name, {})
+        categories = self.meta['categories'].setdefault(name, [])
+        for value in pd.unique(values):
+            if value not in index:
+                index[value] = len(categories)
+                categories.append(value)
+        return pd.Index(categories).get_indexer(values).astype(np.int32)
+    
+    def append(self, frame):
+        """Ajoute un DataFrame de features, découpé en tronçons de chunk_rows lignes"""
+        if frame is None or not len(frame):
+            return 0
+        schema = self._schema(frame)
+        if self.meta['columns'] and schema != self.meta['columns']:
+            raise ValueError("Colonnes incompatibles avec le schéma du magasin")
+        
+        # Réduction sans perte : une valeur hors plage est une erreur, pas une troncature ;
+        # vérifiée avant toute écriture pour qu'un lot refusé ne laisse aucun tronçon
+        for name, dtype in schema:
+            if np.dtype(dtype).kind == 'i' and name not in self.CATEGORICAL_COLUMNS:
+                limits = np.iinfo(dtype)
+                values = frame[name].to_numpy()
+                if values.min() < limits.min or values.max() > limits.max:
+                    raise ValueError(f"Valeurs hors de la plage {dtype} pour la colonne {name}")
+        
+        self.meta['columns'] = schema
+        os.makedirs(self.path, exist_ok=True)
+        for start in range(0, len(frame), self.chunk_rows):
+            self._write_chunk(frame.iloc[start:start + self.chunk_rows])
+        self._save_meta()
+        return len(frame)
+    
+    def _write_chunk(self, part):
+        records = np.empty(len(part), dtype=self.dtype)
+        for name, dtype in self.meta['columns']:
+            if name in self.CATEGORICAL_COLUMNS:
+                records[name] = self._encode(name, part[name].astype(str).to_numpy())
+                continue
+            records[name] = part[name].to_numpy()
+        
+        file_name = f"chunk-{self.n_chunks:06d}.npy"
+        tmp_path = os.path.join(self.path, file_name + '.part')
+        with open(tmp_path, 'wb') as f:
+            np.save(f, records)
+        os.replace(tmp_path, os.path.join(self.path, file_name))
+        self.meta['chunks'].append({'file': file_name, 'rows': len(part)})
+    
+    def _save_meta(self):
+        # Écriture atomique : les lecteurs voient l'ancien ou le nouvel état complet
+        meta_path = os.path.join(self.path, self.META_NAME)
+        with open(meta_path + '.part', 'w') as f:
+            json.dump(self.meta, f)
+        os.replace(meta_path + '.part', meta_path)
+    
+    def clear(self):
+        """Supprime tronçons et dictionnaires : le magasin redevient vide"""
+        for chunk in self.meta['chunks']:
+            path = os.path.join(self.path, chunk['file'])
+            if os.path.exists(path):
+                os.remove(path)
+        self.meta = {'schema_version': self.SCHEMA_VERSION, 'columns': [], 'categories': {}, 'chunks': []}
+        self._category_index = {}
+        if os.path.isdir(self.path):
+            self._save_meta()
+    
+    def chunk(self, index):
+        """Tronçon en lecture seule (mmap)"""
+        return np.load(os.path.join(self.path, self.meta['chunks'][index]['file']), mmap_mode='r')
+    
+    def chunks(self):
+        for index in range(self.n_chunks):
+            yield self.chunk(index)
+    
+    def to_frame(self, columns=None):
+        """DataFrame complet (colonnes catégorielles décodées) ; réservé aux petits magasins"""
+        import pandas as pd
+        
+        columns = columns or self.columns
+        frames = []
+        for records in self.chunks():
+            data = {}
+            for name in columns:
+                values = np.asarray(records[name])
+                if name in self.CATEGORICAL_COLUMNS:
+                    values = np.asarray(self.meta['categories'][name], dtype=object)[values]
+                data[name] = values
+            frames.append(pd.DataFrame(data))
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
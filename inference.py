@@ -0,0 +1,915 @@
+# Point d'entrée léger pour l'inférence
+# N'importe que numpy et le runtime du modèle : pas d'entraînement, de graphe ni de téléchargement
+
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+import warnings
+from collections import OrderedDict
+
+import numpy as np
+
+# Les modèles sont entraînés sur un DataFrame mais reçoivent ici des matrices numpy
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
+
+
+class FoldEnsembleRegressor:
+    """Moyenne des modèles déjà entraînés sur les plis de validation croisée"""
+    
+    def __init__(self, estimators):
+        self.estimators_ = estimators
+    
+    def predict(self, X):
+        return np.mean([estimator.predict(X) for estimator in self.estimators_], axis=0)
+
+
+def uses_scaled_features(model):
+    """Vrai si le modèle attend des features normalisées (réseau de neurones)"""
+    if isinstance(model, FoldEnsembleRegressor):
+        model = model.estimators_[0]
+    # Un MLP désérialisé a forcément chargé sklearn.neural_network : inutile de l'importer sinon
+    neural_network = sys.modules.get('sklearn.neural_network')
+    return neural_network is not None and isinstance(model, neural_network.MLPRegressor)
+
+
+class Standardizer:
+    """Normalisation (x - moyenne) / écart-type, identique à StandardScaler.transform"""
+    
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+    
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        if self.mean_ is not None:
+            X -= self.mean_
+        if self.scale_ is not None:
+            X /= self.scale_
+        return X
+
+
+class ClassEncoder:
+    """Encodeur d'étiquettes en lecture seule (classes_ triées, comme LabelEncoder)"""
+    
+    def __init__(self, classes):
+        self.classes_ = classes
+    
+    def transform(self, values):
+        values = np.asarray(values, dtype=str if self.classes_.dtype.kind == 'U' else None)
+        codes = np.searchsorted(self.classes_, values)
+        known = codes < len(self.classes_)
+        known[known] = self.classes_[codes[known]] == values[known]
+        if not known.all():
+            raise ValueError(f"Étiquettes inconnues: {values[~known].tolist()}")
+        return codes
+
+
+class CompiledTreeEnsemble:
+    """Ensemble d'arbres aplati en tableaux, évalué niveau par niveau avec numpy"""
+    
+    ARRAYS = ('feature', 'threshold', 'children', 'value', 'missing_left', 'roots', 'weights')
+    
+    def __init__(self, feature, threshold, children, value, missing_left, roots, weights,
+                 bias=0.0, max_depth=0, source=''):
+        # children[2 * nœud] : enfant gauche, children[2 * nœud + 1] : enfant droit
+        # Une feuille pointe sur elle-même : les niveaux en trop la laissent en place
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.missing_left = missing_left
+        self.roots = roots
+        self.weights = weights
+        self.bias = bias
+        self.max_depth = max_depth
+        self.source = source
+        self._index = None
+    
+    @property
+    def n_trees(self):
+        return len(self.roots)
+    
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+    
+    @staticmethod
+    def _float32_floor(threshold):
+        """Plus grand float32 <= seuil : x32 <= seuil équivaut alors à x32 <= seuil32"""
+        threshold = np.asarray(threshold, dtype=np.float64)
+        rounded = threshold.astype(np.float32)
+        too_high = rounded.astype(np.float64) > threshold
+        rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+        return rounded
+    
+    @classmethod
+    def _from_trees(cls, trees, weights, bias, source):
+        """Concatène des arbres (feature, seuil float32, gauche, droite, valeur, manquant à gauche)"""
+        feature, threshold, children, value, missing_left, roots = [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+        for tree_feature, tree_threshold, tree_left, tree_right, tree_value, tree_missing in trees:
+            n = len(tree_feature)
+            is_leaf = tree_left < 0
+            own = np.arange(n)
+            feature.append(np.where(is_leaf, 0, tree_feature))
+            threshold.append(np.where(is_leaf, 0, tree_threshold).astype(np.float32))
+            children.append(np.stack([np.where(is_leaf, own, tree_left),
+                                      np.where(is_leaf, own, tree_right)], axis=1).ravel() + offset)
+            value.append(tree_value)
+            missing_left.append(tree_missing & ~is_leaf)
+            roots.append(offset)
+            
+            # Profondeur : les enfants ont toujours un indice supérieur à leur parent
+            depth = np.zeros(n, dtype=np.int64)
+            for node in np.flatnonzero(~is_leaf):
+                depth[tree_left[node]] = depth[tree_right[node]] = depth[node] + 1
+            max_depth = max(max_depth, int(depth.max()))
+            offset += n
+        
+        return cls(
+            feature=np.concatenate(feature).astype(np.int32),
+            threshold=np.concatenate(threshold).astype(np.float32),
+            children=np.concatenate(children).astype(np.int32),
+            value=np.concatenate(value).astype(np.float64),
+            missing_left=np.concatenate(missing_left).astype(bool),
+            roots=np.asarray(roots, dtype=np.int32),
+            weights=np.asarray(weights, dtype=np.float64),
+            bias=float(bias),
+            max_depth=max_depth,
+            source=source,
+        )
+    
+    @classmethod
+    def _sklearn_trees(cls, estimators):
+        trees = []
+        for estimator in estimators:
+            tree = estimator.tree_
+            missing = getattr(tree, 'missing_go_to_left', None)
+            trees.append((
+                tree.feature, cls._float32_floor(tree.threshold),
+                tree.children_left, tree.children_right, tree.value[:, 0, 0],
+                np.zeros(tree.node_count, dtype=bool) if missing is None else missing.astype(bool),
+            ))
+        return trees
+    
+    @classmethod
+    def _xgboost_trees(cls, model):
+        booster = model.get_booster()
+        learner = json.loads(booster.save_raw('json'))['learner']
+        if learner['objective']['name'] not in ('reg:squarederror', 'reg:absoluteerror', 'reg:pseudohubererror'):
+            raise ValueError(f"Objectif XGBoost non compilable: {learner['objective']['name']}")
+        gbtree = learner['gradient_booster']
+        if gbtree.get('name') != 'gbtree':
+            raise ValueError(f"Booster XGBoost non compilable: {gbtree.get('name')}")
+        trees = gbtree['model']['trees']
+        
+        # Avec arrêt précoce, predict s'arrête à la meilleure itération
+        best_iteration = getattr(booster, 'best_iteration', None)
+        if best_iteration is not None:
+            trees = trees[:gbtree['model']['iteration_indptr'][best_iteration + 1]]
+        
+        flat = []
+        for tree in trees:
+            if any(tree['split_type']):
+                raise ValueError("Splits catégoriels XGBoost non compilables")
+            left = np.asarray(tree['left_children'], dtype=np.int64)
+            conditions = np.asarray(tree['split_conditions'], dtype=np.float32)
+            # XGBoost va à gauche si x < seuil : x <= précédent float32 du seuil
+            thresholds = np.nextafter(conditions, np.float32(-np.inf))
+            flat.append((
+                np.asarray(tree['split_indices'], dtype=np.int64), thresholds,
+                left, np.asarray(tree['right_children'], dtype=np.int64),
+                # Pour une feuille, split_conditions contient la valeur de la feuille
+                conditions.astype(np.float64),
+                np.asarray(tree['default_left'], dtype=bool),
+            ))
+        bias = float(learner['learner_model_param']['base_score'].strip('[]'))
+        return flat, bias
+    
+    @classmethod
+    def _model_trees(cls, model):
+        """Arbres, poids par arbre, biais et nom du modèle d'origine"""
+        source = type(model).__name__
+        if isinstance(model, FoldEnsembleRegressor):
+            # Moyenne des plis : poids et biais divisés par le nombre de modèles
+            parts = [cls._model_trees(estimator) for estimator in model.estimators_]
+            trees = [tree for part in parts for tree in part[0]]
+            weights = np.concatenate([part[1] for part in parts]) / len(parts)
+            bias = sum(part[2] for part in parts) / len(parts)
+            return trees, weights, bias, f"{source}[{parts[0][3]}]"
+        
+        if hasattr(model, 'get_booster'):
+            trees, bias = cls._xgboost_trees(model)
+            return trees, np.ones(len(trees)), bias, source
+        
+        if hasattr(model, 'init_') and hasattr(model, 'learning_rate'):
+            # Gradient boosting sklearn : constante initiale + taux d'apprentissage × arbres
+            if model.init_ == 'zero':
+                bias = 0.0
+            elif hasattr(model.init_, 'constant_'):
+                bias = float(np.ravel(model.init_.constant_)[0])
+            else:
+                raise ValueError(f"Estimateur initial non compilable: {type(model.init_).__name__}")
+            estimators = [stage[0] for stage in model.estimators_]
+            return cls._sklearn_trees(estimators), np.full(len(estimators), model.learning_rate), bias, source
+        
+        if hasattr(model, 'estimators_') and all(hasattr(e, 'tree_') for e in model.estimators_):
+            # Forêt : moyenne des arbres
+            n = len(model.estimators_)
+            return cls._sklearn_trees(model.estimators_), np.full(n, 1.0 / n), 0.0, source
+        
+        if hasattr(model, 'tree_'):
+            return cls._sklearn_trees([model]), np.ones(1), 0.0, source
+        
+        raise ValueError(f"Modèle non compilable: {source}")
+    
+    @classmethod
+    def from_model(cls, model):
+        """Compile un modèle d'arbres entraîné (XGBoost, forêt, gradient boosting sklearn)"""
+        return cls._from_trees(*cls._model_trees(model))
+    
+    def _index_arrays(self):
+        # Indices en intp une fois pour toutes : numpy indexe plus vite qu'avec des int32
+        if self._index is None:
+            self._index = (self.feature.astype(np.intp), self.children.astype(np.intp),
+                           self.roots.astype(np.intp))
+        return self._index
+    
+    def predict(self, X, chunk_size=1 << 18):
+        """Prédit un lot : tous les arbres descendent d'un niveau à chaque itération"""
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        feature, children, roots = self._index_arrays()
+        has_missing = bool(np.isnan(X).any())
+        out = np.empty(len(X), dtype=np.float64)
+        
+        # Lots de lignes pour borner la matrice (lignes × arbres)
+        rows_per_chunk = max(1, chunk_size // max(1, self.n_trees))
+        for start in range(0, len(X), rows_per_chunk):
+            block = X[start:start + rows_per_chunk]
+            flat = block.ravel()
+            offsets = (np.arange(len(block), dtype=np.intp) * X.shape[1])[:, None]
+            nodes = np.broadcast_to(roots, (len(block), self.n_trees))
+            for _ in range(self.max_depth):
+                x = flat[offsets + feature[nodes]]
+                go_right = x > self.threshold[nodes]
+                if has_missing:
+                    missing = np.isnan(x)
+                    go_right[missing] = ~self.missing_left[nodes[missing]]
+                nodes = children[2 * nodes + go_right]
+            out[start:start + len(block)] = self.bias + self.value[nodes] @ self.weights
+        return out
+    
+    def arrays(self):
+        return {name: getattr(self, name) for name in self.ARRAYS}
+    
+    def params(self):
+        return {'bias': self.bias, 'max_depth': self.max_depth, 'source': self.source}
+
+
+class ModelBundle:
+    """Modèle, normalisation, encodeurs et métadonnées dans un seul fichier versionné"""
+    
+    MAGIC = b'TTBUNDLE'
+    SCHEMA_VERSION = 1
+    FILE_NAME = 'model.bundle'
+    # Alignement des sections : les tableaux projetés en mémoire restent alignés
+    ALIGNMENT = 64
+    _PREFIX = struct.Struct('<IQ')
+    
+    def __init__(self, model, scaler, label_encoders, metadata, version=1, checksum=None):
+        self.model = model
+        self.scaler = scaler
+        self.label_encoders = label_encoders
+        self.metadata = metadata
+        self.version = version
+        self.checksum = checksum
+        self._mmap = None
+    
+    @property
+    def model_id(self):
+        """Identifiant stable du contenu : version + début de la somme de contrôle"""
+        return f"{self.version}-{(self.checksum or '')[:12]}"
+    
+    @classmethod
+    def _align(cls, offset):
+        return -(-offset // cls.ALIGNMENT) * cls.ALIGNMENT
+    
+    def save(self, path):
+        """Écrit le bundle (écriture atomique) ; renvoie la somme de contrôle"""
+        sections = {}
+        chunks = []
+        size = 0
+        
+        def add(name, data, array=None):
+            nonlocal size
+            data = memoryview(data).cast('B')
+            start = self._align(size)
+            chunks.append(b'\0' * (start - size))
+            chunks.append(data)
+            sections[name] = {'offset': start, 'nbytes': data.nbytes}
+            if array is not None:
+                sections[name].update(dtype=array.dtype.str, shape=list(array.shape))
+            size = start + data.nbytes
+        
+        def add_array(name, array):
+            array = np.ascontiguousarray(array)
+            if array.dtype == object:
+                # Les étiquettes deviennent des chaînes de largeur fixe, projetables
+                array = array.astype(str)
+            add(name, array.reshape(-1).view(np.uint8), array)
+        
+        if getattr(self.scaler, 'mean_', None) is not None:
+            add_array('scaler/mean', self.scaler.mean_)
+        if getattr(self.scaler, 'scale_', None) is not None:
+            add_array('scaler/scale', self.scaler.scale_)
+        for name, encoder in self.label_encoders.items():
+            add_array(f'encoder/{name}', encoder.classes_)
+        
+        # Pickle protocole 5 : les tableaux du modèle sont sortis hors bande, en sections alignées
+        buffers = []
+        if not isinstance(self.model, CompiledTreeEnsemble):
+            add('model/pickle', pickle.dumps(self.model, protocol=5, buffer_callback=buffers.append))
+        for i, buffer in enumerate(buffers):
+            add(f'model/buffer/{i}', buffer.raw())
+        
+        # Version compilée des ensembles d'arbres, chargeable sans xgboost ni sklearn
+        compiled = self.compiled_model()
+        if compiled is not None:
+            for name, values in compiled.arrays().items():
+                add_array(f'compiled/{name}', values)
+        
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(chunk)
+        self.checksum = digest.hexdigest()
+        
+        header = json.dumps({
+            'schema_version': self.SCHEMA_VERSION,
+            'version': self.version,
+            'checksum': self.checksum,
+            'data_size': size,
+            'model_buffers': len(buffers),
+            'compiled': compiled.params() if compiled is not None else None,
+            'encoders': list(self.label_encoders),
+            'sections': sections,
+            'metadata': self.metadata,
+        }).encode('utf-8')
+        prefix = self.MAGIC + self._PREFIX.pack(self.SCHEMA_VERSION, len(header)) + header
+        
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(prefix + b'\0' * (self._align(len(prefix)) - len(prefix)))
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+        return self.checksum
+    
+    def compiled_model(self):
+        """Ensemble d'arbres compilé, ou None si le modèle n'en est pas un"""
+        if isinstance(self.model, CompiledTreeEnsemble):
+            return self.model
+        try:
+            return CompiledTreeEnsemble.from_model(self.model)
+        except ValueError:
+            return None
+    
+    @classmethod
+    def read_header(cls, path):
+        """Lit l'en-tête (version, somme de contrôle, métadonnées) sans charger le modèle"""
+        with open(path, 'rb') as f:
+            if f.read(len(cls.MAGIC)) != cls.MAGIC:
+                raise ValueError(f"{path} n'est pas un bundle de modèle")
+            schema_version, header_len = cls._PREFIX.unpack(f.read(cls._PREFIX.size))
+            if schema_version > cls.SCHEMA_VERSION:
+                raise ValueError(f"Version de schéma non supportée: {schema_version}")
+            header = json.loads(f.read(header_len))
+        header['data_offset'] = cls._align(len(cls.MAGIC) + cls._PREFIX.size + header_len)
+        return header
+    
+    @classmethod
+    def load(cls, path, mmap_mode=True, verify=True, compiled=False):
+        """Charge un bundle ; les tableaux numériques sont projetés en mémoire (pages partagées)"""
+        header = cls.read_header(path)
+        with open(path, 'rb') as f:
+            if mmap_mode:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                data = memoryview(mapped)[header['data_offset']:]
+            else:
+                mapped = None
+                f.seek(header['data_offset'])
+                data = memoryview(f.read())
+        
+        if len(data) != header['data_size']:
+            raise ValueError(f"Bundle tronqué: {path}")
+        if verify and hashlib.sha256(data).hexdigest() != header['checksum']:
+            raise ValueError(f"Somme de contrôle invalide: {path}")
+        
+        sections = header['sections']
+        
+        def section(name):
+            entry = sections[name]
+            return data[entry['offset']:entry['offset'] + entry['nbytes']]
+        
+        def array(name):
+            if name not in sections:
+                return None
+            entry = sections[name]
+            return np.frombuffer(section(name), dtype=np.dtype(entry['dtype'])).reshape(entry['shape'])
+        
+        if header['compiled'] is not None and (compiled or 'model/pickle' not in sections):
+            # Évaluateur numpy : le modèle d'origine n'est pas désérialisé
+            model = CompiledTreeEnsemble(**{name: array(f'compiled/{name}')
+                                            for name in CompiledTreeEnsemble.ARRAYS},
+                                         **header['compiled'])
+        else:
+            model = pickle.loads(section('model/pickle'),
+                                 buffers=[section(f'model/buffer/{i}') for i in range(header['model_buffers'])])
+        bundle = cls(
+            model=model,
+            scaler=Standardizer(array('scaler/mean'), array('scaler/scale')),
+            label_encoders={name: ClassEncoder(array(f'encoder/{name}')) for name in header['encoders']},
+            metadata=header['metadata'],
+            version=header['version'],
+            checksum=header['checksum'],
+        )
+        # Les tableaux référencent la projection : elle vit aussi longtemps que le bundle
+        bundle._mmap = mapped
+        return bundle
+    
+    @classmethod
+    def from_directory(cls, model_dir):
+        """Charge l'ancien format (un pickle par composant + metadata.json)"""
+        import joblib
+        
+        label_encoders = {
+            name: joblib.load(f'{model_dir}/{name}_encoder.pkl') for name in ('teacher', 'instance')
+        }
+        with open(f'{model_dir}/metadata.json', 'r') as f:
+            metadata = json.load(f)
+        
+        # Somme de contrôle des pickles : identifie le modèle comme pour un bundle
+        digest = hashlib.sha256()
+        for name in ('timetable_model', 'scaler', 'teacher_encoder', 'instance_encoder'):
+            with open(f'{model_dir}/{name}.pkl', 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(chunk)
+        return cls(joblib.load(f'{model_dir}/timetable_model.pkl'), joblib.load(f'{model_dir}/scaler.pkl'),
+                   label_encoders, metadata, version=0, checksum=digest.hexdigest())
+
+
+class PredictionCache:
+    """Cache LRU des difficultés prédites, clé = features normalisées + version du modèle"""
+    
+    def __init__(self, max_size=10000, ttl_seconds=None):
+        if max_size <= 0:
+            raise ValueError(f"Taille de cache invalide: {max_size}")
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.model_version = None
+        self._entries = OrderedDict()
+        # Le serveur prédit depuis plusieurs threads
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def bind(self, model_version):
+        """Associe le cache à une version de modèle ; vidé si la version change"""
+        with self._lock:
+            if model_version != self.model_version:
+                self._entries.clear()
+                self.model_version = model_version
+    
+    def get(self, key):
+        """Renvoie (trouvé, valeur) ; l'entrée devient la plus récente"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at is None or time.monotonic() < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+                self.expirations += 1
+            self.misses += 1
+            return False, None
+    
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'model_version': self.model_version,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+
+class TimetablePredictor:
+    """Classe pour utiliser le modèle entraîné"""
+    
+    def __init__(self, model_dir='models', mmap_mode=True, compiled=False, cache=None):
+        self.model_dir = model_dir
+        self.mmap_mode = mmap_mode
+        self.compiled = compiled
+        self.cache = cache
+        self._load()
+    
+    def _bundle_path(self):
+        return os.path.join(self.model_dir, ModelBundle.FILE_NAME)
+    
+    def _load(self):
+        if os.path.exists(self._bundle_path()):
+            self.bundle = ModelBundle.load(self._bundle_path(), mmap_mode=self.mmap_mode,
+                                           compiled=self.compiled)
+        else:
+            # Ancien format : un pickle par composant
+            self.bundle = ModelBundle.from_directory(self.model_dir)
+            if self.compiled:
+                self.bundle.model = self.bundle.compiled_model() or self.bundle.model
+        
+        self.model = self.bundle.model
+        self.scaler = self.bundle.scaler
+        self.label_encoders = self.bundle.label_encoders
+        self.metadata = self.bundle.metadata
+        self.model_version = self.bundle.model_id
+        self.model_name = getattr(self.model, 'source', None) or type(self.model).__name__
+        
+        self.feature_names = self.metadata['feature_names']
+        # Médianes d'entraînement pour les champs absents (0 pour les bundles antérieurs)
+        self.feature_defaults = self.metadata.get('feature_defaults', {})
+        self.scaled = uses_scaled_features(self.model)
+        
+        # Un nouveau modèle invalide les prédictions mises en cache
+        if self.cache is not None:
+            self.cache.bind(self.model_version)
+    
+    def reload(self):
+        """Recharge le bundle s'il a changé sur disque ; renvoie True si un nouveau modèle est chargé"""
+        try:
+            header = ModelBundle.read_header(self._bundle_path())
+        except (OSError, ValueError):
+            return False
+        if (header['version'], header['checksum']) == (self.bundle.version, self.bundle.checksum):
+            return False
+        self._load()
+        return True
+    
+    def _course_key(self, course_data):
+        """Clé de cache : valeurs brutes des features dans l'ordre du modèle"""
+        values = tuple(
+            course_data.get(feature[:-len('_encoded')]) if feature.endswith('_encoded')
+            else course_data.get(feature, self.feature_defaults.get(feature, 0))
+            for feature in self.feature_names
+        )
+        try:
+            hash(values)
+        except TypeError:
+            return None
+        return ('course', self.model_version, values)
+    
+    def predict_difficulty(self, course_data):
+        """Prédit la difficulté de planification d'un cours"""
+        key = self._course_key(course_data) if self.cache is not None else None
+        found, difficulty = self.cache.get(key) if key is not None else (False, None)
+        
+        if not found:
+            # Préparer les features
+            features = {}
+            for feature in self.feature_names:
+                if feature.endswith('_encoded'):
+                    # Gestion des variables encodées
+                    original_feature = feature.replace('_encoded', '')
+                    if original_feature in course_data:
+                        try:
+                            encoded_value = self.label_encoders[original_feature].transform([course_data[original_feature]])[0]
+                            features[feature] = encoded_value
+                        except ValueError:
+                            features[feature] = 0  # Valeur inconnue
+                    else:
+                        features[feature] = 0
+                else:
+                    features[feature] = course_data.get(feature, self.feature_defaults.get(feature, 0))
+            
+            # Prédiction
+            feature_vector = np.array([features[f] for f in self.feature_names]).reshape(1, -1)
+            
+            if self.scaled:
+                feature_vector = self.scaler.transform(feature_vector)
+            
+            difficulty = self.model.predict(feature_vector)[0]
+            
+            if key is not None:
+                self.cache.put(key, difficulty)
+        
+        # Classification
+        if difficulty < 0.3:
+            level = "Faible"
+            priority = 3
+        elif difficulty < 0.7:
+            level = "Moyenne"
+            priority = 2
+        else:
+            level = "Élevée"
+            priority = 1
+        
+        return {
+            'difficulty_score': difficulty,
+            'complexity_level': level,
+            'priority': priority,
+            'recommendations': self._get_recommendations(level, course_data)
+        }
+    
+    def _feature_matrix(self, frame):
+        """Construit la matrice de features d'un lot de cours (encodage vectorisé)"""
+        import pandas as pd
+        
+        X = np.zeros((len(frame), len(self.feature_names)), dtype=np.float64)
+        for j, feature in enumerate(self.feature_names):
+            if feature.endswith('_encoded'):
+                original_feature = feature.replace('_encoded', '')
+                if original_feature in frame:
+                    # Codes = position dans classes_ ; valeurs inconnues -> 0
+                    classes = self.label_encoders[original_feature].classes_
+                    codes = pd.Categorical(frame[original_feature], categories=classes).codes
+                    X[:, j] = np.where(codes < 0, 0, codes)
+            else:
+                default = self.feature_defaults.get(feature, 0)
+                if feature in frame:
+                    X[:, j] = pd.to_numeric(frame[feature], errors='coerce').fillna(default).to_numpy(dtype=np.float64)
+                else:
+                    X[:, j] = default
+        return X
+    
+    def _predict_cached(self, X):
+        """Prédit seulement les lignes absentes du cache (clé : ligne de features encodée)"""
+        keys = [('row', self.model_version, row.tobytes()) for row in X]
+        difficulty = np.empty(len(X), dtype=np.float64)
+        missing = []
+        for i, key in enumerate(keys):
+            found, value = self.cache.get(key)
+            if found:
+                difficulty[i] = value
+            else:
+                missing.append(i)
+        
+        if missing:
+            X_missing = X[missing]
+            predicted = self.model.predict(self.scaler.transform(X_missing) if self.scaled else X_missing)
+            difficulty[missing] = predicted
+            for i, value in zip(missing, predicted.tolist()):
+                self.cache.put(keys[i], value)
+        return difficulty
+    
+    def predict_batch(self, courses):
+        """Prédit la difficulté d'un lot de cours (DataFrame, liste de dicts ou tableau structuré)"""
+        # pandas n'est chargé qu'au premier lot (predict_difficulty s'en passe)
+        import pandas as pd
+        
+        if isinstance(courses, pd.DataFrame):
+            frame = courses
+        elif isinstance(courses, np.ndarray) and courses.dtype.names:
+            frame = pd.DataFrame.from_records(courses)
+        else:
+            frame = pd.DataFrame(list(courses))
+        
+        if frame.empty:
+            return pd.DataFrame(columns=['difficulty_score', 'complexity_level',
+                                         'priority', 'recommendations'])
+        
+        # Prédiction en un seul appel au modèle
+        X = self._feature_matrix(frame)
+        if self.cache is None:
+            difficulty = self.model.predict(self.scaler.transform(X) if self.scaled else X)
+        else:
+            difficulty = self._predict_cached(X)
+        
+        # Classification : 0 = Faible, 1 = Moyenne, 2 = Élevée
+        level_codes = np.where(difficulty < 0.3, 0, np.where(difficulty < 0.7, 1, 2))
+        levels = np.array(["Faible", "Moyenne", "Élevée"], dtype=object)
+        priorities = np.array([3, 2, 1])
+        
+        def column(name):
+            if name not in frame:
+                return np.zeros(len(frame))
+            return pd.to_numeric(frame[name], errors='coerce').fillna(0).to_numpy()
+        
+        # Recommandations : une liste par combinaison (niveau, grande salle, étalement)
+        large_room = column('students') > 100
+        spread = column('lectures') > 3
+        options = [
+            self._get_recommendations(levels[code], {'students': 101 if big else 0,
+                                                     'lectures': 4 if wide else 0})
+            for code in range(3) for big in (False, True) for wide in (False, True)
+        ]
+        combos = level_codes * 4 + large_room * 2 + spread
+        
+        return pd.DataFrame({
+            'difficulty_score': difficulty,
+            'complexity_level': levels[level_codes],
+            'priority': priorities[level_codes],
+            'recommendations': [options[combo].copy() for combo in combos.tolist()],
+        }, index=frame.index)
+    
+    def _get_recommendations(self, level, course_data):
+        """Génère des recommandations basées sur la complexité"""
+        recommendations = []
+        
+        if level == "Élevée":
+            recommendations.extend([
+                "Planifier en priorité absolue",
+                "Allouer les meilleurs créneaux",
+                "Prévoir des alternatives",
+                "Assigner une salle adaptée"
+            ])
+        elif level == "Moyenne":
+            recommendations.extend([
+                "Planifier après les cours prioritaires",
+                "Vérifier les contraintes",
+                "Optimiser l'utilisation des ressources"
+            ])
+        else:
+            recommendations.extend([
+                "Flexible pour combler les créneaux",
+                "Peut être reprogrammé si nécessaire"
+            ])
+        
+        # Recommandations spécifiques
+        if course_data.get('students', 0) > 100:
+            recommendations.append("Nécessite une grande salle")
+        
+        if course_data.get('lectures', 0) > 3:
+            recommendations.append("Étaler sur plusieurs jours")
+        
+        return recommendations
+
+
+def import_report(modules=('inference', 'prediction'), top=8):
+    """Mesure le temps d'import de chaque module (python -X importtime)"""
+    import os
+    import subprocess
+    
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get('PYTHONPATH')])))
+    
+    def measure(code):
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                                capture_output=True, text=True, env=env)
+        # Lignes "import time: propre | cumulé | module" ; l'indentation donne la profondeur
+        rows = []
+        for line in result.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            rows.append((int(cumulative), name.strip(), len(name) - len(name.lstrip()) <= 3))
+        return rows
+    
+    # Modules déjà chargés au démarrage de l'interpréteur : hors rapport
+    startup = {name for _, name, _ in measure('pass')}
+    report = {}
+    for module in modules:
+        rows = [row for row in measure(f'import {module}') if row[1] not in startup]
+        total = next((t for t, name, _ in rows if name == module), 0)
+        heaviest = sorted(((t, name) for t, name, top_level in rows
+                           if top_level and name != module), reverse=True)[:top]
+        report[module] = {
+            'total_ms': total / 1000.0,
+            'modules_loaded': len(rows),
+            'heaviest': [(name, t / 1000.0) for t, name in heaviest],
+        }
+        
+        print(f"\nimport {module}: {total / 1000.0:.0f} ms ({len(rows)} modules)")
+        for t, name in heaviest:
+            print(f"  {name:<30} {t / 1000.0:8.1f} ms")
+    return report
+
+
+def _memory_usage():
+    """RSS, PSS et mémoire privée du processus courant en Mo (Linux)"""
+    usage = {}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key in ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty'):
+                    usage[key] = int(value.split()[0]) / 1024.0
+    except OSError:
+        import resource
+        return {'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0}
+    return {
+        'rss_mb': usage.get('Rss', 0.0),
+        'pss_mb': usage.get('Pss', 0.0),
+        'private_mb': usage.get('Private_Clean', 0.0) + usage.get('Private_Dirty', 0.0),
+    }
+
+
+def _load_probe(model_dir, ready, measure, results):
+    """Processus de travail : charge le prédicteur, attend les autres puis mesure sa mémoire"""
+    import time
+    
+    baseline = _memory_usage()
+    start = time.perf_counter()
+    predictor = TimetablePredictor(model_dir)
+    predictor.predict_difficulty({'lectures': 3, 'students': 50})
+    load_time = time.perf_counter() - start
+    ready.put(os.getpid())
+    
+    # Mesure quand tous les processus sont chargés : la PSS reflète alors le partage des pages
+    measure.wait()
+    usage = _memory_usage()
+    results.put({
+        'load_seconds': load_time,
+        **usage,
+        'private_delta_mb': usage.get('private_mb', 0.0) - baseline.get('private_mb', 0.0),
+    })
+
+
+def benchmark_loading(model_dirs, workers=4):
+    """Compare temps de chargement et mémoire par processus de plusieurs répertoires de modèles"""
+    import multiprocessing
+    
+    context = multiprocessing.get_context('spawn')
+    report = {}
+    for model_dir in model_dirs:
+        ready, results, measure = context.Queue(), context.Queue(), context.Event()
+        processes = [context.Process(target=_load_probe, args=(model_dir, ready, measure, results))
+                     for _ in range(workers)]
+        for process in processes:
+            process.start()
+        for _ in processes:
+            ready.get()
+        measure.set()
+        rows = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+        
+        layout = 'bundle' if os.path.exists(os.path.join(model_dir, ModelBundle.FILE_NAME)) else 'pickle'
+        report[model_dir] = summary = {'layout': layout, 'workers': workers}
+        for key in rows[0]:
+            summary[key] = float(np.mean([row[key] for row in rows]))
+        
+        print(f"\n{model_dir} ({layout}, {workers} processus)")
+        for key, value in summary.items():
+            if key not in ('layout', 'workers'):
+                print(f"  {key:<18} {value:10.3f}")
+    return report
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Outils du point d'entrée d'inférence")
+    commands = parser.add_subparsers(dest='command')
+    commands.add_parser('import-report', help="temps d'import (python -X importtime)")
+    convert = commands.add_parser('convert', help="convertit l'ancien format en bundle")
+    convert.add_argument('model_dir')
+    benchmark = commands.add_parser('benchmark', help="temps de chargement et mémoire par processus")
+    benchmark.add_argument('model_dirs', nargs='+')
+    benchmark.add_argument('--workers', type=int, default=4)
+    args = parser.parse_args()
+    
+    if args.command == 'convert':
+        bundle = ModelBundle.from_directory(args.model_dir)
+        bundle.version = 1
+        path = os.path.join(args.model_dir, ModelBundle.FILE_NAME)
+        bundle.save(path)
+        print(f"✓ Bundle écrit: {path} (version {bundle.model_id})")
+    elif args.command == 'benchmark':
+        benchmark_loading(args.model_dirs, args.workers)
+    else:
+        import_report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+# Générateur d'instances ITC 2007 (CCT) synthétiques et reproductibles
+# Sert aux mesures de passage à l'échelle au-delà des 21 instances officielles
+
+import os
+
+import numpy as np
+
+
+class InstanceGenerator:
+    """Écrit des fichiers .ctt valides aux tailles et densités contrôlées"""
+    
+    def __init__(self, courses=100, rooms=10, curricula=50, unavailability=300, room_constraints=0,
+                 days=5, periods_per_day=6, teachers=None, curriculum_size=(2, 8), overlap=0.3,
+                 lectures=(1, 6), students=(5, 300), capacity=(20, 400), campuses=1, seed=0):
+        if courses < 1 or rooms < 1:
+            raise ValueError("Il faut au moins un cours et une salle")
+        if not 0.0 <= overlap <= 1.0:
+            raise ValueError(f"Densité de recouvrement hors de [0, 1]: {overlap}")
+        if campuses < 1 or campuses > min(courses, rooms):
+            raise ValueError(f"Nombre de campus invalide: {campuses}")
+        self.courses = courses
+        self.rooms = rooms
+        self.curricula = curricula
+        self.unavailability = min(unavailability, courses * days * periods_per_day)
+        self.room_constraints = min(room_constraints, courses * rooms)
+        self.days = days
+        self.periods_per_day = periods_per_day
+        self.teachers = teachers or max(1, courses // 2)
+        self.curriculum_size = curriculum_size
+        # Probabilité qu'un cours de curriculum soit déjà membre d'un autre curriculum
+        self.overlap = overlap
+        self.lectures = lectures
+        self.students = students
+        self.capacity = capacity
+        # Campus : cours, salles et curricula partitionnés, sans conflit entre campus
+        self.campuses = campuses
+        self.seed = seed
+    
+    def _courses(self, rng):
+        lectures = rng.integers(self.lectures[0], self.lectures[1] + 1, self.courses)
+        min_days = np.minimum(rng.integers(1, self.days + 1, self.courses), lectures)
+        return {
+            'teacher': rng.integers(0, self.teachers, self.courses),
+            'lectures': lectures,
+            'min_days': min_days,
+            'students': rng.integers(self.students[0], self.students[1] + 1, self.courses),
+        }
+    
+    def _curricula(self, rng, lectures, campus_of_course):
+        """Membres des curricula ; total de séances borné par le nombre de périodes"""
+        n_periods = self.days * self.periods_per_day
+        campus_courses = [np.flatnonzero(campus_of_course == k) for k in range(self.campuses)]
+        used = [[] for _ in range(self.campuses)]
+        # Cours jamais tirés, dans un ordre aléatoire par campus
+        fresh = [rng.permutation(courses).tolist() for courses in campus_courses]
+        is_used = np.zeros(self.courses, dtype=bool)
+        curricula = []
+        for index in range(self.curricula):
+            campus = index % self.campuses
+            pool = campus_courses[campus]
+            size = int(rng.integers(self.curriculum_size[0], self.curriculum_size[1] + 1))
+            members, total = [], 0
+            for _ in range(min(size, len(pool)) * 3):
+                if len(members) >= size:
+                    break
+                # Recouvrement : tirage parmi les cours déjà en curriculum, sinon un cours neuf
+                if used[campus] and rng.random() < self.overlap:
+                    course = used[campus][rng.integers(len(used[campus]))]
+                elif fresh[campus]:
+                    course = fresh[campus].pop()
+                else:
+                    course = int(pool[rng.integers(len(pool))])
+                if course in members or total + lectures[course] > n_periods:
+                    continue
+                members.append(course)
+                total += lectures[course]
+            if not members:
+                members = [int(pool[rng.integers(len(pool))])]
+            for course in members:
+                if not is_used[course]:
+                    is_used[course] = True
+                    used[campus].append(course)
+            curricula.append(members)
+        return curricula
+    
+    def _pairs(self, rng, count, n_rows, n_columns, campus_of_row=None, campus_of_column=None):
+        """Couples (ligne, colonne) distincts, restreints au même campus si demandé"""
+        if not count:
+            return np.zeros((0, 2), dtype=np.int64)
+        flat = rng.choice(n_rows * n_columns, size=count, replace=False)
+        rows, columns = np.divmod(flat, n_columns)
+        if campus_of_row is not None:
+            # Colonne ramenée dans le campus de la ligne (doublons éventuels retirés)
+            columns = campus_of_column[campus_of_row[rows], columns]
+            pairs = np.unique(np.column_stack([rows, columns]), axis=0)
+            return pairs[rng.permutation(len(pairs))]
+        return np.column_stack([rows, columns])
+    
+    def lines(self):
+        """Contenu du fichier .ctt ligne par ligne"""
+        rng = np.random.default_rng(self.seed)
+        courses = self._courses(rng)
+        capacity = rng.integers(self.capacity[0], self.capacity[1] + 1, self.rooms)
+        campus_of_course = np.arange(self.courses) % self.campuses
+        campus_of_room = np.arange(self.rooms) % self.campuses
+        curricula = self._curricula(rng, courses['lectures'], campus_of_course)
+        
+        n_periods = self.days * self.periods_per_day
+        unavailability = self._pairs(rng, self.unavailability, self.courses, n_periods)
+        # Salles interdites choisies parmi les salles du campus du cours
+        rooms_per_campus = self.rooms // self.campuses
+        campus_rooms = np.array([np.flatnonzero(campus_of_room == k)[:rooms_per_campus]
+                                 for k in range(self.campuses)])
+        room_constraints = self._pairs(rng, min(self.room_constraints, self.courses * rooms_per_campus),
+                                       self.courses, rooms_per_campus, campus_of_course, campus_rooms)
+        
+        width = len(str(self.courses - 1))
+        course_ids = [f"c{i:0{width}d}" for i in range(self.courses)]
+        room_ids = [f"r{i}" for i in range(self.rooms)]
+        
+        yield f"Name: synth-{self.courses}-{self.seed}"
+        yield f"Courses: {self.courses}"
+        yield f"Rooms: {self.rooms}"
+        yield f"Days: {self.days}"
+        yield f"Periods_per_day: {self.periods_per_day}"
+        yield f"Curricula: {len(curricula)}"
+        yield f"Constraints: {len(unavailability)}"
+        yield ""
+        yield "COURSES:"
+        for i, (teacher, lectures, min_days, students) in enumerate(zip(
+                courses['teacher'].tolist(), courses['lectures'].tolist(),
+                courses['min_days'].tolist(), courses['students'].tolist())):
+            yield f"{course_ids[i]} t{teacher} {lectures} {min_days} {students}"
+        yield ""
+        yield "ROOMS:"
+        for room_id, room_capacity in zip(room_ids, capacity.tolist()):
+            yield f"{room_id} {room_capacity}"
+        yield ""
+        yield "CURRICULA:"
+        for i, members in enumerate(curricula):
+            yield f"q{i} {len(members)} " + " ".join(course_ids[c] for c in members)
+        yield ""
+        yield "UNAVAILABILITY_CONSTRAINTS:"
+        for course, period in unavailability.tolist():
+            day, slot = divmod(period, self.periods_per_day)
+            yield f"{course_ids[course]} {day} {slot}"
+        if len(room_constraints):
+            yield ""
+            yield "ROOM_CONSTRAINTS:"
+            for course, room in room_constraints.tolist():
+                yield f"{course_ids[course]} {room_ids[room]}"
+        yield ""
+        yield "END."
+    
+    def write(self, path):
+        """Écrit l'instance ; renvoie le chemin"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            for line in self.lines():
+                f.write(line + "\n")
+        return path
+    
+    @classmethod
+    def scaled(cls, courses, seed=0, **overrides):
+        """Paramètres proportionnels au nombre de cours (balayage de tailles)"""
+        params = {
+            'courses': courses,
+            'rooms': max(5, courses // 10),
+            'curricula': max(1, courses // 2),
+            'unavailability': courses * 3,
+            'room_constraints': courses // 5,
+            'seed': seed,
+        }
+        params.update(overrides)
+        return cls(**params)
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Génère une instance ITC 2007 synthétique")
+    parser.add_argument('output')
+    parser.add_argument('--courses', type=int, default=1000)
+    parser.add_argument('--rooms', type=int, default=None)
+    parser.add_argument('--curricula', type=int, default=None)
+    parser.add_argument('--unavailability', type=int, default=None)
+    parser.add_argument('--room-constraints', type=int, default=None)
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--periods-per-day', type=int, default=6)
+    parser.add_argument('--overlap', type=float, default=0.3,
+                        help="densité de recouvrement des curricula (0 à 1)")
+    parser.add_argument('--campuses', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    
+    overrides = {key: value for key, value in (
+        ('rooms', args.rooms), ('curricula', args.curricula),
+        ('unavailability', args.unavailability), ('room_constraints', args.room_constraints),
+    ) if value is not None}
+    generator = InstanceGenerator.scaled(args.courses, args.seed, days=args.days,
+                                         periods_per_day=args.periods_per_day, overlap=args.overlap,
+                                         campuses=args.campuses, **overrides)
+    print(f"✓ Instance écrite: {generator.write(args.output)}")
+
+
+if __name__ == "__main__":
+    main()
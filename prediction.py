@@ -1,284 +1,1530 @@
 # Système Avancé de Planification d'Emploi du Temps Universitaire
 # Basé sur les données ITC 2007 avec Machine Learning
 
+# Les dépendances lourdes (sklearn, xgboost, networkx, scipy, requests) sont importées
+# là où elles servent ; l'inférence seule passe par le module inference
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.model_selection import train_test_split, cross_val_score
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
-from sklearn.neural_network import MLPRegressor
-from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
-import xgboost as xgb
-import requests
 import os
+import time
 import json
+import hashlib
 import joblib
-import networkx as nx
+from array import array
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from itertools import combinations
 import warnings
 warnings.filterwarnings('ignore')
 
+from inference import FoldEnsembleRegressor, ModelBundle, TimetablePredictor, uses_scaled_features
+from profiling import Profiler, profiled_call
+
 class TimetableDataProcessor:
     """Classe pour traiter les données ITC 2007"""
     
-    def __init__(self):
-        self.base_url = "https://raw.githubusercontent.com/Docheinstein/itc2007-cct/master/datasets/"
-        self.datasets_dir = "itc_datasets"
+    SECTION_HEADERS = (
+        'COURSES:',
+        'ROOMS:',
+        'CURRICULA:',
+        'UNAVAILABILITY_CONSTRAINTS:',
+        'ROOM_CONSTRAINTS:',
+    )
+    
+    DEFAULT_BASE_URL = "https://raw.githubusercontent.com/Docheinstein/itc2007-cct/master/datasets/"
+    MANIFEST_NAME = 'manifest.json'
+    
+    def __init__(self, strict=False, base_url=None, datasets_dir="itc_datasets",
+                 mirror_dir=None, offline=False, max_workers=8, timeout=15):
+        self.strict = strict
+        self.base_url = base_url or self.DEFAULT_BASE_URL
+        self.datasets_dir = datasets_dir
+        # Miroir local utilisé à la place du réseau en mode hors ligne
+        self.mirror_dir = mirror_dir
+        self.offline = offline
+        self.max_workers = max_workers
+        self.timeout = timeout
+    
+    def _manifest_path(self):
+        return os.path.join(self.datasets_dir, self.MANIFEST_NAME)
+    
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path(), 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def _save_manifest(self, manifest):
+        tmp_path = self._manifest_path() + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path())
+    
+    @staticmethod
+    def _sha256(file_path, chunk_size=1 << 20):
+        """Empreinte SHA-256 d'un fichier téléchargé"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def _is_verified(self, file_path, entry):
+        """Vrai si le fichier local correspond à l'empreinte du manifeste"""
+        if not entry or not os.path.exists(file_path):
+            return False
+        return self._sha256(file_path) == entry.get('sha256')
+    
+    def _fetch(self, session, instance, entry):
+        """Télécharge une instance ; renvoie (statut, entrée de manifeste)"""
+        import requests
         
-    def download_datasets(self):
+        file_path = os.path.join(self.datasets_dir, instance)
+        verified = self._is_verified(file_path, entry)
+        
+        # Requête conditionnelle si la copie locale est intacte
+        headers = {}
+        if verified:
+            if entry.get('etag'):
+                headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'):
+                headers['If-Modified-Since'] = entry['last_modified']
+        
+        try:
+            response = session.get(self.base_url + instance, headers=headers, timeout=self.timeout)
+        except requests.RequestException:
+            if verified:
+                return 'local', entry
+            raise
+        
+        if response.status_code == 304 and verified:
+            return 'inchangé', entry
+        response.raise_for_status()
+        
+        # Écriture atomique : fichier temporaire puis renommage
+        tmp_path = file_path + '.part'
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(response.content)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            # Corps interrompu ou écriture en échec : pas de fichier partiel laissé derrière
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        
+        return 'téléchargé', {
+            'sha256': hashlib.sha256(response.content).hexdigest(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+        }
+    
+    def download_datasets(self, instances=None):
         """Télécharge les datasets ITC 2007"""
+        import requests
+        
+        instances = instances or [f"comp{i:02d}.ctt" for i in range(1, 22)]
+        
+        if self.offline:
+            return self._offline_datasets(instances)
+        
         os.makedirs(self.datasets_dir, exist_ok=True)
-        instances = [f"comp{i:02d}.ctt" for i in range(1, 22)]
+        manifest = self._load_manifest()
         successful_downloads = []
         
         print("Téléchargement des datasets ITC 2007...")
-        for instance in instances:
-            try:
-                url = self.base_url + instance
-                response = requests.get(url, timeout=15)
-                if response.status_code == 200:
-                    file_path = f"{self.datasets_dir}/{instance}"
-                    with open(file_path, 'w', encoding='utf-8') as f:
-                        f.write(response.text)
-                    successful_downloads.append(file_path)
-                    print(f"✓ {instance}")
-            except Exception as e:
-                print(f"✗ Erreur {instance}: {str(e)}")
+        # Une session partagée : connexions HTTP réutilisées entre les requêtes
+        with requests.Session() as session:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = [executor.submit(self._fetch, session, instance, manifest.get(instance))
+                           for instance in instances]
+                for instance, future in zip(instances, futures):
+                    try:
+                        status, entry = future.result()
+                    except Exception as e:
+                        print(f"✗ Erreur {instance}: {str(e)}")
+                        continue
+                    manifest[instance] = entry
+                    successful_downloads.append(os.path.join(self.datasets_dir, instance))
+                    print(f"✓ {instance} ({status})")
         
+        self._save_manifest(manifest)
         print(f"Téléchargement terminé: {len(successful_downloads)} fichiers")
         return successful_downloads
     
-    def parse_instance(self, file_path):
-        """Parse une instance ITC"""
-        data = {
-            'metadata': {},
-            'courses': [],
-            'rooms': [],
-            'curricula': [],
-            'unavailability': [],
-            'room_constraints': []
-        }
+    def _offline_datasets(self, instances):
+        """Mode hors ligne : fichiers du miroir local ou copies déjà vérifiées"""
+        manifest = self._load_manifest()
+        available = []
+        for instance in instances:
+            if self.mirror_dir:
+                file_path = os.path.join(self.mirror_dir, instance)
+                found = os.path.exists(file_path)
+            else:
+                file_path = os.path.join(self.datasets_dir, instance)
+                found = self._is_verified(file_path, manifest.get(instance))
+            
+            if found:
+                available.append(file_path)
+            else:
+                print(f"✗ {instance} absent hors ligne")
+        
+        print(f"Mode hors ligne: {len(available)} fichiers disponibles")
+        return available
+    
+    def parse_instance(self, file_path, strict=None):
+        """Parse une instance ITC en une seule passe sur les lignes"""
+        strict = self.strict if strict is None else strict
+        builder = _InstanceBuilder(os.path.basename(file_path).replace('.ctt', ''))
+        section, block, block_start = None, [], 0
+        
+        def error(line_no, message):
+            # Sans numéro de ligne pour les problèmes portant sur tout le fichier
+            location = file_path if line_no is None else f"{file_path}:{line_no}"
+            message = f"{location}: {message}"
+            if strict:
+                raise ValueError(message)
+            print(f"Erreur parsing {message}")
         
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
+                for line_no, raw_line in enumerate(f, 1):
+                    line = raw_line.strip()
+                    
+                    # Une ligne vide, un en-tête ou END. termine le bloc courant
+                    if not line or line in self.SECTION_HEADERS or line == 'END.':
+                        if block:
+                            builder.add_block(section, block, block_start, error)
+                            block = []
+                        section = line if line in self.SECTION_HEADERS else None
+                        block_start = line_no + 1
+                        if line == 'END.':
+                            break
+                        continue
+                    
+                    if section is not None:
+                        block.append(line)
+                    elif ':' in line:
+                        key, value = line.split(':', 1)
+                        builder.add_metadata(key, value)
+                    else:
+                        error(line_no, f"ligne hors section: {line!r}")
+                
+                if block:
+                    builder.add_block(section, block, block_start, error)
+        except (OSError, UnicodeDecodeError) as e:
+            if strict:
+                raise
+            error(None, str(e))
+        
+        instance = builder.build()
+        if strict:
+            for problem in instance.validate():
+                error(None, problem)
+        return instance
+
+
+class _InstanceBuilder:
+    """Accumule les enregistrements d'un fichier .ctt pendant le parsing"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.metadata = {}
+        self.course_index, self.teacher_index = {}, {}
+        self.room_index, self.curriculum_index = {}, {}
+        # Tampons entiers compacts (non suivis par le ramasse-miettes)
+        self.courses = array('i')
+        self.room_capacity = array('i')
+        self.curriculum_size = array('i')
+        self.members = array('i')
+        self.unavailability = array('i')
+        self.room_constraints = array('i')
+    
+    @staticmethod
+    def _intern(index, key):
+        if key not in index:
+            index[key] = len(index)
+        return index[key]
+    
+    def add_metadata(self, key, value):
+        key, value = key.strip().lower(), value.strip()
+        try:
+            self.metadata[key] = int(value)
+        except ValueError:
+            self.metadata[key] = value
+    
+    def add_block(self, section, lines, first_line_no, error):
+        """Ajoute les lignes d'une section (traitement en bloc si possible)"""
+        handlers = {
+            'COURSES:': (self.add_course, self._course_block),
+            'ROOMS:': (self.add_room, None),
+            'CURRICULA:': (self.add_curriculum, None),
+            'UNAVAILABILITY_CONSTRAINTS:': (self.add_unavailability, self._unavailability_block),
+            'ROOM_CONSTRAINTS:': (self.add_room_constraint, self._room_constraint_block),
+        }
+        add_line, add_fast = handlers[section]
+        
+        # Chemin rapide : bloc homogène converti d'un coup, sinon ligne par ligne
+        if add_fast is not None and add_fast(lines):
+            return
+        
+        for offset, line in enumerate(lines):
+            try:
+                add_line(line.split())
+            except IndexError:
+                error(first_line_no + offset, f"champs manquants: {line!r}")
+            except ValueError as e:
+                error(first_line_no + offset, str(e))
+    
+    @staticmethod
+    def _tokens(lines, width):
+        """Découpe un bloc dont chaque ligne a exactement `width` champs"""
+        text = ' '.join(lines)
+        if '\t' in text or any(line.count(' ') != width - 1 for line in lines):
+            return None
+        tokens = text.split()
+        return tokens if len(tokens) == width * len(lines) else None
+    
+    def _course_block(self, lines):
+        tokens = self._tokens(lines, 5)
+        if tokens is None:
+            return False
+        course_ids = tokens[0::5]
+        if len(set(course_ids)) != len(course_ids) or any(c in self.course_index for c in course_ids):
+            return False
+        try:
+            columns = [list(map(int, tokens[k::5])) for k in (2, 3, 4)]
+        except ValueError:
+            return False
+        teacher_index = self.teacher_index
+        teachers = [teacher_index.setdefault(t, len(teacher_index)) for t in tokens[1::5]]
+        for course_id in course_ids:
+            self.course_index[course_id] = len(self.course_index)
+        block = np.empty((len(course_ids), 4), dtype=np.int32)
+        block[:, 0] = teachers
+        block[:, 1], block[:, 2], block[:, 3] = columns
+        self.courses.frombytes(block.tobytes())
+        return True
+    
+    def _unavailability_block(self, lines):
+        tokens = self._tokens(lines, 3)
+        if tokens is None:
+            return False
+        get = self.course_index.get
+        courses = [get(course_id, -1) for course_id in tokens[0::3]]
+        if -1 in courses:
+            return False
+        try:
+            days, periods = list(map(int, tokens[1::3])), list(map(int, tokens[2::3]))
+        except ValueError:
+            return False
+        block = np.empty((len(courses), 3), dtype=np.int32)
+        block[:, 0], block[:, 1], block[:, 2] = courses, days, periods
+        self.unavailability.frombytes(block.tobytes())
+        return True
+    
+    def _room_constraint_block(self, lines):
+        tokens = self._tokens(lines, 2)
+        if tokens is None:
+            return False
+        get_course, get_room = self.course_index.get, self.room_index.get
+        courses = [get_course(course_id, -1) for course_id in tokens[0::2]]
+        rooms = [get_room(room_id, -1) for room_id in tokens[1::2]]
+        if -1 in courses or -1 in rooms:
+            return False
+        block = np.empty((len(courses), 2), dtype=np.int32)
+        block[:, 0], block[:, 1] = courses, rooms
+        self.room_constraints.frombytes(block.tobytes())
+        return True
+    
+    def add_course(self, parts):
+        lectures, min_days, students = int(parts[2]), int(parts[3]), int(parts[4])
+        if parts[0] in self.course_index:
+            raise ValueError(f"cours dupliqué: {parts[0]}")
+        self.course_index[parts[0]] = len(self.course_index)
+        teacher = self._intern(self.teacher_index, parts[1])
+        self.courses.extend((teacher, lectures, min_days, students))
+    
+    def add_room(self, parts):
+        capacity = int(parts[1])
+        if parts[0] in self.room_index:
+            raise ValueError(f"salle dupliquée: {parts[0]}")
+        self.room_index[parts[0]] = len(self.room_index)
+        self.room_capacity.append(capacity)
+    
+    def add_curriculum(self, parts):
+        declared = int(parts[1])
+        if parts[0] in self.curriculum_index:
+            raise ValueError(f"curriculum dupliqué: {parts[0]}")
+        curriculum = self._intern(self.curriculum_index, parts[0])
+        self.curriculum_size.append(declared)
+        get = self.course_index.get
+        unknown = []
+        for course_id in parts[2:]:
+            course = get(course_id)
+            if course is None:
+                unknown.append(course_id)
+            else:
+                self.members.extend((curriculum, course))
+        if unknown:
+            raise ValueError(f"cours inconnus dans {parts[0]}: {' '.join(unknown)}")
+        if declared != len(parts) - 2:
+            raise ValueError(f"{parts[0]} déclare {declared} cours, {len(parts) - 2} listés")
+    
+    def add_unavailability(self, parts):
+        day, period = int(parts[1]), int(parts[2])
+        course = self.course_index.get(parts[0])
+        if course is None:
+            raise ValueError(f"cours inconnu: {parts[0]}")
+        self.unavailability.extend((course, day, period))
+    
+    def add_room_constraint(self, parts):
+        room_id = parts[1]
+        course = self.course_index.get(parts[0])
+        if course is None:
+            raise ValueError(f"cours inconnu: {parts[0]}")
+        # Salle inconnue conservée avec l'indice -1 (signalée en mode strict)
+        room = self.room_index.get(room_id, -1)
+        self.room_constraints.extend((course, room))
+        if room < 0:
+            raise ValueError(f"salle inconnue: {room_id}")
+    
+    def build(self):
+        def table(buffer, width):
+            return np.frombuffer(buffer, dtype=np.int32).reshape(-1, width).copy()
+        
+        def ids(index):
+            return np.array(list(index), dtype=str)
+        
+        courses = table(self.courses, 4)
+        return TimetableInstance(
+            name=self.name,
+            metadata=self.metadata,
+            course_ids=ids(self.course_index),
+            course_teacher=courses[:, 0].copy(),
+            course_lectures=courses[:, 1].copy(),
+            course_min_days=courses[:, 2].copy(),
+            course_students=courses[:, 3].copy(),
+            teacher_ids=ids(self.teacher_index),
+            room_ids=ids(self.room_index),
+            room_capacity=table(self.room_capacity, 1).ravel(),
+            curriculum_ids=ids(self.curriculum_index),
+            curriculum_size=table(self.curriculum_size, 1).ravel(),
+            curriculum_members=table(self.members, 2),
+            unavailability=table(self.unavailability, 3),
+            room_constraints=table(self.room_constraints, 2),
+        )
+
+
+class TimetableInstance:
+    """Instance ITC compacte : tableaux NumPy typés indexés par entiers"""
+    
+    def __init__(self, name, metadata, course_ids, course_teacher, course_lectures,
+                 course_min_days, course_students, teacher_ids, room_ids, room_capacity,
+                 curriculum_ids, curriculum_size, curriculum_members, unavailability,
+                 room_constraints):
+        self.name = name
+        self.metadata = metadata
+        # Cours : identifiants et attributs alignés sur l'indice entier
+        self.course_ids = course_ids
+        self.course_teacher = course_teacher
+        self.course_lectures = course_lectures
+        self.course_min_days = course_min_days
+        self.course_students = course_students
+        self.teacher_ids = teacher_ids
+        # Salles
+        self.room_ids = room_ids
+        self.room_capacity = room_capacity
+        # Curricula : paires (curriculum, cours) en colonnes
+        self.curriculum_ids = curriculum_ids
+        self.curriculum_size = curriculum_size
+        self.curriculum_members = curriculum_members
+        # Contraintes : (cours, jour, période) et (cours, salle)
+        self.unavailability = unavailability
+        self.room_constraints = room_constraints
+        
+        self.course_index = {course_id: i for i, course_id in enumerate(course_ids.tolist())}
+        self.room_index = {room_id: i for i, room_id in enumerate(room_ids.tolist())}
+    
+    @property
+    def n_courses(self):
+        return len(self.course_ids)
+    
+    @property
+    def n_rooms(self):
+        return len(self.room_ids)
+    
+    @property
+    def n_curricula(self):
+        return len(self.curriculum_ids)
+    
+    @property
+    def days(self):
+        return self.metadata.get('days', 5)
+    
+    @property
+    def periods_per_day(self):
+        return self.metadata.get('periods_per_day', 6)
+    
+    def validate(self):
+        """Liste les incohérences entre l'en-tête et le contenu"""
+        problems = []
+        for key, count in (('courses', self.n_courses), ('rooms', self.n_rooms),
+                           ('curricula', self.n_curricula)):
+            declared = self.metadata.get(key)
+            if declared is not None and declared != count:
+                problems.append(f"{key}: {declared} déclarés, {count} lus")
+        
+        if len(self.unavailability):
+            days, periods = self.unavailability[:, 1], self.unavailability[:, 2]
+            if (days < 0).any() or (days >= self.days).any():
+                problems.append("jour d'indisponibilité hors limites")
+            if (periods < 0).any() or (periods >= self.periods_per_day).any():
+                problems.append("période d'indisponibilité hors limites")
+        return problems
+
+
+class ConflictGraph:
+    """Graphe de conflits creux (CSR) indexé par des entiers de cours"""
+    
+    def __init__(self, n_nodes, curriculum_index, course_index):
+        """Construit l'adjacence à partir des appartenances (curriculum, cours)"""
+        self.n_nodes = n_nodes
+        # Deux cours sont en conflit s'ils partagent au moins un curriculum
+        adjacency = self.shared_curricula(n_nodes, curriculum_index, course_index)
+        adjacency.data[:] = 1
+        self.adjacency = adjacency
+    
+    @staticmethod
+    def shared_curricula(n_nodes, curriculum_index, course_index):
+        """Nombre de curricula partagés par chaque paire de cours distincts (CSR)"""
+        from scipy import sparse
+        
+        n_curricula = int(curriculum_index.max()) + 1 if len(curriculum_index) else 0
+        
+        # Matrice d'incidence curricula × cours (doublons ramenés à 1)
+        incidence = sparse.csr_matrix(
+            (np.ones(len(course_index), dtype=np.int32), (curriculum_index, course_index)),
+            shape=(n_curricula, n_nodes)
+        )
+        incidence.data[:] = 1
+        
+        shared = (incidence.T @ incidence).tocsr()
+        shared.setdiag(0)
+        shared.eliminate_zeros()
+        shared.sort_indices()
+        return shared
+    
+    @classmethod
+    def from_instance(cls, instance):
+        """Crée le graphe depuis une instance parsée (indices entiers des cours)"""
+        members = instance.curriculum_members
+        return cls(instance.n_courses, members[:, 0], members[:, 1])
+    
+    def degree(self):
+        """Degré de conflit de chaque cours"""
+        return np.diff(self.adjacency.indptr)
+    
+    def triangles(self, chunk_size=4096):
+        """Nombre de triangles passant par chaque cours"""
+        A = self.adjacency
+        counts = np.zeros(self.n_nodes, dtype=np.int64)
+        # Traitement par blocs de lignes pour borner la mémoire de A·A
+        for start in range(0, self.n_nodes, chunk_size):
+            rows = A[start:start + chunk_size]
+            paths = (rows @ A).multiply(rows)
+            counts[start:start + chunk_size] = np.asarray(paths.sum(axis=1)).ravel()
+        return counts // 2
+    
+    def clustering(self):
+        """Coefficient de clustering local (identique à nx.clustering)"""
+        return self.local_clustering(self.degree(), self.triangles())
+    
+    @staticmethod
+    def local_clustering(degree, triangles):
+        """Clustering local à partir des degrés et du nombre de triangles par cours"""
+        degree = np.asarray(degree, dtype=np.int64)
+        links = 2 * np.asarray(triangles, dtype=np.int64)
+        possible = degree * (degree - 1)
+        coefficients = np.zeros(len(degree), dtype=np.float64)
+        mask = links > 0
+        coefficients[mask] = links[mask] / possible[mask]
+        return coefficients
+    
+    def betweenness_centrality(self, k=None, seed=None, batch_size=64):
+        """Centralité d'intermédiarité normalisée (Brandes par BFS matriciel)"""
+        n = self.n_nodes
+        if n < 3:
+            return np.zeros(n, dtype=np.float64)
+        
+        if k is None or k >= n:
+            sources = np.arange(n)
+            k = None
+        else:
+            rng = np.random.default_rng(seed)
+            sources = np.sort(rng.choice(n, size=k, replace=False))
+        
+        A = self.adjacency.astype(np.float64)
+        betweenness = np.zeros(n, dtype=np.float64)
+        
+        # Plusieurs sources traitées en parallèle (une colonne par source)
+        for start in range(0, len(sources), batch_size):
+            batch = sources[start:start + batch_size]
+            columns = np.arange(len(batch))
             
-            lines = content.split('\n')
-            sections = content.split('\n\n')
+            sigma = np.zeros((n, len(batch)))
+            sigma[batch, columns] = 1.0
+            visited = sigma > 0
+            frontier = sigma.copy()
+            levels = [visited.copy()]
             
-            # Parse métadonnées
-            for line in lines:
-                if ':' in line and not any(line.startswith(prefix) for prefix in 
-                    ['COURSES:', 'ROOMS:', 'CURRICULA:', 'UNAVAILABILITY_', 'ROOM_']):
-                    key, value = line.split(':', 1)
-                    try:
-                        data['metadata'][key.strip().lower()] = int(value.strip())
-                    except ValueError:
-                        data['metadata'][key.strip().lower()] = value.strip()
+            # Parcours en largeur niveau par niveau avec comptage des plus courts chemins
+            while True:
+                paths = A @ frontier
+                paths[visited] = 0.0
+                reached = paths > 0
+                if not reached.any():
+                    break
+                sigma[reached] = paths[reached]
+                visited |= reached
+                frontier = paths
+                levels.append(reached)
             
-            # Parse sections
-            for section in sections:
-                section_lines = [line.strip() for line in section.split('\n') if line.strip()]
-                if not section_lines:
-                    continue
-                
-                header = section_lines[0]
-                data_lines = section_lines[1:]
-                
-                if header == 'COURSES:':
-                    for line in data_lines:
-                        parts = line.split()
-                        if len(parts) >= 5:
-                            data['courses'].append({
-                                'id': parts[0],
-                                'teacher': parts[1],
-                                'lectures': int(parts[2]),
-                                'min_days': int(parts[3]),
-                                'students': int(parts[4])
-                            })
-                
-                elif header == 'ROOMS:':
-                    for line in data_lines:
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            data['rooms'].append({
-                                'id': parts[0],
-                                'capacity': int(parts[1])
-                            })
-                
-                elif header == 'CURRICULA:':
-                    for line in data_lines:
-                        parts = line.split()
-                        if len(parts) >= 3:
-                            data['curricula'].append({
-                                'id': parts[0],
-                                'num_courses': int(parts[1]),
-                                'courses': parts[2:]
-                            })
-                
-                elif header == 'UNAVAILABILITY_CONSTRAINTS:':
-                    for line in data_lines:
-                        parts = line.split()
-                        if len(parts) >= 3:
-                            data['unavailability'].append({
-                                'course': parts[0],
-                                'day': int(parts[1]),
-                                'period': int(parts[2])
-                            })
-                
-                elif header == 'ROOM_CONSTRAINTS:':
-                    for line in data_lines:
-                        parts = line.split()
-                        if len(parts) >= 2:
-                            data['room_constraints'].append({
-                                'course': parts[0],
-                                'room': parts[1]
-                            })
-        
-        except Exception as e:
-            print(f"Erreur parsing {file_path}: {str(e)}")
-        
-        return data
+            # Accumulation des dépendances en remontant les niveaux
+            delta = np.zeros((n, len(batch)))
+            safe_sigma = np.where(sigma > 0, sigma, 1.0)
+            for depth in range(len(levels) - 1, 0, -1):
+                coeff = np.where(levels[depth], (1.0 + delta) / safe_sigma, 0.0)
+                contrib = A @ coeff
+                previous = levels[depth - 1]
+                delta[previous] += sigma[previous] * contrib[previous]
+            
+            delta[batch, columns] = 0.0
+            betweenness += delta.sum(axis=1)
+        
+        scale = 1.0 / ((n - 1) * (n - 2))
+        if k is not None:
+            scale *= n / k
+        return betweenness * scale
+
+
+class FeasibilityIndex:
+    """Disponibilités et salles admissibles de chaque cours, en masques de bits"""
+    
+    WORD_BITS = 64
+    # _LOW_BITS[k] : mot dont les k bits de poids faible sont à 1
+    _LOW_BITS = np.array([(1 << k) - 1 for k in range(65)], dtype=np.uint64)
+    
+    def __init__(self, instance):
+        self.days = instance.days
+        self.periods_per_day = instance.periods_per_day
+        self.n_periods = self.days * self.periods_per_day
+        self.n_courses = instance.n_courses
+        self.n_rooms = instance.n_rooms
+        
+        # Disponibilités : bit jour * périodes_par_jour + période à 1 si le cours peut avoir lieu
+        self.availability = self._range_mask(np.zeros(self.n_courses, dtype=np.int64), self.n_periods)
+        unavailability = instance.unavailability.astype(np.int64)
+        course, day, period = unavailability[:, 0], unavailability[:, 1], unavailability[:, 2]
+        valid = (day >= 0) & (day < self.days) & (period >= 0) & (period < self.periods_per_day)
+        bits = day[valid] * self.periods_per_day + period[valid]
+        np.bitwise_and.at(self.availability, (course[valid], bits // self.WORD_BITS),
+                          ~self._bit(bits % self.WORD_BITS))
+        
+        # Salles triées une fois par capacité ; les salles assez grandes forment un suffixe
+        self.room_order = np.argsort(instance.room_capacity, kind='stable')
+        self.sorted_capacity = instance.room_capacity[self.room_order]
+        self.room_rank = np.empty(self.n_rooms, dtype=np.int64)
+        self.room_rank[self.room_order] = np.arange(self.n_rooms)
+        self.first_fitting = np.searchsorted(self.sorted_capacity, instance.course_students, side='left')
+        
+        # ROOM_CONSTRAINTS : salles interdites (dans l'ordre trié), salles inconnues ignorées
+        self.forbidden = np.zeros((self.n_courses, self._words(self.n_rooms)), dtype=np.uint64)
+        constraints = instance.room_constraints.astype(np.int64)
+        known = constraints[:, 1] >= 0
+        bits = self.room_rank[constraints[known, 1]]
+        np.bitwise_or.at(self.forbidden, (constraints[known, 0], bits // self.WORD_BITS),
+                         self._bit(bits % self.WORD_BITS))
+        
+        # Salles admissibles : assez grandes et non interdites
+        self.rooms = self._range_mask(self.first_fitting, self.n_rooms) & ~self.forbidden
+    
+    @classmethod
+    def _words(cls, n_bits):
+        return max(1, -(-n_bits // cls.WORD_BITS))
+    
+    @staticmethod
+    def _bit(positions):
+        return np.left_shift(np.uint64(1), np.asarray(positions, dtype=np.uint64))
+    
+    @classmethod
+    def _range_mask(cls, start, stop, n_bits=None):
+        """Masques ligne à ligne des bits [start, stop) sur n_bits (stop par défaut)"""
+        low = np.arange(cls._words(stop if n_bits is None else n_bits), dtype=np.int64) * cls.WORD_BITS
+        upper = np.clip(stop - low, 0, cls.WORD_BITS)
+        lower = np.clip(np.asarray(start, dtype=np.int64)[:, None] - low, 0, cls.WORD_BITS)
+        return cls._LOW_BITS[upper] & ~cls._LOW_BITS[lower]
+    
+    @staticmethod
+    def popcount(mask):
+        """Nombre de bits à 1 par ligne"""
+        if hasattr(np, 'bitwise_count'):
+            return np.bitwise_count(mask).sum(axis=1, dtype=np.int64)
+        return np.unpackbits(np.ascontiguousarray(mask).view(np.uint8), axis=1).sum(axis=1, dtype=np.int64)
+    
+    @staticmethod
+    def _positions(mask_row):
+        """Indices des bits à 1 d'une ligne de masque"""
+        return np.flatnonzero(np.unpackbits(mask_row.astype('<u8').view(np.uint8), bitorder='little'))
+    
+    def _table(self, mask, n_bits):
+        """Masques dépliés en tableau booléen (lignes x n_bits)"""
+        bits = np.unpackbits(mask.astype('<u8').view(np.uint8), axis=1, bitorder='little')
+        return bits[:, :n_bits].astype(bool)
+    
+    def availability_table(self):
+        """Disponibilités (cours x périodes) en booléens"""
+        return self._table(self.availability, self.n_periods)
+    
+    def forbidden_table(self):
+        """Salles interdites (cours x salles, ordre d'origine) en booléens"""
+        return self._table(self.forbidden, self.n_rooms)[:, self.room_rank]
+    
+    def is_available(self, course, day, period):
+        bit = day * self.periods_per_day + period
+        return bool(self.availability[course, bit // self.WORD_BITS] >> np.uint64(bit % self.WORD_BITS) & np.uint64(1))
+    
+    def available_periods(self, course):
+        """Périodes (jour * périodes_par_jour + période) où le cours peut avoir lieu"""
+        return self._positions(self.availability[course])
+    
+    def feasible_rooms(self, course):
+        """Indices des salles admissibles, par capacité croissante"""
+        return self.room_order[self._positions(self.rooms[course])]
+    
+    def can_place(self, course, room, day, period):
+        """Vrai si le cours peut occuper cette salle à ce créneau"""
+        if not self.is_available(course, day, period):
+            return False
+        rank = self.room_rank[room]
+        return bool(self.rooms[course, rank // self.WORD_BITS] >> np.uint64(rank % self.WORD_BITS) & np.uint64(1))
+    
+    def features(self):
+        """Features de faisabilité de tous les cours (vectorisées)"""
+        available_periods = self.popcount(self.availability)
+        # Jours comportant au moins une période disponible
+        available_days = np.zeros(self.n_courses, dtype=np.int64)
+        for day in range(self.days):
+            start = day * self.periods_per_day
+            day_mask = self._range_mask([start], start + self.periods_per_day, self.n_periods)
+            available_days += (self.availability & day_mask).any(axis=1)
+        return {
+            'available_periods': available_periods,
+            'available_days': available_days,
+            'fitting_rooms': (self.n_rooms - self.first_fitting).astype(np.int64),
+            'feasible_rooms': self.popcount(self.rooms),
+        }
+
+
+class FeatureCache:
+    """Cache disque des features, adressé par le contenu des fichiers .ctt"""
+    
+    def __init__(self, cache_dir='feature_cache', max_size_mb=512):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def file_digest(file_path, chunk_size=1 << 20):
+        """Empreinte SHA-256 du contenu d'un fichier"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    def key(self, file_path, signature):
+        """Clé de cache : contenu du fichier + version/configuration des features"""
+        digest = hashlib.sha256(self.file_digest(file_path).encode())
+        digest.update(signature.encode())
+        return digest.hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npz")
+    
+    def get(self, key):
+        """Retourne (trouvé, features) ; features vaut None pour une instance vide"""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as archive:
+                columns = archive['__columns__'].tolist()
+                data = {}
+                for name in columns:
+                    values = archive[name]
+                    data[name] = values.astype(object) if values.dtype.kind == 'U' else values
+        except (OSError, KeyError, ValueError):
+            self.misses += 1
+            return False, None
+        
+        # Accès récent : l'entrée passe en fin de file pour l'éviction LRU
+        os.utime(path)
+        self.hits += 1
+        return True, (pd.DataFrame(data, columns=columns) if columns else None)
+    
+    def put(self, key, frame):
+        """Enregistre les features d'une instance au format colonnaire .npz"""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        arrays = {}
+        columns = [] if frame is None else list(frame.columns)
+        for name in columns:
+            values = frame[name].to_numpy()
+            arrays[name] = values.astype(str) if values.dtype == object else values
+        
+        tmp_path = self._path(key) + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, __columns__=np.array(columns, dtype=str), **arrays)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+    
+    def entries(self):
+        """Liste (chemin, taille, dernier accès) des entrées du cache"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((os.path.join(self.cache_dir, name), stat.st_size, stat.st_mtime))
+        return entries
+    
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de la taille maximale"""
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total_size = sum(size for _, size, _ in entries)
+        removed = 0
+        for path, size, _ in entries:
+            if total_size <= self.max_size_bytes:
+                break
+            os.remove(path)
+            total_size -= size
+            removed += 1
+        return removed
+    
+    def invalidate(self, keys=None):
+        """Supprime les entrées données, ou tout le cache si keys est None"""
+        if keys is None:
+            paths = [path for path, _, _ in self.entries()]
+        else:
+            paths = [self._path(key) for key in keys if os.path.exists(self._path(key))]
+        for path in paths:
+            os.remove(path)
+        return len(paths)
+
 
 class FeatureExtractor:
     """Classe pour extraire les features des données ITC"""
     
-    def create_conflict_graph(self, instance_data):
+    CENTRALITY_MODES = ('exact', 'approx', 'auto')
+    GRAPH_BACKENDS = ('sparse', 'networkx')
+    # À incrémenter à chaque modification du calcul des features (invalide le cache)
+    FEATURE_VERSION = 2
+    
+    def __init__(self, centrality_mode='auto', centrality_samples=256,
+                 approx_threshold=1000, random_state=42, graph_backend='sparse',
+                 cache=None, profiler=None):
+        if centrality_mode not in self.CENTRALITY_MODES:
+            raise ValueError(f"Mode de centralité inconnu: {centrality_mode}")
+        if graph_backend not in self.GRAPH_BACKENDS:
+            raise ValueError(f"Backend de graphe inconnu: {graph_backend}")
+        self.centrality_mode = centrality_mode
+        # 'networkx' reste disponible comme implémentation de référence
+        self.graph_backend = graph_backend
+        # Nombre de pivots pour l'estimation approchée (mode 'approx')
+        self.centrality_samples = centrality_samples
+        # Au-delà de ce nombre de cours, le mode 'auto' passe en approché
+        self.approx_threshold = approx_threshold
+        self.random_state = random_state
+        # FeatureCache optionnel : seules les instances nouvelles ou modifiées sont recalculées
+        self.cache = cache
+        # Mesures par étape (désactivées par défaut)
+        self.profiler = profiler or Profiler()
+    
+    def cache_signature(self):
+        """Version et paramètres qui influencent les features calculées"""
+        return json.dumps({
+            'version': self.FEATURE_VERSION,
+            'centrality_mode': self.centrality_mode,
+            'centrality_samples': self.centrality_samples,
+            'approx_threshold': self.approx_threshold,
+            'random_state': self.random_state,
+            'graph_backend': self.graph_backend,
+        }, sort_keys=True)
+    
+    def create_conflict_graph(self, instance):
         """Crée un graphe de conflits entre cours"""
+        import networkx as nx
+        
         G = nx.Graph()
+        G.add_nodes_from(range(instance.n_courses))
         
-        for course in instance_data['courses']:
-            G.add_node(course['id'], **course)
+        members = defaultdict(list)
+        for curriculum, course in instance.curriculum_members.tolist():
+            members[curriculum].append(course)
         
-        for curriculum in instance_data['curricula']:
-            course_pairs = combinations(curriculum['courses'], 2)
-            for c1, c2 in course_pairs:
-                if G.has_node(c1) and G.has_node(c2):
+        for courses in members.values():
+            for c1, c2 in combinations(courses, 2):
+                if c1 != c2:
                     G.add_edge(c1, c2, conflict_type='curriculum')
         
         return G
     
-    def extract_features(self, files):
+    def create_sparse_conflict_graph(self, instance):
+        """Crée le graphe de conflits creux indexé par entiers"""
+        return ConflictGraph.from_instance(instance)
+    
+    def _centrality_pivots(self, n_nodes):
+        """Nombre de pivots à utiliser (None pour le calcul exact)"""
+        mode = self.centrality_mode
+        if mode == 'auto':
+            mode = 'approx' if n_nodes > self.approx_threshold else 'exact'
+        if mode == 'approx' and self.centrality_samples < n_nodes:
+            # Estimation par k pivots : O(k·E) au lieu de O(V·E)
+            return self.centrality_samples
+        return None
+    
+    def compute_centrality(self, conflict_graph):
+        """Calcule la centralité d'intermédiarité une seule fois par instance"""
+        import networkx as nx
+        
+        k = self._centrality_pivots(conflict_graph.number_of_nodes())
+        try:
+            if k is not None:
+                return nx.betweenness_centrality(conflict_graph, k=k, seed=self.random_state)
+            return nx.betweenness_centrality(conflict_graph)
+        except Exception:
+            return {}
+    
+    def graph_features(self, instance):
+        """Calcule les features de réseau de tous les cours en une passe"""
+        if self.graph_backend == 'networkx':
+            import networkx as nx
+            
+            with self.profiler.stage('graph'):
+                conflict_graph = self.create_conflict_graph(instance)
+                nodes = range(instance.n_courses)
+                degree = np.array([conflict_graph.degree(c) for c in nodes])
+                clustering = np.array([nx.clustering(conflict_graph, c) for c in nodes])
+            self.profiler.count('edges', conflict_graph.number_of_edges())
+            with self.profiler.stage('centrality'):
+                centrality = self.compute_centrality(conflict_graph)
+            return {
+                'conflict_degree': degree,
+                'clustering_coefficient': clustering,
+                'betweenness_centrality': np.array([centrality.get(c, 0) for c in nodes]),
+            }
+        
+        with self.profiler.stage('graph'):
+            graph = self.create_sparse_conflict_graph(instance)
+            degree = graph.degree()
+            clustering = graph.clustering()
+        self.profiler.count('edges', int(graph.adjacency.nnz // 2))
+        with self.profiler.stage('centrality'):
+            centrality = self.sparse_centrality(graph)
+        return {
+            'conflict_degree': degree,
+            'clustering_coefficient': clustering,
+            'betweenness_centrality': centrality,
+        }
+    
+    def sparse_centrality(self, graph):
+        """Centralité d'intermédiarité sur le graphe creux (exacte ou par pivots)"""
+        k = self._centrality_pivots(graph.n_nodes)
+        try:
+            return graph.betweenness_centrality(k=k, seed=self.random_state)
+        except Exception:
+            return np.zeros(graph.n_nodes)
+    
+    def instance_features(self, instance, instance_name=None):
+        """Calcule les features de tous les cours d'une instance en colonnes"""
+        # Contraintes regroupées par cours (indices entiers)
+        n_courses = instance.n_courses
+        unavailability_count = np.bincount(instance.unavailability[:, 0], minlength=n_courses).astype(np.int64)
+        room_constraint_count = np.bincount(instance.room_constraints[:, 0], minlength=n_courses).astype(np.int64)
+        return self.feature_frame(instance, self.graph_features(instance), unavailability_count,
+                                  room_constraint_count, instance_name)
+    
+    def feature_frame(self, instance, network, unavailability_count, room_constraint_count,
+                      instance_name=None):
+        """Assemble les colonnes de features à partir des features de réseau et des contraintes"""
+        with self.profiler.stage('features'):
+            frame = self._feature_columns(instance, network, unavailability_count,
+                                          room_constraint_count, instance_name)
+        self.profiler.count('rows', len(frame))
+        return frame
+    
+    def _feature_columns(self, instance, network, unavailability_count, room_constraint_count,
+                         instance_name):
+        instance_name = instance.name if instance_name is None else instance_name
+        n_courses = instance.n_courses
+        
+        # Colonnes de base des cours
+        course_ids = instance.course_ids.astype(object)
+        lectures = instance.course_lectures.astype(np.int64)
+        min_days = instance.course_min_days.astype(np.int64)
+        students = instance.course_students.astype(np.int64)
+        
+        # Statistiques globales
+        total_days = instance.days
+        periods_per_day = instance.periods_per_day
+        total_lectures = int(lectures.sum())
+        total_periods = total_days * periods_per_day
+        avg_room_capacity = np.mean(instance.room_capacity)
+        course_room_ratio = n_courses / instance.n_rooms
+        utilization_pressure = total_lectures / total_periods
+        
+        conflict_degree = network['conflict_degree'].astype(np.int64)
+        
+        def constant(value):
+            return np.full(n_courses, value)
+        
+        columns = {
+            'instance': np.full(n_courses, instance_name, dtype=object),
+            'course_id': course_ids,
+            'lectures': lectures,
+            'min_days': min_days,
+            'students': students,
+            'teacher': instance.teacher_ids[instance.course_teacher].astype(object),
+            'total_courses': constant(n_courses),
+            'total_rooms': constant(instance.n_rooms),
+            'total_days': constant(total_days),
+            'periods_per_day': constant(periods_per_day),
+            'total_curricula': constant(instance.n_curricula),
+            'total_lectures': constant(total_lectures),
+            'avg_room_capacity': constant(avg_room_capacity),
+            # Features calculées
+            'lecture_density': lectures / total_periods,
+            'student_lecture_ratio': students / np.maximum(lectures, 1),
+            'course_room_ratio': constant(course_room_ratio),
+            'utilization_pressure': constant(utilization_pressure),
+            'min_days_constraint_tightness': lectures / np.maximum(min_days, 1),
+            # Features de réseau
+            'conflict_degree': conflict_degree,
+            'conflict_density': conflict_degree / max(n_courses - 1, 1),
+            'clustering_coefficient': network['clustering_coefficient'].astype(np.float64),
+            'betweenness_centrality': network['betweenness_centrality'].astype(np.float64),
+            # Contraintes
+            'unavailability_count': unavailability_count,
+            'unavailability_ratio': unavailability_count / total_periods,
+            'room_constraint_count': room_constraint_count,
+        }
+        
+        # Faisabilité : créneaux et salles réellement utilisables par cours
+        feasibility = FeasibilityIndex(instance).features()
+        columns.update(feasibility)
+        columns['placement_slack'] = (feasibility['available_periods'] * feasibility['feasible_rooms']
+                                      / np.maximum(lectures, 1))
+        
+        # Score de difficulté composite (même ordre de sommation que par cours)
+        difficulty_components = [
+            columns['conflict_degree'] * 0.25,
+            columns['unavailability_count'] * 0.20,
+            columns['lecture_density'] * 0.15,
+            np.minimum(students / 1000, 1) * 0.15,
+            columns['course_room_ratio'] * 0.10,
+            columns['utilization_pressure'] * 0.10,
+            np.maximum(0, lectures - min_days) * 0.05,
+        ]
+        difficulty_score = np.zeros(n_courses)
+        for component in difficulty_components:
+            difficulty_score = difficulty_score + component
+        columns['difficulty_score'] = difficulty_score
+        
+        return pd.DataFrame(columns)
+    
+    def extract_file(self, file_path):
+        """Parse un fichier et calcule ses features (None si instance vide)"""
+        instance_name = os.path.basename(file_path).replace('.ctt', '')
+        with self.profiler.stage('parse'):
+            # Mode strict : fichier absent ou mal formé -> exception, comptée comme échec de l'instance
+            instance = TimetableDataProcessor().parse_instance(file_path, strict=True)
+        self.profiler.count('courses', instance.n_courses)
+        if not instance.n_courses:
+            return None
+        return self.instance_features(instance, instance_name)
+    
+    def extract_features(self, files, n_jobs=1):
         """Extrait les features de tous les fichiers"""
-        all_features = []
+        files = list(files)
+        if n_jobs is None or n_jobs < 0:
+            n_jobs = os.cpu_count() or 1
         
-        processor = TimetableDataProcessor()
+        # Échecs par instance : {instance: message}
+        self.failures = {}
+        results = {}
         
+        # Consultation du cache : seules les instances absentes sont extraites
+        keys = {}
+        pending = []
         for file_path in files:
+            if self.cache is not None:
+                try:
+                    keys[file_path] = self.cache.key(file_path, self.cache_signature())
+                except OSError:
+                    keys[file_path] = None
+                else:
+                    found, frame = self.cache.get(keys[file_path])
+                    if found:
+                        results[file_path] = frame
+                        continue
+            pending.append(file_path)
+        
+        if self.cache is not None:
+            print(f"Cache: {len(files) - len(pending)} instance(s) réutilisée(s), {len(pending)} à extraire")
+        
+        profiler = self.profiler
+        parallel = n_jobs > 1 and len(pending) > 1
+        
+        def collect(file_path, task):
             instance_name = os.path.basename(file_path).replace('.ctt', '')
-            print(f"Traitement {instance_name}...")
-            
-            data = processor.parse_instance(file_path)
-            if not data['courses']:
-                continue
-            
-            conflict_graph = self.create_conflict_graph(data)
-            
-            # Statistiques globales
-            total_lectures = sum(course['lectures'] for course in data['courses'])
-            total_periods = data['metadata'].get('days', 5) * data['metadata'].get('periods_per_day', 6)
-            avg_room_capacity = np.mean([room['capacity'] for room in data['rooms']])
-            
-            # Features par cours
-            for course in data['courses']:
-                course_id = course['id']
-                
-                features = {
-                    'instance': instance_name,
-                    'course_id': course_id,
-                    'lectures': course['lectures'],
-                    'min_days': course['min_days'],
-                    'students': course['students'],
-                    'teacher': course['teacher'],
-                    'total_courses': len(data['courses']),
-                    'total_rooms': len(data['rooms']),
-                    'total_days': data['metadata'].get('days', 5),
-                    'periods_per_day': data['metadata'].get('periods_per_day', 6),
-                    'total_curricula': len(data['curricula']),
-                    'total_lectures': total_lectures,
-                    'avg_room_capacity': avg_room_capacity,
-                }
-                
-                # Features calculées
-                features.update({
-                    'lecture_density': course['lectures'] / total_periods,
-                    'student_lecture_ratio': course['students'] / max(course['lectures'], 1),
-                    'course_room_ratio': len(data['courses']) / len(data['rooms']),
-                    'utilization_pressure': total_lectures / total_periods,
-                    'min_days_constraint_tightness': course['lectures'] / max(course['min_days'], 1),
-                })
-                
-                # Features de réseau
-                if conflict_graph.has_node(course_id):
-                    neighbors = list(conflict_graph.neighbors(course_id))
-                    features.update({
-                        'conflict_degree': len(neighbors),
-                        'conflict_density': len(neighbors) / max(len(data['courses']) - 1, 1),
-                        'clustering_coefficient': nx.clustering(conflict_graph, course_id),
-                    })
-                    
-                    try:
-                        centrality = nx.betweenness_centrality(conflict_graph)
-                        features['betweenness_centrality'] = centrality.get(course_id, 0)
-                    except:
-                        features['betweenness_centrality'] = 0
+            try:
+                frame = task()
+                if profiler.enabled and parallel:
+                    # Tâche exécutée sous profiled_call : mesures du processus de travail
+                    frame, records = frame
+                    profiler.merge(records)
+            except Exception as e:
+                self.failures[instance_name] = f"{type(e).__name__}: {e}"
+                print(f"✗ Erreur {instance_name}: {self.failures[instance_name]}")
+                return
+            results[file_path] = frame
+            if self.cache is not None and keys.get(file_path):
+                self.cache.put(keys[file_path], frame)
+        
+        if not parallel:
+            for file_path in pending:
+                instance_name = os.path.basename(file_path).replace('.ctt', '')
+                print(f"Traitement {instance_name}...")
+                with profiler.stage('instance', instance=instance_name):
+                    collect(file_path, lambda: self.extract_file(file_path))
+        else:
+            # Une tâche par instance ; résultats récupérés dans l'ordre des fichiers
+            workers = min(n_jobs, len(pending))
+            print(f"Traitement de {len(pending)} instances sur {workers} processus...")
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                if profiler.enabled:
+                    futures = [executor.submit(profiled_call, profiler, 'instance',
+                                               {'instance': os.path.basename(file_path).replace('.ctt', '')},
+                                               self.extract_file, file_path)
+                               for file_path in pending]
                 else:
-                    features.update({
-                        'conflict_degree': 0,
-                        'conflict_density': 0,
-                        'clustering_coefficient': 0,
-                        'betweenness_centrality': 0,
-                    })
-                
-                # Contraintes
-                unavail_constraints = [u for u in data['unavailability'] if u['course'] == course_id]
-                features['unavailability_count'] = len(unavail_constraints)
-                features['unavailability_ratio'] = len(unavail_constraints) / total_periods
-                
-                room_constraints = [r for r in data['room_constraints'] if r['course'] == course_id]
-                features['room_constraint_count'] = len(room_constraints)
-                
-                # Score de difficulté composite
-                difficulty_components = {
-                    'conflict_weight': features['conflict_degree'] * 0.25,
-                    'constraint_weight': features['unavailability_count'] * 0.20,
-                    'density_weight': features['lecture_density'] * 0.15,
-                    'student_weight': min(features['students'] / 1000, 1) * 0.15,
-                    'room_pressure_weight': features['course_room_ratio'] * 0.10,
-                    'utilization_weight': features['utilization_pressure'] * 0.10,
-                    'min_days_weight': max(0, course['lectures'] - course['min_days']) * 0.05
-                }
-                
-                features['difficulty_score'] = sum(difficulty_components.values())
-                all_features.append(features)
+                    futures = [executor.submit(self.extract_file, file_path) for file_path in pending]
+                for file_path, future in zip(pending, futures):
+                    collect(file_path, future.result)
+        
+        frames = [results[f] for f in files if results.get(f) is not None]
+        
+        if self.failures:
+            print(f"{len(self.failures)} instance(s) en échec: {', '.join(self.failures)}")
         
-        return pd.DataFrame(all_features)
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+    
+    def extract_to_store(self, files, store, n_jobs=1, batch_files=16, overwrite=False):
+        """Extrait les features par lots de fichiers vers un FeatureStore (mémoire bornée par lot)"""
+        if store.n_rows:
+            # Ajouter à un magasin existant dupliquerait les lignes de part et d'autre du partage test
+            if not overwrite:
+                raise ValueError(f"Magasin de features non vide ({store.n_rows} lignes): {store.path}")
+            store.clear()
+        files = list(files)
+        failures = {}
+        for start in range(0, len(files), batch_files):
+            frame = self.extract_features(files[start:start + batch_files], n_jobs=n_jobs)
+            failures.update(self.failures)
+            store.append(frame)
+        self.failures = failures
+        print(f"✓ Magasin de features: {store.n_rows} lignes, {store.nbytes() / 2**20:.1f} Mo ({store.path})")
+        return store
+
+class IncrementalFeatures:
+    """Features d'une instance tenues à jour par deltas, sans ré-extraction complète"""
+    
+    DELTA_OPS = (
+        'add_course', 'remove_course', 'update_course',
+        'add_curriculum', 'remove_curriculum', 'add_to_curriculum', 'remove_from_curriculum',
+        'add_unavailability', 'remove_unavailability',
+        'add_room_constraint', 'remove_room_constraint',
+        'add_room', 'remove_room',
+    )
+    
+    def __init__(self, instance, extractor=None, refresh_centrality=True):
+        self.extractor = extractor or FeatureExtractor()
+        if self.extractor.graph_backend != 'sparse':
+            raise ValueError("Les mises à jour incrémentales demandent le backend 'sparse'")
+        self.name = instance.name
+        self.metadata = dict(instance.metadata)
+        # False : la centralité n'est recalculée que sur appel explicite de refresh()
+        self.refresh_centrality = refresh_centrality
+        
+        # Cours indexés par emplacement ; un cours supprimé garde son emplacement (inactif)
+        self.course_ids = instance.course_ids.tolist()
+        self.teachers = instance.teacher_ids[instance.course_teacher].tolist()
+        self.lectures = instance.course_lectures.tolist()
+        self.min_days = instance.course_min_days.tolist()
+        self.students = instance.course_students.tolist()
+        self.active = [True] * instance.n_courses
+        self.slots = dict(instance.course_index)
+        
+        # Salles (ordre conservé) et contraintes par emplacement
+        self.rooms = dict(zip(instance.room_ids.tolist(), instance.room_capacity.tolist()))
+        room_ids = instance.room_ids.tolist()
+        self.unavailability = [[] for _ in self.course_ids]
+        for course, day, period in instance.unavailability.tolist():
+            self.unavailability[course].append((day, period))
+        self.room_constraints = [[] for _ in self.course_ids]
+        for course, room in instance.room_constraints.tolist():
+            self.room_constraints[course].append(room_ids[room] if room >= 0 else None)
+        
+        # Curricula : identifiant -> emplacements des cours membres
+        curriculum_ids = instance.curriculum_ids.tolist()
+        self.curricula = {curriculum: set() for curriculum in curriculum_ids}
+        for curriculum, course in instance.curriculum_members.tolist():
+            self.curricula[curriculum_ids[curriculum]].add(course)
+        
+        # Graphe : nombre de curricula partagés par voisin, triangles par cours
+        members = instance.curriculum_members
+        shared = ConflictGraph.shared_curricula(instance.n_courses, members[:, 0], members[:, 1])
+        indptr, indices, data = shared.indptr, shared.indices.tolist(), shared.data.tolist()
+        self.neighbors = [dict(zip(indices[indptr[i]:indptr[i + 1]], data[indptr[i]:indptr[i + 1]]))
+                          for i in range(instance.n_courses)]
+        graph = ConflictGraph.from_instance(instance)
+        self.triangles = graph.triangles().tolist()
+        self.centrality = self.extractor.sparse_centrality(graph).tolist()
+        
+        self.topology_changed = False
+        self._frame = None
+    
+    def _slot(self, course_id):
+        if course_id not in self.slots:
+            raise ValueError(f"Cours inconnu: {course_id}")
+        return self.slots[course_id]
+    
+    def _changed(self, topology=False):
+        self._frame = None
+        self.topology_changed = self.topology_changed or topology
+    
+    def _link(self, a, b):
+        """Un curriculum de plus partagé par a et b ; crée l'arête si besoin"""
+        if b in self.neighbors[a]:
+            self.neighbors[a][b] += 1
+            self.neighbors[b][a] += 1
+            return
+        # Chaque voisin commun ferme un nouveau triangle
+        common = self.neighbors[a].keys() & self.neighbors[b].keys()
+        self.triangles[a] += len(common)
+        self.triangles[b] += len(common)
+        for c in common:
+            self.triangles[c] += 1
+        self.neighbors[a][b] = self.neighbors[b][a] = 1
+        self._changed(topology=True)
+    
+    def _unlink(self, a, b):
+        """Un curriculum partagé de moins ; supprime l'arête au dernier"""
+        self.neighbors[a][b] -= 1
+        self.neighbors[b][a] -= 1
+        if self.neighbors[a][b]:
+            return
+        del self.neighbors[a][b], self.neighbors[b][a]
+        common = self.neighbors[a].keys() & self.neighbors[b].keys()
+        self.triangles[a] -= len(common)
+        self.triangles[b] -= len(common)
+        for c in common:
+            self.triangles[c] -= 1
+        self._changed(topology=True)
+    
+    def add_course(self, course_id, teacher, lectures, min_days, students):
+        if course_id in self.slots:
+            raise ValueError(f"Cours déjà présent: {course_id}")
+        self.slots[course_id] = len(self.course_ids)
+        self.course_ids.append(course_id)
+        self.teachers.append(teacher)
+        self.lectures.append(int(lectures))
+        self.min_days.append(int(min_days))
+        self.students.append(int(students))
+        self.active.append(True)
+        self.unavailability.append([])
+        self.room_constraints.append([])
+        self.neighbors.append({})
+        self.triangles.append(0)
+        self.centrality.append(0.0)
+        # Le nombre de cours entre dans la normalisation de la centralité
+        self._changed(topology=True)
+    
+    def remove_course(self, course_id):
+        slot = self._slot(course_id)
+        for curriculum, members in self.curricula.items():
+            if slot in members:
+                self.remove_from_curriculum(curriculum, course_id)
+        del self.slots[course_id]
+        self.active[slot] = False
+        self.unavailability[slot] = []
+        self.room_constraints[slot] = []
+        self._changed(topology=True)
+    
+    def update_course(self, course_id, teacher=None, lectures=None, min_days=None, students=None):
+        slot = self._slot(course_id)
+        if teacher is not None:
+            self.teachers[slot] = teacher
+        if lectures is not None:
+            self.lectures[slot] = int(lectures)
+        if min_days is not None:
+            self.min_days[slot] = int(min_days)
+        if students is not None:
+            self.students[slot] = int(students)
+        self._changed()
+    
+    def add_curriculum(self, curriculum_id, courses=()):
+        if curriculum_id in self.curricula:
+            raise ValueError(f"Curriculum déjà présent: {curriculum_id}")
+        self.curricula[curriculum_id] = set()
+        self._changed()
+        for course_id in courses:
+            self.add_to_curriculum(curriculum_id, course_id)
+    
+    def remove_curriculum(self, curriculum_id):
+        if curriculum_id not in self.curricula:
+            raise ValueError(f"Curriculum inconnu: {curriculum_id}")
+        for slot in list(self.curricula[curriculum_id]):
+            self.remove_from_curriculum(curriculum_id, self.course_ids[slot])
+        del self.curricula[curriculum_id]
+        self._changed()
+    
+    def add_to_curriculum(self, curriculum_id, course_id):
+        if curriculum_id not in self.curricula:
+            raise ValueError(f"Curriculum inconnu: {curriculum_id}")
+        slot = self._slot(course_id)
+        members = self.curricula[curriculum_id]
+        if slot in members:
+            return
+        for other in members:
+            self._link(slot, other)
+        members.add(slot)
+    
+    def remove_from_curriculum(self, curriculum_id, course_id):
+        if curriculum_id not in self.curricula:
+            raise ValueError(f"Curriculum inconnu: {curriculum_id}")
+        slot = self._slot(course_id)
+        members = self.curricula[curriculum_id]
+        if slot not in members:
+            return
+        members.remove(slot)
+        for other in members:
+            self._unlink(slot, other)
+    
+    def add_unavailability(self, course_id, day, period):
+        self.unavailability[self._slot(course_id)].append((int(day), int(period)))
+        self._changed()
+    
+    def remove_unavailability(self, course_id, day, period):
+        entries = self.unavailability[self._slot(course_id)]
+        if (day, period) not in entries:
+            raise ValueError(f"Indisponibilité inconnue: {course_id} {day} {period}")
+        entries.remove((day, period))
+        self._changed()
+    
+    def add_room_constraint(self, course_id, room_id):
+        self.room_constraints[self._slot(course_id)].append(room_id if room_id in self.rooms else None)
+        self._changed()
+    
+    def remove_room_constraint(self, course_id, room_id):
+        entries = self.room_constraints[self._slot(course_id)]
+        room_id = room_id if room_id in self.rooms else None
+        if room_id not in entries:
+            raise ValueError(f"Contrainte de salle inconnue: {course_id} {room_id}")
+        entries.remove(room_id)
+        self._changed()
+    
+    def add_room(self, room_id, capacity):
+        if room_id in self.rooms:
+            raise ValueError(f"Salle déjà présente: {room_id}")
+        self.rooms[room_id] = int(capacity)
+        self._changed()
+    
+    def remove_room(self, room_id):
+        if room_id not in self.rooms:
+            raise ValueError(f"Salle inconnue: {room_id}")
+        del self.rooms[room_id]
+        # Comme au parsing, une contrainte vers une salle inconnue reste comptée
+        for entries in self.room_constraints:
+            entries[:] = [None if room == room_id else room for room in entries]
+        self._changed()
+    
+    def apply(self, delta):
+        """Applique un delta {'op': ..., paramètres} (ex. {'op': 'update_course', 'course_id': 'c1', 'students': 80})"""
+        delta = dict(delta)
+        op = delta.pop('op', None)
+        if op not in self.DELTA_OPS:
+            raise ValueError(f"Opération de delta inconnue: {op}")
+        getattr(self, op)(**delta)
+    
+    def _active_slots(self):
+        return [slot for slot, active in enumerate(self.active) if active]
+    
+    def to_instance(self):
+        """TimetableInstance équivalente à l'état courant (cours actifs dans l'ordre d'ajout)"""
+        slots = self._active_slots()
+        position = {slot: i for i, slot in enumerate(slots)}
+        teacher_ids = list(dict.fromkeys(self.teachers[slot] for slot in slots))
+        teacher_index = {teacher: i for i, teacher in enumerate(teacher_ids)}
+        room_index = {room: i for i, room in enumerate(self.rooms)}
+        
+        def table(rows, width):
+            return np.array(rows, dtype=np.int32).reshape(-1, width)
+        
+        metadata = dict(self.metadata, courses=len(slots), rooms=len(self.rooms),
+                        curricula=len(self.curricula))
+        return TimetableInstance(
+            name=self.name,
+            metadata=metadata,
+            course_ids=np.array([self.course_ids[slot] for slot in slots], dtype=str),
+            course_teacher=table([teacher_index[self.teachers[slot]] for slot in slots], 1).ravel(),
+            course_lectures=table([self.lectures[slot] for slot in slots], 1).ravel(),
+            course_min_days=table([self.min_days[slot] for slot in slots], 1).ravel(),
+            course_students=table([self.students[slot] for slot in slots], 1).ravel(),
+            teacher_ids=np.array(teacher_ids, dtype=str),
+            room_ids=np.array(list(self.rooms), dtype=str),
+            room_capacity=table(list(self.rooms.values()), 1).ravel(),
+            curriculum_ids=np.array(list(self.curricula), dtype=str),
+            curriculum_size=table([len(members) for members in self.curricula.values()], 1).ravel(),
+            curriculum_members=table([(i, position[slot]) for i, members in enumerate(self.curricula.values())
+                                      for slot in sorted(members)], 2),
+            unavailability=table([(position[slot], day, period) for slot in slots
+                                  for day, period in self.unavailability[slot]], 3),
+            room_constraints=table([(position[slot], room_index.get(room, -1)) for slot in slots
+                                    for room in self.room_constraints[slot]], 2),
+        )
+    
+    def refresh(self):
+        """Recalcule la centralité d'intermédiarité (seule feature globale du graphe)"""
+        slots = self._active_slots()
+        graph = ConflictGraph.from_instance(self.to_instance())
+        for slot, value in zip(slots, self.extractor.sparse_centrality(graph).tolist()):
+            self.centrality[slot] = value
+        self.topology_changed = False
+        self._frame = None
+    
+    def frame(self):
+        """Features courantes, identiques à une ré-extraction complète de to_instance()"""
+        if self.topology_changed and self.refresh_centrality:
+            self.refresh()
+        if self._frame is None:
+            slots = self._active_slots()
+            degree = [len(self.neighbors[slot]) for slot in slots]
+            network = {
+                'conflict_degree': np.array(degree, dtype=np.int64),
+                'clustering_coefficient': ConflictGraph.local_clustering(
+                    degree, [self.triangles[slot] for slot in slots]),
+                'betweenness_centrality': np.array([self.centrality[slot] for slot in slots]),
+            }
+            self._frame = self.extractor.feature_frame(
+                self.to_instance(), network,
+                np.array([len(self.unavailability[slot]) for slot in slots], dtype=np.int64),
+                np.array([len(self.room_constraints[slot]) for slot in slots], dtype=np.int64),
+            )
+        return self._frame
+    
+    def validate(self):
+        """Compare avec une ré-extraction complète ; liste les colonnes divergentes"""
+        current = self.frame()
+        reference = self.extractor.instance_features(self.to_instance())
+        problems = []
+        if list(current.columns) != list(reference.columns) or len(current) != len(reference):
+            return [f"forme: {current.shape} au lieu de {reference.shape}"]
+        for column in reference.columns:
+            if column == 'betweenness_centrality' and self.topology_changed:
+                continue
+            if not current[column].equals(reference[column]):
+                problems.append(f"colonne divergente: {column}")
+        return problems
+
+
+# Données d'entraînement partagées par les processus de travail (une copie par processus)
+_TRAINING_DATA = {}
+
+def _init_training_worker(X_train, X_train_scaled, y_train):
+    _TRAINING_DATA.update(raw=X_train, scaled=X_train_scaled, y=y_train)
+
+def _run_training_task(model, scaled, train_idx, valid_idx, threads):
+    """Entraîne un modèle sur un pli (ou sur tout le jeu si train_idx est None)"""
+    from sklearn.base import clone
+    from sklearn.metrics import r2_score
+    
+    X = _TRAINING_DATA['scaled' if scaled else 'raw']
+    y = _TRAINING_DATA['y']
+    
+    model = clone(model)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=threads)
+    
+    if train_idx is None:
+        model.fit(X, y)
+        return model, None
+    
+    def rows(data, idx):
+        return data.iloc[idx] if hasattr(data, 'iloc') else data[idx]
+    
+    model.fit(rows(X, train_idx), rows(y, train_idx))
+    score = r2_score(rows(y, valid_idx), model.predict(rows(X, valid_idx)))
+    return model, score
+
 
 class TimetableMLModel:
     """Classe principale pour le modèle ML de planification"""
     
-    def __init__(self):
+    FINAL_FIT_MODES = ('refit', 'fold_ensemble')
+    
+    def __init__(self, n_jobs=1, cv_folds=5, final_fit='refit', random_state=42, profiler=None):
+        from sklearn.preprocessing import StandardScaler
+        
+        if final_fit not in self.FINAL_FIT_MODES:
+            raise ValueError(f"Mode d'entraînement final inconnu: {final_fit}")
+        # Budget total de cœurs pour l'entraînement (-1 : tous les cœurs)
+        self.n_jobs = n_jobs
+        self.cv_folds = cv_folds
+        # 'fold_ensemble' réutilise les modèles des plis au lieu d'un réentraînement complet
+        self.final_fit = final_fit
+        self.random_state = random_state
+        self.profiler = profiler or Profiler()
         self.models = {}
         self.best_model = None
         self.scaler = StandardScaler()
         self.label_encoders = {}
         self.feature_names = []
         self.results = {}
-        
+    
+    # Features prédictives
+    FEATURE_NAMES = [
+        'lectures', 'min_days', 'students', 'total_courses', 'total_rooms',
+        'total_days', 'periods_per_day', 'lecture_density', 'student_lecture_ratio',
+        'course_room_ratio', 'utilization_pressure', 'min_days_constraint_tightness',
+        'conflict_degree', 'conflict_density', 'clustering_coefficient',
+        'betweenness_centrality', 'unavailability_count', 'unavailability_ratio',
+        'room_constraint_count', 'available_periods', 'available_days', 'fitting_rooms',
+        'feasible_rooms', 'placement_slack'
+    ]
+    
     def prepare_data(self, df):
         """Prépare les données pour l'entraînement"""
-        # Features prédictives
-        self.feature_names = [
-            'lectures', 'min_days', 'students', 'total_courses', 'total_rooms',
-            'total_days', 'periods_per_day', 'lecture_density', 'student_lecture_ratio',
-            'course_room_ratio', 'utilization_pressure', 'min_days_constraint_tightness',
-            'conflict_degree', 'conflict_density', 'clustering_coefficient',
-            'betweenness_centrality', 'unavailability_count', 'unavailability_ratio',
-            'room_constraint_count'
-        ]
+        from sklearn.preprocessing import LabelEncoder
+        
+        self.feature_names = list(self.FEATURE_NAMES)
         
         # Encodage des variables catégorielles
         self.label_encoders['teacher'] = LabelEncoder()
@@ -294,54 +1540,291 @@ class TimetableMLModel:
         
         return X, y
     
-    def create_models(self):
+    @staticmethod
+    def _feature_defaults(feature_names, X):
+        """Médianes d'entraînement par feature : valeurs de repli des champs absents à l'inférence"""
+        X = np.asarray(X, dtype=np.float64)[:, :len(feature_names)]
+        if not len(X):
+            return {}
+        return {name: float(value) for name, value in zip(feature_names, np.median(X, axis=0))}
+    
+    # Configuration par défaut de chaque famille de modèles
+    DEFAULT_PARAMS = {
+        'XGBoost': {'n_estimators': 200, 'max_depth': 6, 'learning_rate': 0.1},
+        'Random Forest': {'n_estimators': 150, 'max_depth': 12},
+        'Neural Network': {'hidden_layer_sizes': (100, 50), 'max_iter': 1000},
+        'Gradient Boosting': {'n_estimators': 200, 'max_depth': 6, 'learning_rate': 0.1},
+    }
+    
+    # Espaces de recherche (n_estimators des modèles boostés : plafond avant arrêt précoce)
+    SEARCH_SPACES = {
+        'XGBoost': {
+            'n_estimators': [600],
+            'max_depth': [3, 4, 6, 8],
+            'learning_rate': [0.03, 0.05, 0.1, 0.2],
+            'subsample': [0.7, 0.85, 1.0],
+            'colsample_bytree': [0.7, 0.85, 1.0],
+            'min_child_weight': [1, 3, 5],
+        },
+        'Random Forest': {
+            'n_estimators': [100, 150, 300],
+            'max_depth': [8, 12, 16, None],
+            'min_samples_leaf': [1, 2, 4],
+            'max_features': [1.0, 0.5, 'sqrt'],
+        },
+        'Neural Network': {
+            'hidden_layer_sizes': [(100, 50), (64,), (128, 64), (64, 32, 16)],
+            'alpha': [1e-4, 1e-3, 1e-2],
+            'learning_rate_init': [1e-3, 3e-3],
+            'max_iter': [1000],
+        },
+        'Gradient Boosting': {
+            'n_estimators': [600],
+            'max_depth': [3, 4, 6],
+            'learning_rate': [0.05, 0.1, 0.2],
+            'subsample': [0.7, 0.85, 1.0],
+        },
+    }
+    
+    def _make_model(self, name, params):
+        """Instancie un modèle d'une famille avec les paramètres donnés"""
+        import xgboost as xgb
+        from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+        from sklearn.neural_network import MLPRegressor
+        
+        factories = {
+            'XGBoost': xgb.XGBRegressor,
+            'Random Forest': RandomForestRegressor,
+            'Neural Network': MLPRegressor,
+            'Gradient Boosting': GradientBoostingRegressor,
+        }
+        params = dict(params)
+        if 'hidden_layer_sizes' in params:
+            # Les listes viennent de metadata.json
+            params['hidden_layer_sizes'] = tuple(params['hidden_layer_sizes'])
+        return factories[name](random_state=self.random_state, **params)
+    
+    def create_models(self, params=None):
         """Crée les modèles à tester"""
+        params = params or {}
+        self.model_params = {
+            name: dict(defaults, **params.get(name, {}))
+            for name, defaults in self.DEFAULT_PARAMS.items()
+        }
         self.models = {
-            'XGBoost': xgb.XGBRegressor(
-                n_estimators=200,
-                max_depth=6,
-                learning_rate=0.1,
-                random_state=42
-            ),
-            'Random Forest': RandomForestRegressor(
-                n_estimators=150,
-                max_depth=12,
-                random_state=42
-            ),
-            'Neural Network': MLPRegressor(
-                hidden_layer_sizes=(100, 50),
-                max_iter=1000,
-                random_state=42
-            ),
-            'Gradient Boosting': GradientBoostingRegressor(
-                n_estimators=200,
-                max_depth=6,
-                learning_rate=0.1,
-                random_state=42
-            )
+            name: self._make_model(name, model_params)
+            for name, model_params in self.model_params.items()
+        }
+    
+    @staticmethod
+    def load_hyperparameters(model_dir='models'):
+        """Relit la configuration retenue lors d'un entraînement précédent"""
+        try:
+            with open(f'{model_dir}/metadata.json', 'r') as f:
+                return json.load(f).get('hyperparameters')
+        except (OSError, ValueError):
+            return None
+    
+    def _fit_candidate(self, name, params, X_fit, y_fit, X_val, y_val, early_stopping_rounds):
+        """Entraîne une configuration candidate ; renvoie (r2 validation, paramètres finaux)"""
+        from sklearn.metrics import r2_score
+        
+        params = dict(params)
+        fit_kwargs = {}
+        if name == 'XGBoost':
+            params['early_stopping_rounds'] = early_stopping_rounds
+            fit_kwargs = {'eval_set': [(X_val, y_val)], 'verbose': False}
+        
+        model = self._make_model(name, params)
+        model.fit(X_fit, y_fit, **fit_kwargs)
+        
+        # Le nombre d'arbres retenu par l'arrêt précoce devient la configuration finale
+        final_params = {k: v for k, v in params.items() if k != 'early_stopping_rounds'}
+        if name == 'XGBoost':
+            score = r2_score(y_val, model.predict(X_val))
+            final_params['n_estimators'] = int(model.best_iteration) + 1
+        elif name == 'Gradient Boosting':
+            # Même règle de patience que XGBoost, évaluée sur le même jeu de validation
+            best_score, best_iteration = -np.inf, 0
+            for iteration, y_pred in enumerate(model.staged_predict(X_val)):
+                staged_score = r2_score(y_val, y_pred)
+                if staged_score > best_score:
+                    best_score, best_iteration = staged_score, iteration
+                elif iteration - best_iteration >= early_stopping_rounds:
+                    break
+            score = best_score
+            final_params['n_estimators'] = best_iteration + 1
+        else:
+            score = r2_score(y_val, model.predict(X_val))
+        return score, final_params
+    
+    def search_models(self, X, y, budget_seconds=600, max_fits=None, n_candidates=8,
+                      eta=3, min_fraction=1 / 9, early_stopping_rounds=20):
+        """Recherche d'hyperparamètres par réduction successive sous budget"""
+        from sklearn.model_selection import train_test_split
+        from sklearn.preprocessing import StandardScaler
+        
+        start = time.perf_counter()
+        rng = np.random.default_rng(self.random_state)
+        
+        # Même découpage que train_models : le jeu de test n'est jamais consulté
+        X_train, _, y_train, _ = train_test_split(X, y, test_size=0.2, random_state=self.random_state)
+        X_fit, X_val, y_fit, y_val = train_test_split(X_train, y_train, test_size=0.2,
+                                                      random_state=self.random_state)
+        scaler = StandardScaler().fit(X_fit)
+        X_fit_scaled, X_val_scaled = scaler.transform(X_fit), scaler.transform(X_val)
+        
+        # Candidats : configuration par défaut + tirages aléatoires distincts
+        candidates = []
+        for name, space in self.SEARCH_SPACES.items():
+            seen = []
+            for params in [self.DEFAULT_PARAMS[name]] + [
+                    {key: values[rng.integers(len(values))] for key, values in space.items()}
+                    for _ in range(n_candidates * 3)]:
+                if params not in seen and len(seen) <= n_candidates:
+                    seen.append(params)
+                    candidates.append({'name': name, 'params': params, 'rung': -1, 'score': -np.inf})
+        
+        order = rng.permutation(len(X_fit))
+        fits, rung, fraction = 0, 0, min_fraction
+        exhausted = False
+        
+        def over_budget():
+            return ((budget_seconds is not None and time.perf_counter() - start > budget_seconds)
+                    or (max_fits is not None and fits >= max_fits))
+        
+        survivors = candidates
+        while True:
+            idx = order[:max(int(len(X_fit) * fraction), min(len(X_fit), 50))]
+            print(f"  Palier {rung + 1}: {len(survivors)} configurations sur {len(idx)} exemples")
+            
+            for candidate in survivors:
+                if over_budget():
+                    exhausted = True
+                    break
+                scaled = candidate['name'] == 'Neural Network'
+                Xf = X_fit_scaled[idx] if scaled else X_fit.iloc[idx]
+                Xv = X_val_scaled if scaled else X_val
+                score, final_params = self._fit_candidate(
+                    candidate['name'], candidate['params'], Xf, y_fit.iloc[idx], Xv, y_val,
+                    early_stopping_rounds)
+                candidate.update(rung=rung, score=score, final_params=final_params)
+                fits += 1
+            
+            if exhausted or fraction >= 1:
+                break
+            
+            # On garde le meilleur tiers, plus la meilleure configuration de chaque famille
+            ranked = sorted(survivors, key=lambda c: c['score'], reverse=True)
+            keep = ranked[:max(1, int(np.ceil(len(ranked) / eta)))]
+            for name in self.SEARCH_SPACES:
+                best = next((c for c in ranked if c['name'] == name), None)
+                if best is not None and best not in keep:
+                    keep.append(best)
+            survivors = keep
+            fraction = min(1.0, fraction * eta)
+            rung += 1
+        
+        # Meilleure configuration par famille : palier le plus haut, puis score
+        best_params, summary = {}, {}
+        for name in self.SEARCH_SPACES:
+            evaluated = [c for c in candidates if c['name'] == name and c['rung'] >= 0]
+            if not evaluated:
+                continue
+            best = max(evaluated, key=lambda c: (c['rung'], c['score']))
+            best_params[name] = best['final_params']
+            summary[name] = {'validation_r2': float(best['score']), 'rung': best['rung']}
+        
+        self.create_models(params=best_params)
+        self.search_results = {
+            'budget_seconds': budget_seconds,
+            'max_fits': max_fits,
+            'elapsed_seconds': time.perf_counter() - start,
+            'fits': fits,
+            'rungs': rung + 1,
+            'budget_exhausted': exhausted,
+            'best': summary,
         }
+        return self.model_params
+    
+    def _training_tasks(self, n_train):
+        """Liste des entraînements : plis de validation croisée puis modèle complet"""
+        from sklearn.model_selection import KFold
+        
+        # Mêmes indices de plis pour tous les modèles
+        folds = list(KFold(n_splits=self.cv_folds).split(np.arange(n_train)))
+        
+        tasks = []
+        for name, model in self.models.items():
+            scaled = uses_scaled_features(model)
+            if self.final_fit == 'refit':
+                tasks.append((name, None, (model, scaled, None, None)))
+            for k, (train_idx, valid_idx) in enumerate(folds):
+                tasks.append((name, k, (model, scaled, train_idx, valid_idx)))
+        return tasks
     
     def train_models(self, X, y):
         """Entraîne et évalue tous les modèles"""
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+        from sklearn.model_selection import train_test_split
+        
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=self.random_state)
+        self.feature_defaults = self._feature_defaults(self.feature_names, X_train)
         
         # Normalisation pour les modèles qui en ont besoin
         X_train_scaled = self.scaler.fit_transform(X_train)
         X_test_scaled = self.scaler.transform(X_test)
         
-        print("Entraînement des modèles...")
-        for name, model in self.models.items():
-            print(f"  {name}...")
+        n_jobs = self.n_jobs if self.n_jobs and self.n_jobs > 0 else (os.cpu_count() or 1)
+        tasks = self._training_tasks(len(X_train))
+        workers = min(n_jobs, len(tasks))
+        # Cœurs restants répartis entre les tâches (n_jobs des estimateurs)
+        threads = max(1, n_jobs // workers)
+        
+        print(f"Entraînement des modèles ({len(tasks)} entraînements, {workers} processus)...")
+        profiler = self.profiler
+        self.profiler.count('training_rows', len(X_train))
+        
+        def stage_of(fold):
+            # Entraînement complet : 'fit' ; plis : 'cross_validation'
+            return 'fit' if fold is None else 'cross_validation'
+        
+        outputs = {}
+        if workers == 1:
+            _init_training_worker(X_train, X_train_scaled, y_train)
+            for name, fold, args in tasks:
+                print(f"  {name} ({'complet' if fold is None else f'pli {fold + 1}'})...")
+                with profiler.stage(stage_of(fold), model=name, fold=fold):
+                    outputs[name, fold] = _run_training_task(*args, threads)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_training_worker,
+                                     initargs=(X_train, X_train_scaled, y_train)) as executor:
+                if profiler.enabled:
+                    futures = {(name, fold): executor.submit(profiled_call, profiler, stage_of(fold),
+                                                             {'model': name, 'fold': fold},
+                                                             _run_training_task, *args[:4], threads)
+                               for name, fold, args in tasks}
+                else:
+                    futures = {(name, fold): executor.submit(_run_training_task, *args[:4], threads)
+                               for name, fold, args in tasks}
+                for key, future in futures.items():
+                    outputs[key] = future.result()
+                    if profiler.enabled:
+                        outputs[key], records = outputs[key]
+                        profiler.merge(records)
+        
+        for name in self.models:
+            fold_models = [outputs[name, k][0] for k in range(self.cv_folds)]
+            cv_scores = np.array([outputs[name, k][1] for k in range(self.cv_folds)])
             
-            # Choix des données selon le modèle
-            if name == 'Neural Network':
-                model.fit(X_train_scaled, y_train)
-                y_pred = model.predict(X_test_scaled)
-                cv_scores = cross_val_score(model, X_train_scaled, y_train, cv=5, scoring='r2')
+            if self.final_fit == 'refit':
+                model = outputs[name, None][0]
             else:
-                model.fit(X_train, y_train)
-                y_pred = model.predict(X_test)
-                cv_scores = cross_val_score(model, X_train, y_train, cv=5, scoring='r2')
+                model = FoldEnsembleRegressor(fold_models)
+            self.models[name] = model
+            
+            # Choix des données selon le modèle
+            y_pred = model.predict(X_test_scaled if uses_scaled_features(model) else X_test)
             
             # Métriques
             mse = mean_squared_error(y_test, y_pred)
@@ -363,137 +1846,376 @@ class TimetableMLModel:
         
         return best_name, self.results
     
-    def save_model(self, model_dir='models'):
-        """Sauvegarde le modèle et ses composants"""
-        os.makedirs(model_dir, exist_ok=True)
+    def _store_encoders(self, store):
+        """LabelEncoder sur les dictionnaires du magasin et table code du magasin -> code encodé"""
+        from sklearn.preprocessing import LabelEncoder
         
-        # Sauvegarde du modèle
-        joblib.dump(self.best_model, f'{model_dir}/timetable_model.pkl')
-        joblib.dump(self.scaler, f'{model_dir}/scaler.pkl')
-        
-        # Sauvegarde des encodeurs
-        for name, encoder in self.label_encoders.items():
-            joblib.dump(encoder, f'{model_dir}/{name}_encoder.pkl')
+        remaps = {}
+        for name in ('teacher', 'instance'):
+            categories = np.asarray(store.categories(name), dtype=object)
+            encoder = LabelEncoder()
+            encoder.classes_ = np.sort(categories)
+            self.label_encoders[name] = encoder
+            remaps[name] = np.searchsorted(encoder.classes_, categories).astype(np.float32)
+        return remaps
+    
+    def _store_batches(self, store, remaps, test_size, holdout=False):
+        """(X float32, y) de chaque tronçon, partie entraînement ou partie test"""
+        for index in range(store.n_chunks):
+            records = store.chunk(index)
+            # Partage déterministe par tronçon, indépendant de l'ordre de lecture
+            in_test = np.random.default_rng([self.random_state, index]).random(len(records)) < test_size
+            rows = np.flatnonzero(in_test if holdout else ~in_test)
+            if not len(rows):
+                continue
+            X = np.empty((len(rows), len(self.feature_names) + 2), dtype=np.float32)
+            for j, name in enumerate(self.feature_names):
+                X[:, j] = records[name][rows]
+            X[:, -2] = remaps['teacher'][records['teacher'][rows]]
+            X[:, -1] = remaps['instance'][records['instance'][rows]]
+            X[np.isnan(X)] = 0
+            yield X, np.asarray(records['difficulty_score'][rows], dtype=np.float32)
+    
+    def _fit_xgboost_external(self, model, batches, threads):
+        """XGBoost sur matrice quantifiée en mémoire externe (pages en cache disque)"""
+        import shutil
+        import tempfile
         
-        # Métadonnées
-        metadata = {
-            'feature_names': self.feature_names + ['teacher_encoded', 'instance_encoded'],
-            'model_type': type(self.best_model).__name__,
-            'performance': {name: {k: v for k, v in results.items() if k != 'model'} 
-                          for name, results in self.results.items()}
-        }
+        import xgboost as xgb
         
-        with open(f'{model_dir}/metadata.json', 'w') as f:
-            json.dump(metadata, f, indent=2)
+        class StoreIterator(xgb.DataIter):
+            def __init__(self, cache_prefix):
+                super().__init__(cache_prefix=cache_prefix)
+                self._batches = None
+            
+            def next(self, input_data):
+                if self._batches is None:
+                    self._batches = batches()
+                batch = next(self._batches, None)
+                if batch is None:
+                    return False
+                input_data(data=batch[0], label=batch[1])
+                return True
+            
+            def reset(self):
+                self._batches = None
         
-        print(f"Modèle sauvegardé dans {model_dir}/")
-        return model_dir
-
-class TimetablePredictor:
-    """Classe pour utiliser le modèle entraîné"""
+        cache_dir = tempfile.mkdtemp(prefix='xgb-cache-')
+        try:
+            params = model.get_xgb_params()
+            params['nthread'] = threads
+            matrix = xgb.ExtMemQuantileDMatrix(StoreIterator(os.path.join(cache_dir, 'cache')),
+                                               nthread=threads, max_bin=params.get('max_bin'))
+            booster = xgb.train(params, matrix, num_boost_round=model.n_estimators)
+            del matrix
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+        # Réenveloppé en XGBRegressor : même interface que le chemin en mémoire
+        model.load_model(bytearray(booster.save_raw('ubj')))
+        return model
     
-    def __init__(self, model_dir='models'):
-        self.model = joblib.load(f'{model_dir}/timetable_model.pkl')
-        self.scaler = joblib.load(f'{model_dir}/scaler.pkl')
+    def _partial_fit_epochs(self, model, batches, epochs=None):
+        """Passes de partial_fit jusqu'à convergence (critères tol/n_iter_no_change du modèle)"""
+        max_epochs = epochs or model.max_iter
+        best_loss, stalled = np.inf, 0
+        for epoch in range(1, max_epochs + 1):
+            total, rows = 0.0, 0
+            for X, y in batches():
+                model.partial_fit(self.scaler.transform(X), y)
+                total += model.loss_ * len(y)
+                rows += len(y)
+            loss = total / rows
+            stalled = stalled + 1 if loss > best_loss - model.tol else 0
+            best_loss = min(best_loss, loss)
+            if epochs is None and stalled >= model.n_iter_no_change:
+                break
+        return epoch
+    
+    # Taille de l'échantillon des médianes quand aucun modèle n'est sous-échantillonné
+    DEFAULTS_SAMPLE_ROWS = 100000
+    
+    def train_from_store(self, store, memory_limit_mb=1024, test_size=0.2, epochs=None, sample_rows=None):
+        """Entraîne les modèles en lisant le magasin de features tronçon par tronçon"""
+        import xgboost as xgb
+        from sklearn.base import clone
         
-        # Chargement des encodeurs
-        self.label_encoders = {}
-        encoder_files = ['teacher_encoder.pkl', 'instance_encoder.pkl']
-        for encoder_file in encoder_files:
-            name = encoder_file.replace('_encoder.pkl', '')
-            self.label_encoders[name] = joblib.load(f'{model_dir}/{encoder_file}')
+        if not store.n_rows:
+            raise ValueError("Magasin de features vide")
+        if not 0.0 < test_size < 1.0:
+            raise ValueError(f"Part de test hors de ]0, 1[: {test_size}")
+        if not self.models:
+            self.create_models()
         
-        # Métadonnées
-        with open(f'{model_dir}/metadata.json', 'r') as f:
-            self.metadata = json.load(f)
-        
-        self.feature_names = self.metadata['feature_names']
-    
-    def predict_difficulty(self, course_data):
-        """Prédit la difficulté de planification d'un cours"""
-        # Préparer les features
-        features = {}
-        for feature in self.feature_names:
-            if feature.endswith('_encoded'):
-                # Gestion des variables encodées
-                original_feature = feature.replace('_encoded', '')
-                if original_feature in course_data:
-                    try:
-                        encoded_value = self.label_encoders[original_feature].transform([course_data[original_feature]])[0]
-                        features[feature] = encoded_value
-                    except ValueError:
-                        features[feature] = 0  # Valeur inconnue
+        self.feature_names = list(self.FEATURE_NAMES)
+        remaps = self._store_encoders(store)
+        batches = lambda: self._store_batches(store, remaps, test_size)
+        n_jobs = self.n_jobs if self.n_jobs and self.n_jobs > 0 else (os.cpu_count() or 1)
+        subsampled = [name for name, model in self.models.items()
+                      if not isinstance(model, xgb.XGBRegressor) and not hasattr(model, 'partial_fit')]
+        
+        # Échantillon limité au quart du budget : le reste couvre tronçons, copies et arbres
+        row_bytes = 4 * (len(self.feature_names) + 3)
+        capacity = sample_rows or max(1, memory_limit_mb * 2**20 // 4 // row_bytes)
+        if not subsampled:
+            # Petit échantillon conservé pour les médianes de repli
+            capacity = min(capacity, self.DEFAULTS_SAMPLE_ROWS)
+        
+        # Passe 1 : normalisation incrémentale et sous-échantillon (k plus petites clés aléatoires)
+        rng = np.random.default_rng(self.random_state)
+        self.scaler = clone(self.scaler)
+        sample_X = np.empty((0, len(self.feature_names) + 2), dtype=np.float32)
+        sample_y = np.empty(0, dtype=np.float32)
+        sample_keys = np.empty(0)
+        n_train = 0
+        with self.profiler.stage('store_scan'):
+            for X, y in batches():
+                n_train += len(X)
+                self.scaler.partial_fit(X)
+                if not capacity:
+                    continue
+                sample_X = np.concatenate([sample_X, X])
+                sample_y = np.concatenate([sample_y, y])
+                sample_keys = np.concatenate([sample_keys, rng.random(len(X))])
+                if len(sample_keys) > capacity:
+                    keep = np.argpartition(sample_keys, capacity - 1)[:capacity]
+                    sample_X, sample_y, sample_keys = sample_X[keep], sample_y[keep], sample_keys[keep]
+        if not n_train:
+            raise ValueError("Aucune ligne d'entraînement : test_size trop grand pour le magasin")
+        self.profiler.count('training_rows', n_train)
+        self.feature_defaults = self._feature_defaults(self.feature_names, sample_X)
+        print(f"Entraînement sur magasin: {n_train} lignes d'entraînement, "
+              f"{len(sample_y)} lignes en sous-échantillon")
+        
+        # XGBoost : mémoire externe ; réseau de neurones : partial_fit par tronçon ;
+        # autres modèles : sous-échantillon uniforme dimensionné par memory_limit_mb
+        for name, model in self.models.items():
+            model = clone(model)
+            if 'n_jobs' in model.get_params():
+                model.set_params(n_jobs=n_jobs)
+            with self.profiler.stage('fit', model=name, fold=None):
+                if isinstance(model, xgb.XGBRegressor):
+                    print(f"  {name} (mémoire externe)...")
+                    model = self._fit_xgboost_external(model, batches, n_jobs)
+                elif hasattr(model, 'partial_fit'):
+                    epoch = self._partial_fit_epochs(model, batches, epochs)
+                    print(f"  {name} (partial_fit, {epoch} passe(s))...")
                 else:
-                    features[feature] = 0
-            else:
-                features[feature] = course_data.get(feature, 0)
+                    print(f"  {name} (sous-échantillon de {len(sample_y)} lignes)...")
+                    model.fit(self.scaler.transform(sample_X) if uses_scaled_features(model) else sample_X,
+                              sample_y)
+            self.models[name] = model
+        del sample_X, sample_y, sample_keys
+        
+        # Métriques sur la partie test, accumulées tronçon par tronçon
+        totals = {name: [0.0, 0.0] for name in self.models}
+        n_test, sum_y, sum_y2 = 0, 0.0, 0.0
+        with self.profiler.stage('evaluate'):
+            for X, y in self._store_batches(store, remaps, test_size, holdout=True):
+                y = y.astype(np.float64)
+                n_test += len(y)
+                sum_y += y.sum()
+                sum_y2 += np.dot(y, y)
+                for name, model in self.models.items():
+                    error = model.predict(self.scaler.transform(X) if uses_scaled_features(model) else X) - y
+                    totals[name][0] += np.dot(error, error)
+                    totals[name][1] += np.abs(error).sum()
+        if not n_test:
+            raise ValueError("Aucune ligne de test : test_size trop petit pour le magasin")
+        
+        variance = sum_y2 - sum_y * sum_y / n_test
+        for name, model in self.models.items():
+            sse, sae = totals[name]
+            self.results[name] = {
+                'model': model,
+                'mse': sse / n_test,
+                'mae': sae / n_test,
+                'r2': 1.0 - sse / variance if variance > 0 else 0.0,
+                # Pas de validation croisée sur le chemin hors mémoire
+                'cv_mean': None,
+                'cv_std': None
+            }
+        
+        best_name = max(self.results.keys(), key=lambda k: self.results[k]['r2'])
+        self.best_model = self.results[best_name]['model']
+        
+        return best_name, self.results
+    
+    # Colonne de vérité terrain des retours (provide_feedback côté frontend)
+    FEEDBACK_TARGET = 'actual_difficulty'
+    
+    def _updated_estimator(self, model, X, X_scaled, y, extra_rounds, epochs):
+        """Copie du modèle prolongée sur les nouvelles lignes (le modèle d'origine reste intact)"""
+        import copy
+        
+        model = copy.deepcopy(model)
+        if isinstance(model, FoldEnsembleRegressor):
+            model.estimators_ = [self._updated_estimator(estimator, X, X_scaled, y, extra_rounds, epochs)
+                                 for estimator in model.estimators_]
+            return model
+        
+        if getattr(model, 'feature_names_in_', None) is not None:
+            # Modèle entraîné sur un DataFrame : mêmes noms de colonnes exigés
+            X = pd.DataFrame(X, columns=model.feature_names_in_)
+        if hasattr(model, 'get_booster'):
+            # XGBoost : tours de boosting supplémentaires à partir du booster existant
+            model.set_params(n_estimators=extra_rounds)
+            model.fit(X, y, xgb_model=model.get_booster())
+            model.set_params(n_estimators=model.get_booster().num_boosted_rounds())
+        elif hasattr(model, 'partial_fit'):
+            # Réseau de neurones : mêmes entrées normalisées qu'à l'entraînement
+            for _ in range(epochs):
+                model.partial_fit(X_scaled, y)
+        elif 'warm_start' in model.get_params():
+            # Forêts et gradient boosting : arbres ajoutés, arbres existants conservés
+            model.set_params(warm_start=True, n_estimators=model.n_estimators + extra_rounds)
+            model.fit(X, y)
+            model.set_params(warm_start=False)
+        else:
+            raise ValueError(f"Mise à jour incrémentale non prise en charge: {type(model).__name__}")
+        return model
+    
+    def update_from_feedback(self, feedback, model_dir='models', holdout_size=0.2, extra_rounds=20,
+                             epochs=10, max_regression=0.0):
+        """Met à jour le modèle enregistré avec des retours terrain ; nouvelle version si pas de régression"""
+        from sklearn.metrics import mean_squared_error, mean_absolute_error, r2_score
+        
+        start = time.perf_counter()
+        frame = feedback if isinstance(feedback, pd.DataFrame) else pd.DataFrame(list(feedback))
+        if self.FEEDBACK_TARGET not in frame:
+            raise ValueError(f"Colonne '{self.FEEDBACK_TARGET}' absente des retours")
+        target = pd.to_numeric(frame[self.FEEDBACK_TARGET], errors='coerce')
+        frame = frame[target.notna()]
+        y = target[target.notna()].to_numpy(dtype=np.float64)
+        if len(y) < 2:
+            raise ValueError("Au moins deux retours sont nécessaires (mise à jour et contrôle)")
+        
+        # Modèle courant désérialisé (pas l'évaluateur compilé) : il doit rester modifiable
+        previous = TimetablePredictor(model_dir, mmap_mode=False)
+        X = previous._feature_matrix(frame)
         
-        # Prédiction
-        feature_vector = np.array([features[f] for f in self.feature_names]).reshape(1, -1)
+        order = np.random.default_rng(self.random_state).permutation(len(y))
+        n_holdout = min(len(y) - 1, max(1, int(round(len(y) * holdout_size))))
+        holdout, train = order[:n_holdout], order[n_holdout:]
         
-        if isinstance(self.model, MLPRegressor):
-            feature_vector = self.scaler.transform(feature_vector)
+        with self.profiler.stage('update', model=previous.model_name, rows=len(train)):
+            model = self._updated_estimator(previous.model, X[train], previous.scaler.transform(X[train]),
+                                            y[train], extra_rounds, epochs)
         
-        difficulty = self.model.predict(feature_vector)[0]
+        def metrics(candidate):
+            X_holdout = X[holdout]
+            y_pred = candidate.predict(previous.scaler.transform(X_holdout) if previous.scaled else X_holdout)
+            return {
+                'mse': mean_squared_error(y[holdout], y_pred),
+                'mae': mean_absolute_error(y[holdout], y_pred),
+                # R² indéfini sur une seule ligne de contrôle
+                'r2': r2_score(y[holdout], y_pred) if n_holdout > 1 else None,
+            }
         
-        # Classification
-        if difficulty < 0.3:
-            level = "Faible"
-            priority = 3
-        elif difficulty < 0.7:
-            level = "Moyenne"
-            priority = 2
+        before, after = metrics(previous.model), metrics(model)
+        # Comparaison sur R², ou sur l'erreur quadratique si R² est indéfini
+        if before['r2'] is not None:
+            promoted = after['r2'] >= before['r2'] - max_regression
         else:
-            level = "Élevée"
-            priority = 1
+            promoted = after['mse'] <= before['mse']
         
-        return {
-            'difficulty_score': difficulty,
-            'complexity_level': level,
-            'priority': priority,
-            'recommendations': self._get_recommendations(level, course_data)
+        report = {
+            'base_version': previous.bundle.version,
+            'feedback_rows': len(train),
+            'holdout_rows': n_holdout,
+            'previous': before,
+            'updated': after,
+            'promoted': bool(promoted),
+            'seconds': time.perf_counter() - start,
         }
+        print(f"Mise à jour sur {len(train)} retour(s), contrôle sur {n_holdout}: "
+              f"MAE {before['mae']:.4f} -> {after['mae']:.4f}")
+        
+        if not promoted:
+            print(f"✗ Modèle mis à jour moins bon que la version {previous.bundle.version}: non enregistré")
+            return report
+        
+        # Composants repris du bundle précédent : seule la partie modèle change
+        self.best_model = model
+        self.scaler = previous.scaler
+        self.label_encoders = previous.label_encoders
+        self.feature_names = [name for name in previous.feature_names if not name.endswith('_encoded')]
+        self.results = {name: dict(values) for name, values in previous.metadata.get('performance', {}).items()}
+        self.model_params = previous.metadata.get('hyperparameters', {})
+        self.search_results = previous.metadata.get('search')
+        self.update_history = previous.metadata.get('updates', []) + [report]
+        self.feature_defaults = previous.metadata.get('feature_defaults')
+        self.save_model(model_dir)
+        report['seconds'] = time.perf_counter() - start
+        print(f"✓ Version {previous.bundle.version + 1} enregistrée ({report['seconds']:.1f}s)")
+        return report
     
-    def _get_recommendations(self, level, course_data):
-        """Génère des recommandations basées sur la complexité"""
-        recommendations = []
-        
-        if level == "Élevée":
-            recommendations.extend([
-                "Planifier en priorité absolue",
-                "Allouer les meilleurs créneaux",
-                "Prévoir des alternatives",
-                "Assigner une salle adaptée"
-            ])
-        elif level == "Moyenne":
-            recommendations.extend([
-                "Planifier après les cours prioritaires",
-                "Vérifier les contraintes",
-                "Optimiser l'utilisation des ressources"
-            ])
-        else:
-            recommendations.extend([
-                "Flexible pour combler les créneaux",
-                "Peut être reprogrammé si nécessaire"
-            ])
+    SAVE_LAYOUTS = ('bundle', 'pickle')
+    
+    def save_model(self, model_dir='models', layout='bundle', version=None):
+        """Sauvegarde le modèle et ses composants"""
+        if layout not in self.SAVE_LAYOUTS:
+            raise ValueError(f"Format de sauvegarde inconnu: {layout}")
+        os.makedirs(model_dir, exist_ok=True)
+        
+        # Métadonnées
+        metadata = {
+            'feature_names': self.feature_names + ['teacher_encoded', 'instance_encoded'],
+            'model_type': type(self.best_model).__name__,
+            'performance': {name: {k: v for k, v in results.items() if k != 'model'} 
+                          for name, results in self.results.items()},
+            'hyperparameters': getattr(self, 'model_params', {}),
+        }
+        if getattr(self, 'search_results', None):
+            metadata['search'] = self.search_results
+        if getattr(self, 'update_history', None):
+            metadata['updates'] = self.update_history
+        if getattr(self, 'feature_defaults', None):
+            metadata['feature_defaults'] = self.feature_defaults
         
-        # Recommandations spécifiques
-        if course_data.get('students', 0) > 100:
-            recommendations.append("Nécessite une grande salle")
+        bundle_path = os.path.join(model_dir, ModelBundle.FILE_NAME)
+        if layout == 'bundle':
+            # Un seul fichier versionné : la version suit celle du bundle précédent
+            if version is None:
+                try:
+                    version = ModelBundle.read_header(bundle_path)['version'] + 1
+                except (OSError, ValueError):
+                    version = 1
+            bundle = ModelBundle(self.best_model, self.scaler, self.label_encoders, metadata, version)
+            bundle.save(bundle_path)
+            metadata['bundle'] = {
+                'file': ModelBundle.FILE_NAME,
+                'schema_version': ModelBundle.SCHEMA_VERSION,
+                'version': version,
+                'checksum': bundle.checksum,
+            }
+        else:
+            # Ancien format : un pickle par composant
+            joblib.dump(self.best_model, f'{model_dir}/timetable_model.pkl')
+            joblib.dump(self.scaler, f'{model_dir}/scaler.pkl')
+            for name, encoder in self.label_encoders.items():
+                joblib.dump(encoder, f'{model_dir}/{name}_encoder.pkl')
+            # Sinon le bundle resterait prioritaire au chargement
+            if os.path.exists(bundle_path):
+                os.remove(bundle_path)
         
-        if course_data.get('lectures', 0) > 3:
-            recommendations.append("Étaler sur plusieurs jours")
+        with open(f'{model_dir}/metadata.json', 'w') as f:
+            json.dump(metadata, f, indent=2)
         
-        return recommendations
+        print(f"Modèle sauvegardé dans {model_dir}/")
+        return model_dir
 
-def main():
+def main(use_cache=True, search_budget=None, profiler=None, store_path=None, memory_limit_mb=1024,
+         rebuild_store=False):
     """Fonction principale pour créer le modèle"""
     print("SYSTÈME DE PLANIFICATION D'EMPLOI DU TEMPS UNIVERSITAIRE")
     print("=" * 60)
+    profiler = profiler or Profiler()
     
     # 1. Téléchargement et traitement des données
     processor = TimetableDataProcessor()
-    files = processor.download_datasets()
+    with profiler.stage('download'):
+        files = processor.download_datasets()
+    profiler.count('files', len(files))
     
     if not files:
         print("Aucun fichier téléchargé. Vérifiez votre connexion internet.")
@@ -501,28 +2223,57 @@ def main():
     
     # 2. Extraction des features
     print("\nExtraction des features...")
-    extractor = FeatureExtractor()
-    df = extractor.extract_features(files)
-    
-    if df.empty:
-        print("Aucune donnée extraite.")
-        return
-    
-    print(f"Dataset créé: {len(df)} cours de {df['instance'].nunique()} instances")
-    
-    # 3. Analyse exploratoire rapide
-    print("\nAnalyse des données:")
-    print(f"  - Score de difficulté moyen: {df['difficulty_score'].mean():.3f}")
-    print(f"  - Écart-type: {df['difficulty_score'].std():.3f}")
-    print(f"  - Conflits moyens par cours: {df['conflict_degree'].mean():.1f}")
-    
-    # 4. Entraînement des modèles
-    print("\nEntraînement des modèles ML...")
-    ml_model = TimetableMLModel()
-    ml_model.create_models()
-    
-    X, y = ml_model.prepare_data(df)
-    best_name, results = ml_model.train_models(X, y)
+    extractor = FeatureExtractor(cache=FeatureCache() if use_cache else None, profiler=profiler)
+    ml_model = TimetableMLModel(n_jobs=-1, profiler=profiler)
+    if store_path:
+        # Corpus hors mémoire : features compactes sur disque, entraînement par tronçons
+        from feature_store import FeatureStore
+        
+        store = FeatureStore(store_path)
+        if store.n_rows and not rebuild_store:
+            # Magasin déjà rempli : entraînement direct, sans ré-extraction
+            print(f"Magasin de features existant réutilisé: {store.n_rows} lignes ({store_path})")
+        else:
+            with profiler.stage('extract_features'):
+                extractor.extract_to_store(files, store, n_jobs=-1, overwrite=True)
+        if not store.n_rows:
+            print("Aucune donnée extraite.")
+            return
+        print("\nEntraînement des modèles ML (magasin de features)...")
+        ml_model.create_models(params=TimetableMLModel.load_hyperparameters())
+        with profiler.stage('train_models'):
+            best_name, results = ml_model.train_from_store(store, memory_limit_mb=memory_limit_mb)
+    else:
+        with profiler.stage('extract_features'):
+            df = extractor.extract_features(files, n_jobs=-1)
+        
+        if df.empty:
+            print("Aucune donnée extraite.")
+            return
+        
+        print(f"Dataset créé: {len(df)} cours de {df['instance'].nunique()} instances")
+        
+        # 3. Analyse exploratoire rapide
+        print("\nAnalyse des données:")
+        print(f"  - Score de difficulté moyen: {df['difficulty_score'].mean():.3f}")
+        print(f"  - Écart-type: {df['difficulty_score'].std():.3f}")
+        print(f"  - Conflits moyens par cours: {df['conflict_degree'].mean():.1f}")
+        
+        # 4. Entraînement des modèles
+        print("\nEntraînement des modèles ML...")
+        with profiler.stage('prepare_data'):
+            X, y = ml_model.prepare_data(df)
+        
+        if search_budget:
+            print(f"\nRecherche d'hyperparamètres (budget {search_budget:.0f}s)...")
+            with profiler.stage('search'):
+                ml_model.search_models(X, y, budget_seconds=search_budget)
+        else:
+            # Réutilise la configuration retenue lors de la dernière recherche
+            ml_model.create_models(params=TimetableMLModel.load_hyperparameters())
+        
+        with profiler.stage('train_models'):
+            best_name, results = ml_model.train_models(X, y)
     
     # 5. Affichage des résultats
     print(f"\nMeilleur modèle: {best_name}")
@@ -531,7 +2282,8 @@ def main():
         print(f"  {name}: R² = {result['r2']:.4f}, MAE = {result['mae']:.4f}")
     
     # 6. Sauvegarde
-    model_dir = ml_model.save_model()
+    with profiler.stage('save_model'):
+        model_dir = ml_model.save_model()
     
     # 7. Test du modèle sauvegardé
     print(f"\nTest du modèle sauvegardé...")
@@ -570,4 +2322,51 @@ def main():
     print(f"✓ Prêt pour utilisation en production")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Entraînement du modèle de difficulté de planification")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="recalcule toutes les features sans utiliser le cache")
+    parser.add_argument('--invalidate-cache', action='store_true',
+                        help="vide le cache de features puis quitte")
+    parser.add_argument('--search-budget', type=float, default=None, metavar='SECONDES',
+                        help="recherche d'hyperparamètres (successive halving) avec ce budget de temps")
+    parser.add_argument('--feature-store', default=None, metavar='DOSSIER',
+                        help="écrit les features dans un magasin compact et entraîne par tronçons")
+    parser.add_argument('--rebuild-store', action='store_true',
+                        help="vide le magasin de features puis ré-extrait (sinon un magasin rempli est réutilisé)")
+    parser.add_argument('--memory-limit', type=int, default=1024, metavar='MO',
+                        help="budget mémoire de l'entraînement par tronçons (avec --feature-store)")
+    parser.add_argument('--update-from-feedback', default=None, metavar='FICHIER',
+                        help="met à jour le modèle enregistré avec des retours (CSV ou JSON, colonne actual_difficulty)")
+    parser.add_argument('--model-dir', default='models', metavar='DOSSIER',
+                        help="dossier du modèle à mettre à jour (avec --update-from-feedback)")
+    parser.add_argument('--profile', action='store_true',
+                        help="mesure chaque étape et affiche un tableau récapitulatif")
+    parser.add_argument('--profile-output', default=None, metavar='FICHIER',
+                        help="écrit les mesures en JSON lines (active --profile)")
+    parser.add_argument('--profile-stage', default=None, metavar='ÉTAPE',
+                        help="capture cProfile d'une étape (ex. centrality, fit)")
+    parser.add_argument('--profile-dump', default='profile.prof', metavar='FICHIER',
+                        help="fichier de sortie de --profile-stage")
+    args = parser.parse_args()
+    
+    if args.invalidate_cache:
+        removed = FeatureCache().invalidate()
+        print(f"Cache de features vidé ({removed} entrée(s) supprimée(s))")
+    else:
+        profiler = Profiler(enabled=bool(args.profile or args.profile_output or args.profile_stage),
+                            output=args.profile_output, profile_stage=args.profile_stage,
+                            profile_output=args.profile_dump)
+        if args.update_from_feedback:
+            path = args.update_from_feedback
+            feedback = pd.read_csv(path) if path.endswith('.csv') else pd.read_json(path)
+            TimetableMLModel(profiler=profiler).update_from_feedback(feedback, model_dir=args.model_dir)
+        else:
+            main(use_cache=not args.no_cache, search_budget=args.search_budget, profiler=profiler,
+                 store_path=args.feature_store, memory_limit_mb=args.memory_limit,
+                 rebuild_store=args.rebuild_store)
+        if profiler.enabled:
+            print("\nMesures par étape:")
+            profiler.summary()
+            profiler.close()
\ No newline at end of file
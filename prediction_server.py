@@ -0,0 +1,316 @@
+# Serveur de prédiction asynchrone autour de TimetablePredictor
+# Les requêtes concurrentes sont regroupées en micro-lots avant l'inférence
+
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from inference import PredictionCache, TimetablePredictor
+
+
+class MicroBatcher:
+    """Regroupe les requêtes concurrentes en micro-lots pour le prédicteur"""
+    
+    def __init__(self, predictor, max_batch_size=64, max_wait_ms=5.0, inference_threads=1):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        # L'inférence tourne hors de la boucle d'événements
+        self.executor = ThreadPoolExecutor(max_workers=inference_threads)
+        self.queue = None
+        self._full = None
+        self._task = None
+        self.model_used = predictor.model_name
+        
+        # Métriques
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.served = 0
+        self.max_batch_seen = 0
+        self.inference_time = 0.0
+        self.batch_sizes = {}
+    
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self._full = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=False)
+    
+    async def predict(self, course):
+        """Place un cours dans la file et attend sa prédiction"""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((course, time.perf_counter(), future))
+        self.requests += 1
+        if self.queue.qsize() >= self.max_batch_size:
+            self._full.set()
+        return await future
+    
+    async def _next_batch(self):
+        first = await self.queue.get()
+        
+        # Attente bornée pour laisser le lot se remplir
+        if self.max_wait > 0 and self.queue.qsize() < self.max_batch_size - 1:
+            self._full.clear()
+            try:
+                await asyncio.wait_for(self._full.wait(), self.max_wait)
+            except asyncio.TimeoutError:
+                pass
+        
+        batch = [first]
+        while len(batch) < self.max_batch_size and not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        return batch
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._next_batch()
+            courses = [course for course, _, _ in batch]
+            
+            start = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self.executor, self.predictor.predict_batch, courses)
+                outcomes = self._rows(results)
+            except Exception:
+                # Lot en échec : chaque cours est repris seul, l'erreur ne touche que sa requête
+                outcomes = await loop.run_in_executor(self.executor, self._predict_each, courses)
+            finished = time.perf_counter()
+            
+            self.batches += 1
+            self.served += len(batch)
+            self.inference_time += finished - start
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.batch_sizes[len(batch)] = self.batch_sizes.get(len(batch), 0) + 1
+            
+            for (_, received, future), outcome in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if isinstance(outcome, Exception):
+                    self.errors += 1
+                    future.set_exception(outcome)
+                    continue
+                score, level, priority, recommendations = outcome
+                future.set_result({
+                    'difficulty_score': float(score),
+                    'complexity_level': level,
+                    'priority': int(priority),
+                    'recommendations': recommendations,
+                    'processing_time': finished - received,
+                    'model_used': self.model_used,
+                })
+    
+    @staticmethod
+    def _rows(results):
+        return list(zip(results['difficulty_score'].tolist(), results['complexity_level'].tolist(),
+                        results['priority'].tolist(), results['recommendations'].tolist()))
+    
+    def _predict_each(self, courses):
+        """Prédiction cours par cours ; une exception tient lieu de résultat pour le cours fautif"""
+        outcomes = []
+        for course in courses:
+            try:
+                outcomes.append(self._rows(self.predictor.predict_batch([course]))[0])
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+    
+    def metrics(self):
+        """Profondeur de file et statistiques de taille des lots"""
+        return {
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'requests': self.requests,
+            'batches': self.batches,
+            'errors': self.errors,
+            'mean_batch_size': self.served / self.batches if self.batches else 0.0,
+            'max_batch_size_seen': self.max_batch_seen,
+            'batch_size_histogram': {str(size): count for size, count in sorted(self.batch_sizes.items())},
+            'inference_time_total': self.inference_time,
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000.0,
+            'model_version': self.predictor.model_version,
+            'cache': self.predictor.cache.stats() if self.predictor.cache is not None else None,
+        }
+
+
+class PredictionServer:
+    """Serveur HTTP/1.1 minimal (asyncio) exposant le prédicteur"""
+    
+    PREDICT_PATHS = ('/predict', '/ml/predictions/predict_course_difficulty/')
+    REASONS = {200: 'OK', 204: 'No Content', 400: 'Bad Request', 404: 'Not Found',
+               405: 'Method Not Allowed', 500: 'Internal Server Error'}
+    
+    def __init__(self, model_dir='models', host='127.0.0.1', port=8001,
+                 max_batch_size=64, max_wait_ms=5.0, inference_threads=1, compiled=False,
+                 cache_size=0, cache_ttl=None):
+        self.host = host
+        self.port = port
+        # Le modèle est chargé une seule fois pour toute la durée du serveur
+        cache = PredictionCache(cache_size, cache_ttl) if cache_size else None
+        self.batcher = MicroBatcher(TimetablePredictor(model_dir, compiled=compiled, cache=cache),
+                                    max_batch_size, max_wait_ms, inference_threads)
+        self.server = None
+    
+    async def start(self):
+        await self.batcher.start()
+        self.server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+    
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.batcher.stop()
+    
+    async def serve_forever(self):
+        await self.start()
+        print(f"Serveur de prédiction sur http://{self.host}:{self.port}")
+        try:
+            await self.server.serve_forever()
+        finally:
+            await self.stop()
+    
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'requête invalide'}, keep_alive=False)
+                    break
+                
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                
+                # Longueur : entier décimal positif uniquement (int() accepterait '-1', '+1' ou '1_0')
+                length = headers.get('content-length') or '0'
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(writer, 400, {'error': f"Content-Length invalide: {length!r}"},
+                                        keep_alive=False)
+                    break
+                length = int(length)
+                body = await reader.readexactly(length) if length else b''
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                
+                status, payload = await self._route(method, path.split('?', 1)[0], body)
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+    
+    async def _route(self, method, path, body):
+        if method == 'OPTIONS':
+            return 204, None
+        if path == '/metrics':
+            return 200, self.batcher.metrics()
+        if path == '/health':
+            return 200, {'status': 'ok', 'model_used': self.batcher.model_used}
+        if path == '/reload':
+            if method != 'POST':
+                return 405, {'error': 'POST attendu'}
+            # Recharge le bundle s'il a changé ; le cache est alors invalidé
+            loop = asyncio.get_running_loop()
+            reloaded = await loop.run_in_executor(self.batcher.executor, self.batcher.predictor.reload)
+            self.batcher.model_used = self.batcher.predictor.model_name
+            return 200, {'reloaded': reloaded, 'model_version': self.batcher.predictor.model_version}
+        if path not in self.PREDICT_PATHS:
+            return 404, {'error': f"chemin inconnu: {path}"}
+        if method != 'POST':
+            return 405, {'error': 'POST attendu'}
+        
+        try:
+            data = json.loads(body or b'{}')
+        except ValueError:
+            return 400, {'error': 'JSON invalide'}
+        
+        if not isinstance(data, (dict, list)):
+            return 400, {'error': 'objet ou liste de cours attendu'}
+        # Validation avant la file : un cours invalide ne doit pas faire échouer le lot partagé
+        for index, course in enumerate(data if isinstance(data, list) else [data]):
+            error = self._course_error(course)
+            if error:
+                return 400, {'error': f"cours {index}: {error}" if isinstance(data, list) else error}
+        
+        try:
+            # Une liste de cours est dispersée dans la file et profite du même lot
+            if isinstance(data, list):
+                return 200, list(await asyncio.gather(*(self.batcher.predict(c) for c in data)))
+            return 200, await self.batcher.predict(data)
+        except Exception as e:
+            return 500, {'error': str(e)}
+    
+    @staticmethod
+    def _course_error(course):
+        """Message d'erreur si le cours n'est pas un objet de valeurs scalaires, sinon None"""
+        if not isinstance(course, dict):
+            return 'objet de cours attendu'
+        invalid = [key for key, value in course.items()
+                   if value is not None and not isinstance(value, (str, int, float))]
+        if invalid:
+            return f"valeurs non scalaires: {', '.join(invalid)}"
+        return None
+    
+    async def _respond(self, writer, status, payload, keep_alive=True):
+        body = b'' if payload is None else json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        head = [
+            f"HTTP/1.1 {status} {self.REASONS.get(status, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Access-Control-Allow-Origin: *",
+            "Access-Control-Allow-Headers: Content-Type, Authorization",
+            "Access-Control-Allow-Methods: GET, POST, OPTIONS",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}",
+        ]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + body)
+        await writer.drain()
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Serveur de prédiction avec micro-lots")
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8001)
+    parser.add_argument('--max-batch-size', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--inference-threads', type=int, default=1)
+    parser.add_argument('--compiled', action='store_true',
+                        help="évalue les ensembles d'arbres avec l'évaluateur numpy compilé")
+    parser.add_argument('--cache-size', type=int, default=0,
+                        help="taille du cache de prédictions (0 : désactivé)")
+    parser.add_argument('--cache-ttl', type=float, default=None, metavar='SECONDES')
+    args = parser.parse_args()
+    
+    server = PredictionServer(args.model_dir, args.host, args.port, args.max_batch_size,
+                              args.max_wait_ms, args.inference_threads, args.compiled,
+                              args.cache_size, args.cache_ttl)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# Instrumentation légère du pipeline : chronomètres, compteurs et pic mémoire par étape
+# Désactivée par défaut : chaque point de mesure ne coûte alors qu'un test booléen
+
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+_DISABLED = contextlib.nullcontext()
+
+
+def _peak_rss_mb():
+    """Pic de RSS du processus en Mo (None si indisponible)"""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en Ko ailleurs
+    return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+
+
+class Profiler:
+    """Étapes chronométrées (imbriquées), compteurs, pic de RSS et cProfile optionnel d'une étape"""
+    
+    def __init__(self, enabled=False, output=None, profile_stage=None, profile_output='profile.prof'):
+        self.enabled = enabled
+        # Fichier JSON lines (une mesure par ligne, en ajout) ; None : mesures en mémoire seulement
+        self.output = output
+        # Étape nommée à capturer avec cProfile (toutes ses occurrences cumulées)
+        self.profile_stage = profile_stage
+        self.profile_output = profile_output
+        self.records = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cprofile = None
+        self._cprofile_depth = 0
+        self._profile_files = []
+    
+    def __getstate__(self):
+        # Copie envoyée aux processus de travail : ses mesures reviennent par drain()/merge()
+        state = dict(self.__dict__)
+        state.update(output=None, records=[], _local=None, _lock=None, _cprofile=None,
+                     _cprofile_depth=0, _profile_files=[])
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+    
+    def _stack(self):
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+    
+    def _emit(self, record):
+        with self._lock:
+            self.records.append(record)
+            if self.output:
+                with open(self.output, 'a') as f:
+                    f.write(json.dumps(record) + '\n')
+    
+    def stage(self, name, **tags):
+        """Contexte chronométré ; les étapes imbriquées sont nommées 'parent/enfant'"""
+        if not self.enabled:
+            return _DISABLED
+        return self._stage(name, tags)
+    
+    @contextlib.contextmanager
+    def _stage(self, name, tags):
+        stack = self._stack()
+        stack.append(name)
+        path = '/'.join(stack)
+        profiling = name == self.profile_stage
+        if profiling:
+            self._start_cprofile()
+        peak_before = _peak_rss_mb()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            if profiling:
+                self._stop_cprofile()
+            stack.pop()
+            peak = _peak_rss_mb()
+            record = {'event': 'stage', 'stage': path, 'seconds': seconds, 'pid': os.getpid(),
+                      'peak_rss_mb': peak,
+                      'peak_growth_mb': peak - peak_before if peak is not None else None}
+            if tags:
+                record['tags'] = tags
+            self._emit(record)
+    
+    def timed(self, name=None):
+        """Décorateur : chaque appel de la fonction est une étape"""
+        def decorate(function):
+            label = name or function.__name__
+            
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self._stage(label, {}):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorate
+    
+    def count(self, name, value=1, **tags):
+        """Ajoute value au compteur name (rattaché à l'étape courante)"""
+        if not self.enabled:
+            return
+        record = {'event': 'counter', 'name': name, 'value': value, 'stage': '/'.join(self._stack())}
+        if tags:
+            record['tags'] = tags
+        self._emit(record)
+    
+    def _start_cprofile(self):
+        import cProfile
+        
+        if self._cprofile is None:
+            self._cprofile = cProfile.Profile()
+        # Occurrences imbriquées : une seule activation
+        if self._cprofile_depth == 0:
+            self._cprofile.enable()
+        self._cprofile_depth += 1
+    
+    def _stop_cprofile(self):
+        self._cprofile_depth -= 1
+        if self._cprofile_depth == 0:
+            self._cprofile.disable()
+    
+    def drain(self):
+        """Mesures accumulées (vidées) pour renvoi au processus principal"""
+        with self._lock:
+            records, self.records = self.records, []
+        if self._cprofile is not None:
+            # Profil de la tâche écrit à part, fusionné par close() ; un processus de travail
+            # exécute plusieurs tâches, le nom doit donc être unique par tâche
+            path = f"{self.profile_output}.{os.getpid()}.{uuid.uuid4().hex}"
+            self._cprofile.dump_stats(path)
+            records.append({'event': 'profile', 'path': path})
+        return records
+    
+    def merge(self, records):
+        """Intègre les mesures d'un processus de travail sous l'étape courante"""
+        prefix = '/'.join(self._stack())
+        for record in records:
+            if record['event'] == 'profile':
+                if record['path'] not in self._profile_files:
+                    self._profile_files.append(record['path'])
+                continue
+            if prefix:
+                record = dict(record, stage=f"{prefix}/{record['stage']}" if record['stage'] else prefix)
+            self._emit(record)
+    
+    def summary(self, records=None):
+        """Tableau récapitulatif par étape et totaux des compteurs"""
+        records = self.records if records is None else records
+        stages, counters = {}, {}
+        for record in records:
+            if record['event'] == 'stage':
+                entry = stages.setdefault(record['stage'], {'calls': 0, 'total': 0.0, 'max': 0.0, 'peak_rss_mb': 0.0})
+                entry['calls'] += 1
+                entry['total'] += record['seconds']
+                entry['max'] = max(entry['max'], record['seconds'])
+                entry['peak_rss_mb'] = max(entry['peak_rss_mb'], record.get('peak_rss_mb') or 0.0)
+            elif record['event'] == 'counter':
+                counters[record['name']] = counters.get(record['name'], 0) + record['value']
+        
+        header = f"{'étape':<44}{'appels':>8}{'total (s)':>12}{'moyenne (s)':>13}{'max (s)':>10}{'pic RSS (Mo)':>14}"
+        print(header)
+        print("-" * len(header))
+        for path, entry in sorted(stages.items()):
+            print(f"{path:<44}{entry['calls']:>8}{entry['total']:>12.3f}{entry['total'] / entry['calls']:>13.4f}"
+                  f"{entry['max']:>10.3f}{entry['peak_rss_mb']:>14.0f}")
+        if counters:
+            print("\nCompteurs:")
+            for name, value in sorted(counters.items()):
+                print(f"  {name}: {value}")
+        return {'stages': stages, 'counters': counters}
+    
+    @staticmethod
+    def load(path):
+        """Relit un fichier JSON lines écrit par un Profiler"""
+        with open(path) as f:
+            return [json.loads(line) for line in f if line.strip()]
+    
+    def close(self, top=20):
+        """Écrit le profil cProfile (fusionné avec celui des processus de travail) et l'affiche"""
+        if self._cprofile is None and not self._profile_files:
+            return None
+        import pstats
+        
+        sources = ([self._cprofile] if self._cprofile is not None else []) + self._profile_files
+        stats = pstats.Stats(*sources)
+        stats.dump_stats(self.profile_output)
+        for path in self._profile_files:
+            os.remove(path)
+        self._profile_files = []
+        print(f"\nProfil de l'étape '{self.profile_stage}' écrit dans {self.profile_output}")
+        stats.sort_stats('cumulative').print_stats(top)
+        return self.profile_output
+
+
+def profiled_call(profiler, name, tags, function, *args):
+    """Exécute function comme étape dans un processus de travail ; renvoie (résultat, mesures)"""
+    with profiler.stage(name, **tags):
+        result = function(*args)
+    return result, profiler.drain()
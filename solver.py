@@ -0,0 +1,517 @@
+# Solveur d'emploi du temps ITC 2007 (CCT) guidé par la difficulté prédite
+# Construction gloutonne ordonnée puis recuit simulé à évaluation incrémentale
+
+import json
+import math
+import os
+import random
+import time
+
+import numpy as np
+
+from prediction import FeasibilityIndex, FeatureExtractor, TimetableDataProcessor
+
+
+class TimetableSolver:
+    """Placement des séances (cours, salle, période) avec coûts tenus à jour par delta"""
+    
+    # Pondérations ITC 2007 ; chaque séance non placée compte comme violation dure
+    HARD_WEIGHT = 1000
+    CAPACITY_WEIGHT = 1
+    MIN_DAYS_WEIGHT = 5
+    COMPACTNESS_WEIGHT = 2
+    STABILITY_WEIGHT = 1
+    
+    def __init__(self, instance, seed=0):
+        self.instance = instance
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.days = instance.days
+        self.periods_per_day = instance.periods_per_day
+        self.n_periods = self.days * self.periods_per_day
+        self.n_courses = instance.n_courses
+        self.n_rooms = instance.n_rooms
+        
+        # Attributs en listes Python : accès scalaires bien plus rapides que NumPy
+        self.students = instance.course_students.tolist()
+        self.min_days = instance.course_min_days.tolist()
+        self.teacher = instance.course_teacher.tolist()
+        self.capacity = instance.room_capacity.tolist()
+        self.curricula = [[] for _ in range(self.n_courses)]
+        for curriculum, course in instance.curriculum_members.tolist():
+            if curriculum not in self.curricula[course]:
+                self.curricula[course].append(curriculum)
+        
+        feasibility = FeasibilityIndex(instance)
+        self.available = feasibility.availability_table().tolist()
+        self.forbidden = feasibility.forbidden_table().tolist()
+        self.rooms_by_capacity = feasibility.room_order.tolist()
+        self.first_fitting = feasibility.first_fitting.tolist()
+        self.allowed_rooms = [[r for r in range(self.n_rooms) if not self.forbidden[c][r]]
+                              for c in range(self.n_courses)]
+        
+        # Une séance par cours et par cours magistral demandé
+        self.lecture_course = [c for c, count in enumerate(instance.course_lectures.tolist())
+                               for _ in range(count)]
+        self.course_lectures = [[] for _ in range(self.n_courses)]
+        for lecture, course in enumerate(self.lecture_course):
+            self.course_lectures[course].append(lecture)
+        self.reset()
+    
+    def reset(self):
+        """Vide l'emploi du temps (toutes les séances non placées)"""
+        n_lectures = len(self.lecture_course)
+        self.lecture_period = [-1] * n_lectures
+        self.lecture_room = [-1] * n_lectures
+        self.room_slot = [[-1] * self.n_periods for _ in range(self.n_rooms)]
+        self.course_period = [[0] * self.n_periods for _ in range(self.n_courses)]
+        self.teacher_period = [[0] * self.n_periods for _ in range(len(self.instance.teacher_ids))]
+        self.curriculum_period = [[0] * self.n_periods for _ in range(self.instance.n_curricula)]
+        self.course_day = [[0] * self.days for _ in range(self.n_courses)]
+        self.course_room = [[0] * self.n_rooms for _ in range(self.n_courses)]
+        self.days_used = [0] * self.n_courses
+        self.rooms_used = [0] * self.n_courses
+        self.unassigned = n_lectures
+        # Séances non placées (liste + positions : ajout et retrait en O(1))
+        self.pending = list(range(n_lectures))
+        self.pending_position = list(range(n_lectures))
+        # Un cours sans séance placée manque tous ses jours minimum
+        self.soft = self.MIN_DAYS_WEIGHT * sum(self.min_days)
+    
+    def cost(self):
+        return self.HARD_WEIGHT * self.unassigned + self.soft
+    
+    def feasible(self, course, period):
+        """Placement sans conflit dur (indisponibilité, enseignant, curricula, même cours)"""
+        if not self.available[course][period] or self.course_period[course][period]:
+            return False
+        if self.teacher_period[self.teacher[course]][period]:
+            return False
+        for curriculum in self.curricula[course]:
+            if self.curriculum_period[curriculum][period]:
+                return False
+        return True
+    
+    def _isolated(self, curriculum, period):
+        """Séances isolées du curriculum à cette période (aucune voisine le même jour)"""
+        count = self.curriculum_period[curriculum][period]
+        if not count:
+            return 0
+        slot = period % self.periods_per_day
+        if slot > 0 and self.curriculum_period[curriculum][period - 1]:
+            return 0
+        if slot < self.periods_per_day - 1 and self.curriculum_period[curriculum][period + 1]:
+            return 0
+        return count
+    
+    def _window(self, curriculum, period):
+        """Séances isolées autour de la période (seules positions touchées par un placement)"""
+        slot = period % self.periods_per_day
+        total = self._isolated(curriculum, period)
+        if slot > 0:
+            total += self._isolated(curriculum, period - 1)
+        if slot < self.periods_per_day - 1:
+            total += self._isolated(curriculum, period + 1)
+        return total
+    
+    def _update(self, lecture, period, room, step):
+        """Ajoute (step=1) ou retire (step=-1) une séance ; renvoie la variation du coût souple"""
+        course = self.lecture_course[lecture]
+        delta = step * self.CAPACITY_WEIGHT * max(0, self.students[course] - self.capacity[room])
+        
+        # Jours minimum : seule la présence du cours ce jour-là compte
+        day = period // self.periods_per_day
+        if self.course_day[course][day] == (0 if step > 0 else 1):
+            before = max(0, self.min_days[course] - self.days_used[course])
+            self.days_used[course] += step
+            delta += self.MIN_DAYS_WEIGHT * (max(0, self.min_days[course] - self.days_used[course]) - before)
+        self.course_day[course][day] += step
+        
+        # Stabilité : une salle de plus que la première
+        if self.course_room[course][room] == (0 if step > 0 else 1):
+            before = max(0, self.rooms_used[course] - 1)
+            self.rooms_used[course] += step
+            delta += self.STABILITY_WEIGHT * (max(0, self.rooms_used[course] - 1) - before)
+        self.course_room[course][room] += step
+        
+        # Compacité : seules les périodes voisines du même jour changent d'état
+        for curriculum in self.curricula[course]:
+            before = self._window(curriculum, period)
+            self.curriculum_period[curriculum][period] += step
+            delta += self.COMPACTNESS_WEIGHT * (self._window(curriculum, period) - before)
+        
+        self.course_period[course][period] += step
+        self.teacher_period[self.teacher[course]][period] += step
+        self.soft += delta
+        self.unassigned -= step
+        return delta
+    
+    def insert(self, lecture, period, room):
+        position, last = self.pending_position[lecture], self.pending.pop()
+        if last != lecture:
+            self.pending[position] = last
+            self.pending_position[last] = position
+        self.pending_position[lecture] = -1
+        self.room_slot[room][period] = lecture
+        self.lecture_period[lecture] = period
+        self.lecture_room[lecture] = room
+        return self._update(lecture, period, room, 1)
+    
+    def remove(self, lecture):
+        period, room = self.lecture_period[lecture], self.lecture_room[lecture]
+        self.room_slot[room][period] = -1
+        self.lecture_period[lecture] = -1
+        self.lecture_room[lecture] = -1
+        self.pending_position[lecture] = len(self.pending)
+        self.pending.append(lecture)
+        return self._update(lecture, period, room, -1)
+    
+    def _best_room(self, course, period):
+        """Salle libre préférée : déjà utilisée par le cours, sinon la plus petite assez grande"""
+        for room in range(self.n_rooms):
+            if self.course_room[course][room] and self.room_slot[room][period] < 0:
+                return room
+        order = self.rooms_by_capacity
+        fitting = self.first_fitting[course]
+        # Salles assez grandes par capacité croissante, puis les plus grandes des trop petites
+        for room in order[fitting:] + order[fitting - 1::-1] if fitting else order:
+            if self.room_slot[room][period] < 0 and not self.forbidden[course][room]:
+                return room
+        return -1
+    
+    def construct(self, order):
+        """Placement glouton : cours dans l'ordre donné, meilleure période pour chaque séance"""
+        for course in order:
+            for lecture in self.course_lectures[course]:
+                if self.lecture_period[lecture] >= 0:
+                    continue
+                best, best_delta = None, None
+                for period in range(self.n_periods):
+                    if not self.feasible(course, period):
+                        continue
+                    room = self._best_room(course, period)
+                    if room < 0:
+                        continue
+                    delta = self.insert(lecture, period, room)
+                    self.remove(lecture)
+                    # Égalités départagées au hasard (reproductible par la graine)
+                    if best is None or delta < best_delta or (delta == best_delta and self.rng.random() < 0.5):
+                        best, best_delta = (period, room), delta
+                if best is not None:
+                    self.insert(lecture, *best)
+        return self.cost()
+    
+    def _try_move(self, lecture, period, room):
+        """Déplace (ou échange) une séance ; renvoie la liste d'annulation ou None si infaisable"""
+        course = self.lecture_course[lecture]
+        other = self.room_slot[room][period]
+        if other == lecture or self.forbidden[course][room]:
+            return None
+        old_period, old_room = self.lecture_period[lecture], self.lecture_room[lecture]
+        undo = []
+        
+        if old_period >= 0:
+            self.remove(lecture)
+            undo.append((lecture, old_period, old_room, False))
+        if other >= 0:
+            self.remove(other)
+            undo.append((other, period, room, False))
+        
+        if self.feasible(course, period):
+            self.insert(lecture, period, room)
+            undo.append((lecture, period, room, True))
+            # L'autre séance prend la place libérée ; depuis la réserve, elle est évincée
+            other_course = self.lecture_course[other] if other >= 0 else None
+            if (other < 0 or old_period < 0 or
+                    (not self.forbidden[other_course][old_room] and self.feasible(other_course, old_period))):
+                if other >= 0 and old_period >= 0:
+                    self.insert(other, old_period, old_room)
+                    undo.append((other, old_period, old_room, True))
+                return undo
+        
+        self._undo(undo)
+        return None
+    
+    def _try_eject(self, lecture, period, room):
+        """Place une séance en attente en évinçant les séances en conflit à cette période"""
+        course = self.lecture_course[lecture]
+        if not self.available[course][period] or self.forbidden[course][room]:
+            return None
+        teacher, curricula = self.teacher[course], set(self.curricula[course])
+        undo = []
+        for r in range(self.n_rooms):
+            other = self.room_slot[r][period]
+            if other < 0:
+                continue
+            other_course = self.lecture_course[other]
+            if (r == room or other_course == course or self.teacher[other_course] == teacher or
+                    not curricula.isdisjoint(self.curricula[other_course])):
+                self.remove(other)
+                undo.append((other, period, r, False))
+        self.insert(lecture, period, room)
+        undo.append((lecture, period, room, True))
+        return undo
+    
+    def _undo(self, undo):
+        for lecture, period, room, inserted in reversed(undo):
+            if inserted:
+                self.remove(lecture)
+            else:
+                self.insert(lecture, period, room)
+    
+    def assignment(self):
+        return list(self.lecture_period), list(self.lecture_room)
+    
+    def load(self, assignment):
+        """Reconstruit l'état à partir de (périodes, salles) par séance"""
+        self.reset()
+        for lecture, (period, room) in enumerate(zip(*assignment)):
+            if period >= 0:
+                self.insert(lecture, period, room)
+    
+    def anneal(self, time_limit=10.0, max_iterations=None, initial_temperature=2.0,
+               final_temperature=0.05):
+        """Recuit simulé ; renvoie la trajectoire [(secondes, meilleur coût)]"""
+        start = time.perf_counter()
+        rng = self.rng
+        n_lectures = len(self.lecture_course)
+        best_cost, best = self.cost(), self.assignment()
+        trajectory = [(0.0, best_cost)]
+        temperature = initial_temperature
+        iteration = 0
+        
+        while n_lectures and self.n_rooms:
+            # Température recalculée périodiquement (fraction d'itérations ou de temps écoulé)
+            if iteration % 256 == 0:
+                elapsed = time.perf_counter() - start
+                if max_iterations is not None:
+                    progress = iteration / max_iterations
+                else:
+                    progress = elapsed / time_limit if time_limit else 1.0
+                if progress >= 1.0 or (time_limit and elapsed >= time_limit):
+                    break
+                temperature = initial_temperature * (final_temperature / initial_temperature) ** progress
+            iteration += 1
+            
+            # Séances en attente tirées une fois sur deux : placées par éviction
+            if self.pending and rng.random() < 0.5:
+                lecture = self.pending[rng.randrange(len(self.pending))]
+            else:
+                lecture = rng.randrange(n_lectures)
+            course = self.lecture_course[lecture]
+            rooms = self.allowed_rooms[course]
+            if not rooms:
+                continue
+            before = self.cost()
+            move = self._try_move if self.lecture_period[lecture] >= 0 else self._try_eject
+            undo = move(lecture, rng.randrange(self.n_periods), rooms[rng.randrange(len(rooms))])
+            if undo is None:
+                continue
+            
+            delta = self.cost() - before
+            if delta > 0 and rng.random() >= math.exp(-delta / temperature):
+                self._undo(undo)
+                continue
+            if self.cost() < best_cost:
+                best_cost, best = self.cost(), self.assignment()
+                trajectory.append((time.perf_counter() - start, best_cost))
+        
+        self.iterations = iteration
+        self.load(best)
+        return trajectory
+    
+    def solve(self, order, time_limit=10.0, max_iterations=None):
+        """Construction puis amélioration ; résumé des coûts et de la trajectoire"""
+        self.reset()
+        start = time.perf_counter()
+        construct_cost = self.construct(order)
+        construct_time = time.perf_counter() - start
+        trajectory = self.anneal(time_limit, max_iterations)
+        return {
+            'construct_cost': construct_cost,
+            'construct_time': construct_time,
+            'cost': self.cost(),
+            'unassigned': self.unassigned,
+            'soft': self.soft,
+            'iterations': self.iterations,
+            'time': time.perf_counter() - start,
+            'trajectory': [(construct_time + t, cost) for t, cost in trajectory],
+        }
+    
+    def evaluate(self):
+        """Recalcule toutes les violations et pénalités depuis zéro (contrôle des deltas)"""
+        lectures = [(l, p, r) for l, (p, r) in enumerate(zip(self.lecture_period, self.lecture_room)) if p >= 0]
+        occupied, periods, result = {}, {}, {'unassigned': len(self.lecture_course) - len(lectures)}
+        conflicts = unavailable = forbidden = capacity = 0
+        course_days, course_rooms = {}, {}
+        for lecture, period, room in lectures:
+            course = self.lecture_course[lecture]
+            occupied[(room, period)] = occupied.get((room, period), 0) + 1
+            keys = [('course', course), ('teacher', self.teacher[course])]
+            keys += [('curriculum', q) for q in self.curricula[course]]
+            for key in keys:
+                periods.setdefault(key, []).append(period)
+            unavailable += not self.available[course][period]
+            forbidden += self.forbidden[course][room]
+            capacity += max(0, self.students[course] - self.capacity[room])
+            course_days.setdefault(course, set()).add(period // self.periods_per_day)
+            course_rooms.setdefault(course, set()).add(room)
+        for key, used in periods.items():
+            conflicts += len(used) - len(set(used))
+        
+        compactness = 0
+        for (kind, curriculum), used in periods.items():
+            if kind != 'curriculum':
+                continue
+            used = set(used)
+            for period in used:
+                slot = period % self.periods_per_day
+                if not ((slot > 0 and period - 1 in used) or
+                        (slot < self.periods_per_day - 1 and period + 1 in used)):
+                    compactness += 1
+        
+        result.update({
+            'room_occupancy': sum(count - 1 for count in occupied.values()),
+            'conflicts': conflicts,
+            'unavailability': unavailable,
+            'forbidden_rooms': forbidden,
+            'room_capacity': capacity,
+            'min_working_days': sum(max(0, self.min_days[c] - len(course_days.get(c, ())))
+                                    for c in range(self.n_courses)),
+            'curriculum_compactness': compactness,
+            'room_stability': sum(len(rooms) - 1 for rooms in course_rooms.values()),
+        })
+        result['soft'] = (self.CAPACITY_WEIGHT * result['room_capacity'] +
+                          self.MIN_DAYS_WEIGHT * result['min_working_days'] +
+                          self.COMPACTNESS_WEIGHT * result['curriculum_compactness'] +
+                          self.STABILITY_WEIGHT * result['room_stability'])
+        return result
+    
+    def write_solution(self, path):
+        """Écrit la solution au format ITC 2007 (cours salle jour période)"""
+        course_ids, room_ids = self.instance.course_ids, self.instance.room_ids
+        with open(path, 'w') as f:
+            for lecture, (period, room) in enumerate(zip(self.lecture_period, self.lecture_room)):
+                if period >= 0:
+                    day, slot = divmod(period, self.periods_per_day)
+                    f.write(f"{course_ids[self.lecture_course[lecture]]} {room_ids[room]} {day} {slot}\n")
+
+
+ORDERINGS = ('ml', 'naive', 'slack')
+
+
+def course_order(instance, strategy='ml', predictor=None, extractor=None):
+    """Ordre de placement des cours : difficulté prédite, ordre du fichier ou marge croissante"""
+    if strategy not in ORDERINGS:
+        raise ValueError(f"Ordre inconnu: {strategy}")
+    if strategy == 'naive':
+        return list(range(instance.n_courses))
+    
+    frame = (extractor or FeatureExtractor()).instance_features(instance)
+    if strategy == 'slack':
+        # Cours les plus contraints d'abord (moins de couples période x salle par séance)
+        return np.argsort(frame['placement_slack'].to_numpy(), kind='stable').tolist()
+    
+    if predictor is None:
+        # Sans modèle : score de difficulté calculé, celui que le modèle apprend
+        score = frame['difficulty_score'].to_numpy()
+        return np.argsort(-score, kind='stable').tolist()
+    predictions = predictor.predict_batch(frame)
+    # Priorité 1 d'abord, puis difficulté décroissante
+    return np.lexsort((-predictions['difficulty_score'].to_numpy(),
+                       predictions['priority'].to_numpy())).tolist()
+
+
+def benchmark(files, orderings=('ml', 'naive'), seeds=(0,), time_limit=10.0, max_iterations=None,
+              predictor=None, checkpoints=(0.1, 0.25, 0.5, 1.0), solution_dir=None):
+    """Compare les ordres de construction : pénalité en fonction du temps par instance"""
+    processor = TimetableDataProcessor()
+    extractor = FeatureExtractor()
+    records = []
+    
+    for file_path in files:
+        instance = processor.parse_instance(file_path)
+        if not instance.n_courses:
+            print(f"✗ {instance.name}: instance vide")
+            continue
+        for strategy in orderings:
+            order = course_order(instance, strategy, predictor, extractor)
+            for seed in seeds:
+                solver = TimetableSolver(instance, seed=seed)
+                result = solver.solve(order, time_limit, max_iterations)
+                total = result['time']
+                
+                # Meilleur coût atteint à chaque fraction du temps total
+                at = {}
+                for fraction in checkpoints:
+                    costs = [cost for t, cost in result['trajectory'] if t <= fraction * total]
+                    at[str(fraction)] = costs[-1] if costs else result['construct_cost']
+                
+                record = dict(result, instance=instance.name, ordering=strategy, seed=seed,
+                              cost_at=at, evaluation=solver.evaluate())
+                records.append(record)
+                if solution_dir:
+                    os.makedirs(solution_dir, exist_ok=True)
+                    solver.write_solution(os.path.join(solution_dir, f"{instance.name}-{strategy}-{seed}.sol"))
+                print(f"✓ {instance.name} {strategy:<6} graine {seed}: construction {result['construct_cost']}"
+                      f" -> {result['cost']} (non placées {result['unassigned']},"
+                      f" {result['iterations']} itérations, {total:.1f}s)")
+    return records
+
+
+def summarize(records, checkpoints=(0.1, 0.25, 0.5, 1.0)):
+    """Tableau des pénalités moyennes par instance et ordre aux fractions de temps"""
+    groups = {}
+    for record in records:
+        groups.setdefault((record['instance'], record['ordering']), []).append(record)
+    
+    header = f"{'instance':<12}{'ordre':<8}{'construction':>14}" + ''.join(f"{f'@{f:g}':>10}" for f in checkpoints)
+    print(header)
+    print("-" * len(header))
+    for (instance, strategy), group in groups.items():
+        row = f"{instance:<12}{strategy:<8}{np.mean([r['construct_cost'] for r in group]):>14.1f}"
+        row += ''.join(f"{np.mean([r['cost_at'][str(f)] for r in group]):>10.1f}" for f in checkpoints)
+        print(row)
+
+
+def main():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Solveur ITC 2007 guidé par la difficulté prédite")
+    parser.add_argument('files', nargs='*', help="instances .ctt (par défaut comp01 à comp21)")
+    parser.add_argument('--datasets-dir', default='itc_datasets')
+    parser.add_argument('--offline', action='store_true')
+    parser.add_argument('--model-dir', default='models')
+    parser.add_argument('--orderings', nargs='+', default=['ml', 'naive'], choices=ORDERINGS)
+    parser.add_argument('--seeds', nargs='+', type=int, default=[0])
+    parser.add_argument('--time-limit', type=float, default=10.0, metavar='SECONDES')
+    parser.add_argument('--max-iterations', type=int, default=None,
+                        help="borne d'itérations (résultats reproductibles quelle que soit la machine)")
+    parser.add_argument('--output', default=None, help="résultats détaillés en JSON")
+    parser.add_argument('--solution-dir', default=None, help="écrit les solutions au format ITC")
+    args = parser.parse_args()
+    
+    files = args.files or TimetableDataProcessor(datasets_dir=args.datasets_dir,
+                                                 offline=args.offline).download_datasets()
+    
+    predictor = None
+    if 'ml' in args.orderings:
+        from inference import TimetablePredictor
+        try:
+            predictor = TimetablePredictor(args.model_dir)
+        except Exception as e:
+            print(f"✗ Modèle indisponible ({e}) : ordre 'ml' sur le score de difficulté calculé")
+    
+    records = benchmark(files, args.orderings, args.seeds, args.time_limit, args.max_iterations,
+                        predictor, solution_dir=args.solution_dir)
+    print()
+    summarize(records)
+    
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(records, f, indent=2)
+        print(f"\nRésultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -219,6 +219,11 @@ export interface MLPredictionRequest {
   unavailability_count?: number;
   unavailability_ratio?: number;
   room_constraint_count?: number;
+  available_periods?: number;
+  available_days?: number;
+  fitting_rooms?: number;
+  feasible_rooms?: number;
+  placement_slack?: number;
 }
 
 export interface MLPredictionResponse {
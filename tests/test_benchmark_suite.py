@@ -0,0 +1,25 @@
+# Banc d'essai : modèle de prédiction mis en cache entre les étapes
+
+from benchmark_suite import _setup
+from instance_generator import InstanceGenerator
+
+
+def model_dirs(work_dir):
+    return sorted(p.name for p in work_dir.glob('model-*'))
+
+
+def test_model_cache_follows_instance_and_models(tmp_path):
+    path = str(tmp_path / 'synth-60-0.ctt')
+    InstanceGenerator.scaled(60, 0).write(path)
+    _setup('predict_batch', path, str(tmp_path), ('XGBoost',))()
+    _setup('predict_difficulty', path, str(tmp_path), ('XGBoost',))()
+    # Même instance, mêmes modèles : le modèle est réutilisé
+    assert len(model_dirs(tmp_path)) == 1
+    
+    _setup('predict_batch', path, str(tmp_path), ('Gradient Boosting',))()
+    assert len(model_dirs(tmp_path)) == 2
+    
+    # Même nom de fichier, autres paramètres du générateur : nouveau modèle
+    InstanceGenerator.scaled(60, 0, campuses=2).write(path)
+    _setup('predict_batch', path, str(tmp_path), ('XGBoost',))()
+    assert len(model_dirs(tmp_path)) == 3
@@ -0,0 +1,59 @@
+# Backend creux comparé à l'implémentation de référence networkx
+
+import networkx as nx
+import numpy as np
+import pytest
+
+from instance_generator import InstanceGenerator
+from prediction import ConflictGraph, FeatureExtractor, TimetableDataProcessor
+
+INSTANCES = {
+    'dense': dict(courses=60, rooms=6, curricula=40, overlap=0.6, seed=1),
+    # Composantes disjointes (un campus par composante)
+    'campuses': dict(courses=90, rooms=9, curricula=30, campuses=3, seed=2),
+    # Peu de curricula : beaucoup de cours isolés
+    'isolated': dict(courses=80, rooms=5, curricula=4, curriculum_size=(2, 4), seed=3),
+    # Curricula d'un seul cours : aucune arête
+    'no_edges': dict(courses=30, rooms=3, curricula=10, curriculum_size=(1, 1), seed=4),
+    # Moins de trois cours : centralité nulle par définition
+    'tiny': dict(courses=2, rooms=1, curricula=1, curriculum_size=(2, 2), seed=5),
+}
+
+
+@pytest.fixture(params=sorted(INSTANCES))
+def instance(request, tmp_path):
+    path = InstanceGenerator(**INSTANCES[request.param]).write(str(tmp_path / f"{request.param}.ctt"))
+    return TimetableDataProcessor().parse_instance(path, strict=True)
+
+
+def test_graph_matches_networkx(instance):
+    graph = ConflictGraph.from_instance(instance)
+    reference = FeatureExtractor().create_conflict_graph(instance)
+    nodes = range(instance.n_courses)
+    
+    np.testing.assert_array_equal(graph.degree(), [reference.degree(c) for c in nodes])
+    triangles = nx.triangles(reference)
+    np.testing.assert_array_equal(graph.triangles(), [triangles[c] for c in nodes])
+    clustering = nx.clustering(reference)
+    np.testing.assert_allclose(graph.clustering(), [clustering[c] for c in nodes], rtol=0, atol=1e-12)
+    betweenness = nx.betweenness_centrality(reference)
+    np.testing.assert_allclose(graph.betweenness_centrality(), [betweenness[c] for c in nodes],
+                               rtol=0, atol=1e-12)
+
+
+def test_backends_give_identical_features(instance):
+    sparse = FeatureExtractor(graph_backend='sparse', centrality_mode='exact')
+    reference = FeatureExtractor(graph_backend='networkx', centrality_mode='exact')
+    expected = reference.graph_features(instance)
+    actual = sparse.graph_features(instance)
+    
+    np.testing.assert_array_equal(actual['conflict_degree'], expected['conflict_degree'])
+    for name in ('clustering_coefficient', 'betweenness_centrality'):
+        np.testing.assert_allclose(actual[name], expected[name], rtol=0, atol=1e-12)
+
+
+def test_empty_graph():
+    graph = ConflictGraph(0, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64))
+    assert graph.adjacency.shape == (0, 0)
+    assert len(graph.degree()) == len(graph.triangles()) == len(graph.clustering()) == 0
+    assert len(graph.betweenness_centrality()) == len(nx.betweenness_centrality(nx.Graph())) == 0
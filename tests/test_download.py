@@ -0,0 +1,161 @@
+# Téléchargement des datasets contre un serveur HTTP local (ETag / Last-Modified)
+
+import hashlib
+import os
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from prediction import TimetableDataProcessor
+
+INSTANCES = ['comp01.ctt', 'comp02.ctt']
+
+
+class StandInServer:
+    """Serveur de fichiers minimal : réponses conditionnelles, pannes et troncatures à la demande"""
+    
+    def __init__(self, files):
+        self.files = dict(files)
+        self.requests = []
+        self.responses = []
+        # Instances servies avec une erreur 500 ou un corps tronqué
+        self.failing = set()
+        self.truncated = set()
+        server = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+            
+            def do_GET(self):
+                name = self.path.rsplit('/', 1)[-1]
+                body = server.files.get(name)
+                etag = f'"{hashlib.sha256(body).hexdigest()[:16]}"' if body is not None else None
+                server.requests.append((name, self.headers.get('If-None-Match')))
+                if body is None:
+                    server.responses.append((name, 404))
+                    self.send_error(404)
+                    return
+                if name in server.failing:
+                    server.responses.append((name, 500))
+                    self.send_error(500)
+                    return
+                if self.headers.get('If-None-Match') == etag:
+                    server.responses.append((name, 304))
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.end_headers()
+                    return
+                server.responses.append((name, 200))
+                self.send_response(200)
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', formatdate(0, usegmt=True))
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                # Troncature : connexion fermée avant la fin annoncée du corps
+                self.wfile.write(body[:len(body) // 2] if name in server.truncated else body)
+                if name in server.truncated:
+                    self.close_connection = True
+        
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}/datasets/"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        if self.httpd is None:
+            return
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.httpd = None
+
+
+@pytest.fixture
+def server():
+    files = {name: f"Name: {name}\nCourses: 0\n{'x' * 1000}\nEND.\n".encode() for name in INSTANCES}
+    server = StandInServer(files)
+    yield server
+    server.stop()
+
+
+def processor(server, tmp_path, **kwargs):
+    return TimetableDataProcessor(base_url=server.base_url, datasets_dir=str(tmp_path / 'datasets'),
+                                  timeout=5, **kwargs)
+
+
+def leftovers(tmp_path):
+    return [name for name in os.listdir(tmp_path / 'datasets') if name.endswith(('.part', '.tmp'))]
+
+
+def test_cold_download_then_not_modified(server, tmp_path):
+    files = processor(server, tmp_path).download_datasets(INSTANCES)
+    assert [os.path.basename(path) for path in files] == INSTANCES
+    for path in files:
+        with open(path, 'rb') as f:
+            assert f.read() == server.files[os.path.basename(path)]
+    # Premier passage : aucune requête conditionnelle
+    assert all(etag is None for _, etag in server.requests)
+    assert sorted(server.responses) == [(name, 200) for name in INSTANCES]
+    
+    server.requests.clear()
+    server.responses.clear()
+    assert processor(server, tmp_path).download_datasets(INSTANCES) == files
+    # Second passage : ETag renvoyé, réponse 304, fichiers inchangés
+    assert all(etag is not None for _, etag in server.requests)
+    assert sorted(server.responses) == [(name, 304) for name in INSTANCES]
+    assert leftovers(tmp_path) == []
+
+
+def test_corrupted_local_copy_is_fetched_again(server, tmp_path, capsys):
+    files = processor(server, tmp_path).download_datasets(INSTANCES)
+    with open(files[0], 'wb') as f:
+        f.write(b'corrompu')
+    capsys.readouterr()
+    
+    server.requests.clear()
+    server.responses.clear()
+    processor(server, tmp_path).download_datasets(INSTANCES)
+    # Copie corrompue : requête inconditionnelle et contenu restauré
+    assert dict(server.requests)[INSTANCES[0]] is None
+    assert dict(server.responses) == {INSTANCES[0]: 200, INSTANCES[1]: 304}
+    with open(files[0], 'rb') as f:
+        assert f.read() == server.files[INSTANCES[0]]
+    output = capsys.readouterr().out
+    assert f"✓ {INSTANCES[0]} (téléchargé)" in output
+    assert f"✓ {INSTANCES[1]} (inchangé)" in output
+
+
+def test_offline_fallback(server, tmp_path, capsys):
+    files = processor(server, tmp_path).download_datasets(INSTANCES)
+    with open(files[1], 'wb') as f:
+        f.write(b'corrompu')
+    base_url = server.base_url
+    server.stop()
+    capsys.readouterr()
+    
+    # Serveur injoignable : seules les copies vérifiées sont reprises
+    unreachable = TimetableDataProcessor(base_url=base_url, datasets_dir=str(tmp_path / 'datasets'), timeout=2)
+    assert unreachable.download_datasets(INSTANCES) == files[:1]
+    assert f"✓ {INSTANCES[0]} (local)" in capsys.readouterr().out
+    
+    # Mode hors ligne explicite : aucune requête, même règle de vérification
+    offline = TimetableDataProcessor(datasets_dir=str(tmp_path / 'datasets'), offline=True)
+    assert offline.download_datasets(INSTANCES) == files[:1]
+
+
+@pytest.mark.parametrize('failure', ['failing', 'truncated'])
+def test_failed_download_leaves_no_partial_file(server, tmp_path, failure):
+    getattr(server, failure).add(INSTANCES[0])
+    files = processor(server, tmp_path).download_datasets(INSTANCES)
+    assert [os.path.basename(path) for path in files] == INSTANCES[1:]
+    assert not os.path.exists(tmp_path / 'datasets' / INSTANCES[0])
+    assert leftovers(tmp_path) == []
+    
+    # Instance en échec absente du manifeste : le passage suivant la retélécharge
+    getattr(server, failure).clear()
+    server.requests.clear()
+    files = processor(server, tmp_path).download_datasets(INSTANCES)
+    assert [os.path.basename(path) for path in files] == INSTANCES
+    assert dict(server.requests)[INSTANCES[0]] is None
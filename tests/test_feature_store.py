@@ -0,0 +1,97 @@
+# Magasin de features : types réduits, débordements, dictionnaires et ré-extraction
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_store import FeatureStore
+from instance_generator import InstanceGenerator
+from prediction import FeatureExtractor
+
+
+def features(rows, teachers, instance='inst', start=0):
+    return pd.DataFrame({
+        'course_id': [f"c{i}" for i in range(start, start + rows)],
+        'instance': [instance] * rows,
+        'teacher': [teachers[i % len(teachers)] for i in range(rows)],
+        'lectures': np.arange(rows, dtype=np.int64) % 7,
+        'students': np.arange(rows, dtype=np.int64) * 1000,
+        'lecture_density': np.linspace(0.0, 1.0, rows),
+        'betweenness_centrality': np.full(rows, np.nan),
+    })
+
+
+def test_dtype_round_trip(tmp_path):
+    frame = features(10, ['t1', 't2', 't3'])
+    store = FeatureStore(str(tmp_path / 'store'), chunk_rows=4)
+    store.append(frame)
+    
+    # Relecture depuis le disque, en tronçons de 4 lignes
+    reopened = FeatureStore(str(tmp_path / 'store'))
+    assert reopened.n_rows == 10 and reopened.n_chunks == 3
+    assert dict(reopened.meta['columns']) == {
+        'instance': '<i4', 'teacher': '<i4', 'lectures': '<i2', 'students': '<i4',
+        'lecture_density': '<f4', 'betweenness_centrality': '<f4',
+    }
+    
+    back = reopened.to_frame()
+    assert 'course_id' not in back
+    assert back['teacher'].tolist() == frame['teacher'].tolist()
+    assert back['instance'].tolist() == frame['instance'].tolist()
+    assert back['lectures'].dtype == np.int16
+    np.testing.assert_array_equal(back['lectures'], frame['lectures'])
+    np.testing.assert_array_equal(back['students'], frame['students'])
+    np.testing.assert_array_equal(back['lecture_density'], frame['lecture_density'].astype(np.float32))
+    assert back['betweenness_centrality'].isna().all()
+
+
+@pytest.mark.parametrize('column, value', [('lectures', 40000), ('lectures', -40000),
+                                           ('students', 2**31)])
+def test_integer_overflow_is_an_error(tmp_path, column, value):
+    frame = features(5, ['t1'])
+    frame.loc[4, column] = value
+    # Débordement dans le dernier tronçon : les précédents ne doivent pas être écrits non plus
+    store = FeatureStore(str(tmp_path / 'store'), chunk_rows=2)
+    with pytest.raises(ValueError, match=column):
+        store.append(frame)
+    # Rien n'est écrit pour un lot refusé
+    assert store.n_chunks == 0 and store.columns == []
+    assert not list(tmp_path.glob('store/chunk-*'))
+
+
+def test_categories_grow_across_appends(tmp_path):
+    path = str(tmp_path / 'store')
+    FeatureStore(path).append(features(4, ['t1', 't2'], instance='a'))
+    
+    # Nouvel objet : le dictionnaire est relu depuis store.json puis complété
+    store = FeatureStore(path)
+    store.append(features(4, ['t3', 't1'], instance='b', start=4))
+    assert store.categories('teacher') == ['t1', 't2', 't3']
+    assert store.categories('instance') == ['a', 'b']
+    
+    codes = np.concatenate([np.asarray(records['teacher']) for records in store.chunks()])
+    np.testing.assert_array_equal(codes, [0, 1, 0, 1, 2, 0, 2, 0])
+    assert FeatureStore(path).to_frame()['teacher'].tolist() == ['t1', 't2', 't1', 't2', 't3', 't1', 't3', 't1']
+
+
+def test_incompatible_schema_is_rejected(tmp_path):
+    store = FeatureStore(str(tmp_path / 'store'))
+    store.append(features(3, ['t1']))
+    with pytest.raises(ValueError):
+        store.append(features(3, ['t1']).drop(columns=['students']))
+
+
+def test_extract_to_store_does_not_duplicate(tmp_path):
+    files = [InstanceGenerator.scaled(40, seed=seed).write(str(tmp_path / f"i{seed}.ctt")) for seed in range(2)]
+    extractor = FeatureExtractor()
+    store = extractor.extract_to_store(files, FeatureStore(str(tmp_path / 'store')))
+    rows = store.n_rows
+    assert rows == 80
+    
+    # Un second passage sur le même magasin dupliquerait les lignes (fuite entre entraînement et test)
+    with pytest.raises(ValueError):
+        extractor.extract_to_store(files, FeatureStore(str(tmp_path / 'store')))
+    store = extractor.extract_to_store(files, FeatureStore(str(tmp_path / 'store')), overwrite=True)
+    assert store.n_rows == rows
+    assert FeatureStore(str(tmp_path / 'store')).n_rows == rows
+    assert len(list((tmp_path / 'store').glob('chunk-*.npy'))) == store.n_chunks
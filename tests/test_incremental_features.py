@@ -0,0 +1,107 @@
+# Propriété : après chaque delta, les features incrémentales égalent une ré-extraction complète
+
+import random
+
+import pandas as pd
+import pytest
+
+from instance_generator import InstanceGenerator
+from prediction import FeatureExtractor, IncrementalFeatures, TimetableDataProcessor
+
+N_DELTAS = 300
+
+
+def random_delta(features, rng, step):
+    """Delta aléatoire applicable à l'état courant, ou None si l'opération tirée ne l'est pas"""
+    op = rng.choice(IncrementalFeatures.DELTA_OPS)
+    courses = list(features.slots)
+    curricula = list(features.curricula)
+    rooms = list(features.rooms)
+    
+    if op == 'add_course':
+        return {'op': op, 'course_id': f"n{step}", 'teacher': f"t{rng.randrange(8)}",
+                'lectures': rng.randint(1, 6), 'min_days': rng.randint(1, 5), 'students': rng.randint(5, 300)}
+    if op == 'add_room':
+        return {'op': op, 'room_id': f"r-new{step}", 'capacity': rng.randint(10, 400)}
+    if op == 'add_curriculum':
+        return {'op': op, 'curriculum_id': f"q-new{step}",
+                'courses': rng.sample(courses, min(len(courses), rng.randint(0, 5)))}
+    if op == 'remove_curriculum':
+        return {'op': op, 'curriculum_id': rng.choice(curricula)} if curricula else None
+    if op == 'remove_room':
+        # Au moins une salle reste disponible
+        return {'op': op, 'room_id': rng.choice(rooms)} if len(rooms) > 1 else None
+    
+    # Opérations portant sur un cours existant
+    if len(courses) < 2:
+        return None
+    course = rng.choice(courses)
+    slot = features.slots[course]
+    if op == 'remove_course':
+        return {'op': op, 'course_id': course}
+    if op == 'update_course':
+        return {'op': op, 'course_id': course, 'students': rng.randint(5, 300),
+                'lectures': rng.choice([None, rng.randint(1, 6)]), 'teacher': rng.choice([None, 't-new'])}
+    if op == 'add_to_curriculum':
+        return {'op': op, 'curriculum_id': rng.choice(curricula), 'course_id': course} if curricula else None
+    if op == 'remove_from_curriculum':
+        candidates = [curriculum for curriculum in curricula if features.curricula[curriculum]]
+        if not candidates:
+            return None
+        curriculum = rng.choice(candidates)
+        member = rng.choice(sorted(features.curricula[curriculum]))
+        return {'op': op, 'curriculum_id': curriculum, 'course_id': features.course_ids[member]}
+    if op == 'add_unavailability':
+        return {'op': op, 'course_id': course, 'day': rng.randrange(5), 'period': rng.randrange(6)}
+    if op == 'remove_unavailability':
+        entries = features.unavailability[slot]
+        if not entries:
+            return None
+        day, period = rng.choice(entries)
+        return {'op': op, 'course_id': course, 'day': day, 'period': period}
+    if op == 'add_room_constraint':
+        # Une salle inconnue reste une contrainte valide (comptée, comme au parsing)
+        return {'op': op, 'course_id': course, 'room_id': rng.choice(rooms + ['r-unknown'])}
+    if op == 'remove_room_constraint':
+        entries = features.room_constraints[slot]
+        if not entries:
+            return None
+        room = rng.choice(entries)
+        return {'op': op, 'course_id': course, 'room_id': 'r-unknown' if room is None else room}
+    raise AssertionError(f"opération non couverte: {op}")
+
+
+@pytest.fixture(scope='module')
+def instance(tmp_path_factory):
+    path = tmp_path_factory.mktemp('instances') / 'synth.ctt'
+    InstanceGenerator(courses=40, rooms=6, curricula=15, unavailability=60, room_constraints=10,
+                      seed=3).write(str(path))
+    return TimetableDataProcessor().parse_instance(str(path))
+
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_random_deltas_match_full_extraction(instance, seed):
+    extractor = FeatureExtractor()
+    features = IncrementalFeatures(instance, extractor)
+    assert features.validate() == []
+    
+    rng = random.Random(seed)
+    applied = set()
+    for step in range(N_DELTAS):
+        delta = random_delta(features, rng, step)
+        if delta is None:
+            continue
+        features.apply(delta)
+        applied.add(delta['op'])
+        assert features.validate() == [], f"étape {step}: {delta}"
+    
+    assert applied == set(IncrementalFeatures.DELTA_OPS)
+    # Égalité exacte, centralité comprise
+    pd.testing.assert_frame_equal(features.frame(), extractor.instance_features(features.to_instance()),
+                                  check_exact=True)
+
+
+def test_unknown_delta_op_is_rejected(instance):
+    features = IncrementalFeatures(instance)
+    with pytest.raises(ValueError):
+        features.apply({'op': 'rename_course', 'course_id': 'c00'})
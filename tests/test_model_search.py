@@ -0,0 +1,34 @@
+# Arrêt précoce de la recherche d'hyperparamètres sur le jeu de validation commun
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import r2_score
+
+from prediction import TimetableMLModel
+
+
+def split(n=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, 5)), columns=list('abcde'))
+    y = pd.Series(2 * X['a'] - X['b'] ** 2 + rng.normal(scale=0.5, size=n))
+    cut = int(n * 0.75)
+    return X[:cut], y[:cut], X[cut:], y[cut:]
+
+
+def test_gradient_boosting_stops_on_search_validation_set():
+    X_fit, y_fit, X_val, y_val = split()
+    model = TimetableMLModel()
+    params = {'n_estimators': 300, 'max_depth': 3, 'learning_rate': 0.3}
+    score, final_params = model._fit_candidate('Gradient Boosting', params, X_fit, y_fit, X_val, y_val, 20)
+    
+    # Le nombre d'arbres retenu est le meilleur sur X_val, et le score est celui du modèle final
+    n_estimators = final_params['n_estimators']
+    assert 1 <= n_estimators < 300
+    assert 'n_iter_no_change' not in final_params and 'validation_fraction' not in final_params
+    refit = model._make_model('Gradient Boosting', final_params).fit(X_fit, y_fit)
+    assert score == r2_score(y_val, refit.predict(X_val))
+    
+    # Patience de 20 arbres : aucun meilleur score dans la fenêtre qui suit
+    full = model._make_model('Gradient Boosting', params).fit(X_fit, y_fit)
+    staged = [r2_score(y_val, y_pred) for y_pred in full.staged_predict(X_val)]
+    assert score == max(staged[:n_estimators + 20])
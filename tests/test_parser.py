@@ -0,0 +1,40 @@
+# Parsing des instances : erreurs de lecture et incohérences d'en-tête
+
+import pytest
+
+from instance_generator import InstanceGenerator
+from prediction import TimetableDataProcessor
+
+
+def test_undecodable_file_is_reported(tmp_path, capsys):
+    path = tmp_path / 'latin1.ctt'
+    path.write_bytes('Name: é\nCourses: 0\n'.encode('latin-1'))
+    
+    # Mode non strict : erreur signalée par error(), instance vide renvoyée
+    instance = TimetableDataProcessor().parse_instance(str(path))
+    assert instance.n_courses == 0
+    assert capsys.readouterr().out.startswith(f"Erreur parsing {path}: ")
+    
+    with pytest.raises(UnicodeDecodeError):
+        TimetableDataProcessor().parse_instance(str(path), strict=True)
+
+
+def test_missing_file_is_reported(tmp_path, capsys):
+    path = tmp_path / 'absent.ctt'
+    TimetableDataProcessor().parse_instance(str(path))
+    assert capsys.readouterr().out.startswith(f"Erreur parsing {path}: ")
+    
+    with pytest.raises(OSError):
+        TimetableDataProcessor().parse_instance(str(path), strict=True)
+
+
+def test_header_mismatch_has_no_line_number(tmp_path):
+    path = InstanceGenerator(courses=10, rooms=2, curricula=3, seed=0).write(str(tmp_path / 'inst.ctt'))
+    with open(path) as f:
+        text = f.read().replace('Courses: 10', 'Courses: 12')
+    with open(path, 'w') as f:
+        f.write(text)
+    
+    with pytest.raises(ValueError) as excinfo:
+        TimetableDataProcessor().parse_instance(path, strict=True)
+    assert str(excinfo.value) == f"{path}: courses: 12 déclarés, 10 lus"
@@ -0,0 +1,65 @@
+# Serveur de prédiction : requêtes HTTP mal formées
+
+import asyncio
+import json
+
+import pytest
+
+from instance_generator import InstanceGenerator
+from prediction import FeatureExtractor, TimetableDataProcessor, TimetableMLModel
+from prediction_server import PredictionServer
+
+
+@pytest.fixture(scope='module')
+def model_dir(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('model')
+    path = InstanceGenerator.scaled(60, seed=0).write(str(tmp_path / 'inst.ctt'))
+    frame = FeatureExtractor().instance_features(TimetableDataProcessor().parse_instance(path, strict=True))
+    ml_model = TimetableMLModel(n_jobs=1)
+    X, y = ml_model.prepare_data(frame)
+    ml_model.create_models()
+    ml_model.models = {'XGBoost': ml_model.models['XGBoost']}
+    ml_model.train_models(X, y)
+    return ml_model.save_model(str(tmp_path / 'models'))
+
+
+def exchange(model_dir, request):
+    """Envoie une requête brute ; renvoie (statut, corps JSON, connexion fermée par le serveur)"""
+    async def run():
+        server = await PredictionServer(model_dir, port=0).start()
+        try:
+            reader, writer = await asyncio.open_connection(server.host, server.port)
+            writer.write(request)
+            await writer.drain()
+            status = int((await reader.readline()).split()[1])
+            headers = {}
+            while (line := await reader.readline()) not in (b'\r\n', b''):
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers['content-length']))
+            closed = await reader.read() == b''
+            writer.close()
+            return status, json.loads(body), closed
+        finally:
+            await server.stop()
+    
+    # Délai : une requête mal gérée bloquerait la connexion au lieu d'échouer
+    return asyncio.run(asyncio.wait_for(run(), timeout=30))
+
+
+@pytest.mark.parametrize('length', ['abc', '-5', '+5', ' 5x', '١'])
+def test_invalid_content_length_is_rejected(model_dir, length):
+    request = f"POST /predict HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode('utf-8')
+    status, payload, closed = exchange(model_dir, request)
+    assert status == 400
+    assert 'Content-Length' in payload['error']
+    assert closed
+
+
+def test_valid_content_length(model_dir):
+    body = json.dumps({'lectures': 3, 'students': 40}).encode()
+    request = (f"POST /predict HTTP/1.1\r\nContent-Length: {len(body)}\r\n"
+               f"Connection: close\r\n\r\n").encode() + body
+    status, payload, _ = exchange(model_dir, request)
+    assert status == 200
+    assert 'difficulty_score' in payload
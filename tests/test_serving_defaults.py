@@ -0,0 +1,51 @@
+# Champs absents à l'inférence : médianes d'entraînement enregistrées dans le bundle
+
+import numpy as np
+import pytest
+
+from inference import TimetablePredictor
+from instance_generator import InstanceGenerator
+from prediction import FeatureExtractor, TimetableDataProcessor, TimetableMLModel
+
+NEW_FEATURES = ['available_periods', 'available_days', 'fitting_rooms', 'feasible_rooms', 'placement_slack']
+
+
+@pytest.fixture(scope='module')
+def trained(tmp_path_factory):
+    tmp_path = tmp_path_factory.mktemp('model')
+    path = InstanceGenerator.scaled(120, seed=0).write(str(tmp_path / 'inst.ctt'))
+    frame = FeatureExtractor().instance_features(TimetableDataProcessor().parse_instance(path, strict=True))
+    
+    ml_model = TimetableMLModel(n_jobs=1)
+    X, y = ml_model.prepare_data(frame.copy())
+    ml_model.create_models()
+    ml_model.models = {'Gradient Boosting': ml_model.models['Gradient Boosting']}
+    ml_model.train_models(X, y)
+    ml_model.save_model(str(tmp_path / 'models'))
+    return ml_model, frame, str(tmp_path / 'models')
+
+
+def test_defaults_are_training_medians(trained):
+    ml_model, frame, model_dir = trained
+    defaults = TimetablePredictor(model_dir).metadata['feature_defaults']
+    assert set(defaults) == set(TimetableMLModel.FEATURE_NAMES)
+    assert defaults == ml_model.feature_defaults
+    # Médianes de la partie entraînement, dans le domaine observé
+    for name in NEW_FEATURES:
+        assert frame[name].min() <= defaults[name] <= frame[name].max()
+
+
+def test_missing_fields_use_defaults(trained):
+    _, frame, model_dir = trained
+    predictor = TimetablePredictor(model_dir)
+    course = frame.iloc[0].to_dict()
+    partial = {k: v for k, v in course.items() if k not in NEW_FEATURES}
+    filled = dict(partial, **{name: predictor.feature_defaults[name] for name in NEW_FEATURES})
+    
+    # Même remplissage pour la prédiction unitaire et par lot
+    X = predictor._feature_matrix(frame.drop(columns=NEW_FEATURES).iloc[:1])
+    for name in NEW_FEATURES:
+        assert X[0, predictor.feature_names.index(name)] == predictor.feature_defaults[name]
+    expected = predictor.predict_difficulty(filled)['difficulty_score']
+    assert predictor.predict_difficulty(partial)['difficulty_score'] == expected
+    np.testing.assert_allclose(predictor.predict_batch([partial])['difficulty_score'], [expected])